@@ -0,0 +1,349 @@
+"""
+批量计算引擎（NumPy 向量化）
+Vectorized batch evaluation of perform_analysis
+
+输入为按列组织的参数数组（每个字段一个长度为 N 的数组），一次性计算 N 个家庭的分析结果。
+运算顺序与 calculator_engine.perform_analysis 完全一致，结果逐位相同。
+"""
+
+import math
+
+import numpy as np
+
+from calculator_engine import STAGES, CHART_SERIES, FIELD_PATHS, get_field, uses_timeline, perform_analysis
+
+RESULT_FIELDS = ('totalNetAssetsChange', 'minCashFlowSurplus', 'totalMarriageCost', 'childEducationCost',
+                 'totalCost', 'riskCoefficient', 'endingPortfolio')
+
+MARRIAGE_COST_PATHS = tuple(p for p in FIELD_PATHS if p.startswith('marriageCosts.'))
+
+# 各育儿阶段包含的孩子成本项（与 perform_analysis 中的 idx 分支对应）
+CHILD_STAGE_ITEMS = {
+    1: ('prenatalCare', 'delivery', 'postpartumCare'),  # 0-3岁，另加婴儿用品
+    2: ('kindergarten',),
+    3: ('primarySchool',),
+    4: ('juniorHigh',),
+    5: ('seniorHigh', 'extracurricular'),
+}
+
+
+def _growth(rate_percent, exponent):
+    """计算 (1 + rate/100) ** exponent
+
+    使用 np.float_power 而不是 np.power：后者在部分 CPU 上走 SIMD 近似实现，
+    与 Python 的 ** 运算存在末位差异，会破坏与标量引擎逐位一致的保证。
+    """
+    return np.float_power(1 + rate_percent / 100, exponent)
+
+
+def form_data_to_columns(form_datas):
+    """将多个 form_data 转换为按字段路径组织的列数组"""
+    form_datas = list(form_datas)
+    return {
+        path: np.array([get_field(data, path) for data in form_datas], dtype=np.float64)
+        for path in FIELD_PATHS
+    }
+
+
+def broadcast_columns(columns, n=None):
+    """将列参数（数组或标量）统一为长度为 N 的 float64 数组"""
+    arrays = [np.asarray(columns[path], dtype=np.float64) for path in FIELD_PATHS]
+    if n is None:
+        n = np.broadcast_shapes(*(a.shape for a in arrays))
+        n = n[0] if n else 1
+    return {
+        path: np.broadcast_to(array, (n,))
+        for path, array in zip(FIELD_PATHS, arrays)
+    }
+
+
+def evaluate_batch(columns, loan=None):
+    """向量化执行财务分析
+
+    columns: {字段路径: 长度为 N 的数组或标量}，字段路径见 FIELD_PATHS
+    loan: 可选，所有家庭共用的还款计划（mortgage.loan_schedule 的结果），与 perform_analysis 设置了
+          mortgage 时相同：代替 monthlyMortgage 逐月扣款，还本部分计入房产增值
+    返回: 与 perform_analysis 同名的结果字段（形状 (N,)），
+          以及 'series': {图表序列名: 形状 (N, 阶段数) 的数组}
+    """
+    c = broadcast_columns(columns)
+    n = c['salaryA'].shape[0]
+    stage_count = len(STAGES)
+
+    child_count = c['childCount']
+    inflation = c['livingInflation']
+
+    # 结婚总成本
+    total_marriage_cost = 0
+    for path in MARRIAGE_COST_PATHS:
+        total_marriage_cost = total_marriage_cost + c[path]
+
+    def child(key):
+        return c[f'children[0].{key}']
+
+    # 每个孩子的总教育成本
+    child_education_cost = (
+        child('prenatalCare') + child('delivery') + child('postpartumCare') +
+        child('monthlyBabyCost') * 12 * 3 +
+        child('kindergarten') + child('primarySchool') + child('juniorHigh') +
+        child('seniorHigh') + child('university') + child('extracurricular')
+    )
+    total_child_cost = child_education_cost * child_count
+    total_cost = total_marriage_cost + total_child_cost
+
+    # 各阶段通用的收入项
+    annual_income_base = (c['salaryA'] + c['salaryB']) * 12 + c['annualBonus']
+    effective_annual_income = annual_income_base * (c['incomeStability'] / 100)
+
+    # 按 (阶段, N) 存储以保证逐阶段写入连续，返回时转置为 (N, 阶段)
+    stage_rows = {name: np.empty((stage_count, n)) for name in CHART_SERIES}
+    current_property_value = c['propertyValue']
+    total_net_assets_change = -total_marriage_cost
+    min_cash_flow_surplus = np.full(n, np.inf)
+    zeros = np.zeros(n)
+    portfolio = zeros
+    invest_rate = c['investmentReturn'] / 100
+
+    # 相同年数 / 指数的中间量只计算一次
+    inflation_factors = {}
+    appreciation_factors = {}
+    portfolio_factors = {}
+    flow_terms = {}
+    months_paid = 0
+
+    for idx, stage in enumerate(STAGES):
+        year_count = stage['years']
+        elapsed_years = max(0, (idx - 1) * 3)
+        is_marriage_stage = stage.get('isMarriageStage', False)
+
+        if year_count not in appreciation_factors:
+            appreciation_factors[year_count] = _growth(c['propertyAppreciation'], year_count)
+            growth = _growth(c['investmentReturn'], year_count)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                annuity = np.where((invest_rate != 0) & (year_count != 1), (growth - 1) / (invest_rate * year_count), 1)
+            portfolio_factors[year_count] = (growth - 1, annuity - 1)
+
+        if is_marriage_stage:
+            stage_income = stage_living_cost = stage_mortgage = zeros
+            stage_child_cost = stage_support = zeros
+            stage_marriage_cost = total_marriage_cost
+        else:
+            if elapsed_years not in inflation_factors:
+                inflation_factors[elapsed_years] = _growth(inflation, elapsed_years)
+            inflation_factor = inflation_factors[elapsed_years]
+
+            if year_count not in flow_terms:
+                income = effective_annual_income * year_count
+                flow_terms[year_count] = (
+                    income,
+                    c['monthlyMortgage'] * 12 * year_count,
+                    c['annualParentSupport'] * year_count,
+                )
+            stage_income, stage_mortgage, stage_support = flow_terms[year_count]
+            if loan is not None:
+                stage_months = slice(months_paid, months_paid + year_count * 12)
+                stage_mortgage = float(loan['payment'][stage_months].sum())
+                stage_equity_gain = float(loan['principal'][stage_months].sum())
+                months_paid += year_count * 12
+            stage_living_cost = c['baseLivingCost'] * 12 * year_count * inflation_factor
+
+            # 育儿成本
+            items = CHILD_STAGE_ITEMS.get(idx, ())
+            stage_child_cost = 0
+            for key in items:
+                stage_child_cost = stage_child_cost + child(key)
+            if idx == 1:
+                stage_child_cost = stage_child_cost + child('monthlyBabyCost') * 12 * 3
+            stage_child_cost = stage_child_cost * child_count * inflation_factor
+
+            stage_marriage_cost = zeros
+
+        # 房产增值
+        property_value_at_end = current_property_value * appreciation_factors[year_count]
+        stage_property_gain = property_value_at_end - current_property_value
+        if loan is not None and not is_marriage_stage:
+            stage_property_gain = stage_property_gain + stage_equity_gain
+        current_property_value = property_value_at_end
+
+        # 净现金流和总损益
+        net_cash_flow = stage_income + stage_support - stage_living_cost - stage_mortgage - stage_child_cost - stage_marriage_cost
+
+        # 投资收益：组合账户复利（与 calculator_engine.portfolio_gain 相同）
+        balance_factor, flow_factor = portfolio_factors[year_count]
+        stage_invest_gain = portfolio * balance_factor + net_cash_flow * flow_factor
+        portfolio = portfolio + net_cash_flow + stage_invest_gain
+
+        total_economic_gain = net_cash_flow + stage_property_gain + stage_invest_gain
+
+        if not is_marriage_stage:
+            np.minimum(min_cash_flow_surplus, net_cash_flow, out=min_cash_flow_surplus)
+
+        total_net_assets_change = total_net_assets_change + total_economic_gain
+
+        stage_rows['净现金流'][idx] = net_cash_flow
+        stage_rows['资产增值贬值'][idx] = stage_property_gain
+        stage_rows['结婚生育成本'][idx] = stage_marriage_cost + stage_child_cost
+        stage_rows['投资与支持'][idx] = stage_invest_gain + stage_support
+        stage_rows['综合家庭损益'][idx] = total_economic_gain
+
+    # 抗风险系数
+    monthly_income = (c['salaryA'] + c['salaryB'] + c['annualParentSupport'] / 12)
+    monthly_mortgage = float(loan['payment'][0]) if loan is not None else c['monthlyMortgage']
+    monthly_expenses = monthly_mortgage + c['baseLivingCost']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        risk_coefficient = np.where(monthly_expenses > 0, monthly_income / monthly_expenses, 0.0)
+
+    min_cash_flow_surplus[np.isinf(min_cash_flow_surplus)] = 0
+
+    return {
+        'totalNetAssetsChange': np.broadcast_to(total_net_assets_change, (n,)),
+        'minCashFlowSurplus': min_cash_flow_surplus,
+        'totalMarriageCost': np.broadcast_to(total_marriage_cost, (n,)),
+        'childEducationCost': np.broadcast_to(total_child_cost, (n,)),
+        'totalCost': np.broadcast_to(total_cost, (n,)),
+        'riskCoefficient': risk_coefficient,
+        'endingPortfolio': np.broadcast_to(portfolio, (n,)),
+        'series': {name: rows.T for name, rows in stage_rows.items()},
+    }
+
+
+def needs_scalar_engine(data):
+    """evaluate_batch 不支持、需要逐个计算的 form_data：时间网格（按月、多个孩子等）或房贷还款计划"""
+    return uses_timeline(data) or bool(data.get('mortgage'))
+
+
+def _engine_groups(templates, child_counts):
+    """把各行按 (模板, 计入的孩子数) 分组，并决定每组的计算方式
+
+    返回 (普通行号数组, [(方式, 模板, 行号数组)])：方式为 'timeline'（时间网格）或 'mortgage'（带还款计划的固定阶段）；
+    是否需要时间网格取决于该行 childCount 计入了哪些孩子。返回的模板已把 childCount 设为计入的孩子数，
+    时间网格的默认分析年数因此只按这些孩子的出生时间延长。
+    """
+    groups = {}
+    plain = []
+    for i, data in enumerate(templates):
+        key = (id(data), min(len(data['children']), max(1, math.ceil(child_counts[i]))))
+        group = groups.get(key)
+        if group is None:
+            counted = dict(data, childCount=key[1])
+            kind = 'timeline' if uses_timeline(counted) else 'mortgage' if data.get('mortgage') else None
+            group = groups[key] = (kind, counted, [])
+        if group[0] is None:
+            plain.append(i)
+        else:
+            group[2].append(i)
+    return (np.array(plain, dtype=int),
+            [(kind, data, np.array(rows, dtype=int)) for kind, data, rows in groups.values() if kind is not None])
+
+
+def evaluate_forms(columns, templates):
+    """与 evaluate_batch 相同，但按每行的 form_data 模板选择计算引擎
+
+    columns: {字段路径: 长度为 N 的数组或标量}，覆盖模板中 FIELD_PATHS 的值
+    templates: 长度为 N 的 form_data 列表（可重复同一对象），提供 FIELD_PATHS 以外的设置
+               （时间网格、多个孩子的 birthOffset、mortgage 等）
+    每行的结果与把该行的值写入模板后调用 perform_analysis 相同（不做风险模拟；时间网格的行可能相差末位舍入）：
+    普通行合并为一次 evaluate_batch；需要时间网格的行按模板分组，每组一次 timeline_engine.evaluate_template；
+    只带还款计划的行按模板分组，每组的还款计划只计算一次，再做一次 evaluate_batch。
+    另外返回 'stageNames'；各行阶段不一致时 stageNames 为 None，且不返回 'series'。
+    """
+    templates = list(templates)
+    n = len(templates)
+    columns = broadcast_columns(columns, n)
+    plain, groups = _engine_groups(templates, columns['childCount'])
+    stage_names = [stage['name'] for stage in STAGES]
+    if not groups:
+        result = evaluate_batch(columns)
+        result['stageNames'] = stage_names
+        return result
+
+    parts = []
+    if len(plain):
+        parts.append((plain, stage_names, evaluate_batch({path: values[plain] for path, values in columns.items()})))
+    for kind, template, rows in groups:
+        subset = {path: values[rows] for path, values in columns.items()}
+        if kind == 'timeline':
+            from timeline_engine import evaluate_template
+            batch = evaluate_template(template, subset)
+            parts.append((rows, list(batch['stageNames']), batch))
+        else:
+            from mortgage import loan_schedule
+            parts.append((rows, stage_names, evaluate_batch(subset, loan=loan_schedule(template['mortgage']))))
+
+    result = {name: np.empty(n) for name in RESULT_FIELDS}
+    for rows, _, batch in parts:
+        for name in RESULT_FIELDS:
+            result[name][rows] = batch[name]
+    if all(names == parts[0][1] for _, names, _ in parts):
+        result['stageNames'] = parts[0][1]
+        result['series'] = {}
+        for series in CHART_SERIES:
+            values = np.empty((n, len(parts[0][1])))
+            for rows, _, batch in parts:
+                values[rows] = batch['series'][series]
+            result['series'][series] = values
+    else:
+        result['stageNames'] = None
+    return result
+
+
+def batch_result_row(result, i):
+    """从批量结果中取出第 i 个家庭，转换为 perform_analysis 的结果格式"""
+    chart_data = []
+    for idx, stage in enumerate(STAGES):
+        row = {'name': stage['name']}
+        for name in CHART_SERIES:
+            row[name] = float(result['series'][name][i, idx])
+        row['isMarriageStage'] = stage.get('isMarriageStage', False)
+        chart_data.append(row)
+
+    return {
+        'chartData': chart_data,
+        'totalNetAssetsChange': float(result['totalNetAssetsChange'][i]),
+        'minCashFlowSurplus': float(result['minCashFlowSurplus'][i]),
+        'totalMarriageCost': float(result['totalMarriageCost'][i]),
+        'childEducationCost': float(result['childEducationCost'][i]),
+        'totalCost': float(result['totalCost'][i]),
+        'riskCoefficient': float(result['riskCoefficient'][i]),
+        'endingPortfolio': float(result['endingPortfolio'][i])
+    }
+
+
+def analyze_batch(form_datas, cache=None):
+    """批量分析多个 form_data，返回与 perform_analysis 格式相同的结果列表
+
+    传入 cache（如 result_cache.ANALYSIS_CACHE）时，先按规范化键查找缓存，
+    只对未命中的 form_data 做批量计算，并将结果写回缓存。
+    开启 riskSimulation 的 form_data 与 perform_analysis 一样附带风险模拟结果。
+    """
+    form_datas = list(form_datas)
+    if not form_datas:
+        return []
+
+    results = [None] * len(form_datas)
+    keys = [None] * len(form_datas)
+    if cache is not None:
+        from result_cache import canonical_key
+        for i, data in enumerate(form_datas):
+            keys[i] = canonical_key(data)
+            results[i] = cache.get(keys[i])
+
+    # 需要时间网格引擎（按月、多个孩子等）或带房贷还款计划的 form_data 逐个计算
+    for i, data in enumerate(form_datas):
+        if results[i] is None and needs_scalar_engine(data):
+            results[i] = perform_analysis(data)
+            if cache is not None:
+                cache.put(keys[i], results[i])
+
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        batch = evaluate_batch(form_data_to_columns(form_datas[i] for i in missing))
+        for row, i in enumerate(missing):
+            result = batch_result_row(batch, row)
+            if form_datas[i].get('riskSimulation'):
+                from risk_simulation import run_risk_simulation
+                result['riskSimulation'] = run_risk_simulation(form_datas[i])
+            results[i] = result
+            if cache is not None:
+                cache.put(keys[i], result)
+    return results
@@ -0,0 +1,359 @@
+"""
+性能基准测试
+Benchmark suite with baseline regression checks
+
+覆盖各条热点路径：单次 perform_analysis、不同规模的批量计算、时间网格、蒙特卡洛模拟吞吐量、
+阶段图表在离屏 Agg 画布上的重绘、加载预设并计算（界面 load_preset + calculate 的计算与绘图部分）、
+嵌套字典与紧凑记录（records.py）的内存与计算对比、各模块的导入耗时。
+
+- 每项记录每次调用的最短 / 中位耗时，以及 tracemalloc 统计的峰值内存（单独运行一次，不计入耗时）
+- 结果写出为 JSON；指定基线文件时，最短耗时或峰值内存比基线增加超过阈值即视为回退，退出码为 1
+- 只使用 Agg 后端，不需要显示器
+"""
+
+import os
+
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from calculator_engine import PRESETS, default_form_data, apply_preset, perform_analysis
+
+DEFAULT_REPEATS = 5
+DEFAULT_THRESHOLD = 20.0
+
+# 单个样本的最短时长（秒），耗时很短的调用会在一个样本内重复多次
+MIN_SAMPLE_SECONDS = 0.02
+
+BATCH_SIZES = (1000, 10000, 100000)
+QUICK_BATCH_SIZES = (1000, 10000)
+
+IMPORT_MODULES = ('calculator_engine', 'batch_engine', 'timeline_engine', 'risk_simulation',
+                  'stage_chart', 'marriage_calculator')
+
+# 导入耗时在子进程中测量；带 memory 参数时改为用 tracemalloc 统计导入过程的峰值内存（KB）
+IMPORT_SNIPPET = """
+import json, sys, time, tracemalloc
+if sys.argv[2:] == ['memory']:
+    tracemalloc.start()
+    __import__(sys.argv[1])
+    print(json.dumps({'peakKb': tracemalloc.get_traced_memory()[1] / 1024}))
+else:
+    start = time.perf_counter()
+    __import__(sys.argv[1])
+    print(json.dumps({'seconds': time.perf_counter() - start}))
+"""
+
+
+def measure(func, repeats=DEFAULT_REPEATS, items=1):
+    """测量 func() 每次调用的耗时和峰值内存
+
+    先预热一次并确定每个样本内的调用次数，再取 repeats 个样本；峰值内存在单独的一次调用中用 tracemalloc 统计。
+    """
+    start = time.perf_counter()
+    func()
+    warmup = time.perf_counter() - start
+    number = max(1, int(MIN_SAMPLE_SECONDS / max(warmup, 1e-9)))
+
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    best = min(samples)
+    return {
+        'seconds': best,
+        'median': statistics.median(samples),
+        'repeats': repeats,
+        'number': number,
+        'items': items,
+        'itemsPerSecond': items / best,
+        'peakKb': peak / 1024,
+    }
+
+
+def _varied_forms(n, seed=0):
+    """在默认参数附近随机扰动的一组 form_data 列（按字段路径组织）"""
+    from batch_engine import form_data_to_columns, broadcast_columns
+    rng = np.random.default_rng(seed)
+    columns = dict(broadcast_columns(form_data_to_columns([default_form_data()]), n))
+    for path in ('salaryA', 'salaryB', 'monthlyMortgage', 'propertyValue'):
+        columns[path] = columns[path] * rng.uniform(0.5, 1.5, n)
+    return columns
+
+
+def bench_scalar(repeats, quick):
+    """单次 perform_analysis（不经过缓存）"""
+    results = {}
+    data = default_form_data()
+    results['scalar.perform_analysis'] = measure(lambda: perform_analysis(data), repeats)
+
+    timeline = dict(default_form_data(), timeResolution='monthly')
+    results['scalar.perform_analysis.monthly'] = measure(lambda: perform_analysis(timeline), repeats)
+    return results
+
+
+def bench_batch(repeats, quick):
+    """不同规模的向量化批量计算"""
+    from batch_engine import evaluate_batch
+    from timeline_engine import evaluate_timeline
+
+    results = {}
+    for n in QUICK_BATCH_SIZES if quick else BATCH_SIZES:
+        columns = _varied_forms(n)
+        results[f'batch.evaluate_batch.{n}'] = measure(lambda: evaluate_batch(columns), repeats, items=n)
+
+    n = QUICK_BATCH_SIZES[-1]
+    columns = _varied_forms(n)
+    results[f'batch.evaluate_timeline.monthly.{n}'] = measure(
+        lambda: evaluate_timeline(columns, 'monthly'), repeats, items=n)
+    return results
+
+
+def bench_simulation(repeats, quick):
+    """蒙特卡洛风险模拟吞吐量（单进程）"""
+    from risk_simulation import run_risk_simulation
+
+    n_paths = 20000 if quick else 100000
+    data = default_form_data()
+    func = lambda: run_risk_simulation(data, n_paths=n_paths, workers=1)
+    return {f'simulation.paths.{n_paths}': measure(func, max(1, repeats // 2), items=n_paths)}
+
+
+def _chart(use_blit):
+    """离屏 Agg 画布上的阶段图表"""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from stage_chart import StageChart
+
+    figure = Figure(figsize=(12, 8), dpi=100)
+    FigureCanvasAgg(figure)
+    chart = StageChart(figure.add_subplot(111), font_family='DejaVu Sans', use_blit=use_blit)
+    figure.canvas.draw()
+    return chart
+
+
+def bench_chart(repeats, quick):
+    """update_chart：完整重绘，以及坐标范围不变时的 blitting 更新"""
+    results_a = perform_analysis(default_form_data())
+    data_b = default_form_data()
+    data_b['salaryA'] *= 1.05
+    results_b = perform_analysis(data_b)
+
+    def alternate(chart):
+        state = {'flip': False}
+
+        def update():
+            state['flip'] = not state['flip']
+            chart.update(results_a if state['flip'] else results_b)
+        return update
+
+    full_chart = _chart(use_blit=False)
+    blit_chart = _chart(use_blit=True)
+    blit_chart.update(results_a)
+    return {
+        'chart.update.full_draw': measure(alternate(full_chart), repeats),
+        'chart.update.blit': measure(alternate(blit_chart), repeats),
+    }
+
+
+def bench_preset(repeats, quick):
+    """加载预设并计算：apply_preset + 规范化键 + 计算（缓存未命中）+ 图表更新"""
+    from result_cache import AnalysisCache, canonical_key
+
+    chart = _chart(use_blit=True)
+    presets = list(PRESETS)
+    state = {'index': 0}
+
+    def load_and_calculate():
+        data = default_form_data()
+        apply_preset(data, presets[state['index'] % len(presets)])
+        state['index'] += 1
+        cache = AnalysisCache()
+        result = cache.get_or_compute(data, perform_analysis, canonical_key(data))
+        chart.update(result)
+
+    return {'gui.load_preset_calculate': measure(load_and_calculate, repeats)}
+
+
+def bench_imports(repeats, quick, modules=IMPORT_MODULES):
+    """各模块在全新解释器中的导入耗时（不含解释器启动）"""
+    results = {}
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, MPLBACKEND='Agg')
+    for module in modules:
+        def run(*extra):
+            completed = subprocess.run([sys.executable, '-c', IMPORT_SNIPPET, module, *extra], cwd=cwd, env=env,
+                                       capture_output=True, text=True)
+            if completed.returncode != 0:
+                raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+            return json.loads(completed.stdout.strip().splitlines()[-1])
+
+        try:
+            seconds = [run()['seconds'] for _ in range(max(1, repeats // 2 if quick else repeats))]
+            peak = run('memory')['peakKb']
+        except RuntimeError as e:
+            print(f"⚠️ 跳过 import.{module}: {e}")
+            continue
+        results[f'import.{module}'] = {
+            'seconds': min(seconds),
+            'median': statistics.median(seconds),
+            'repeats': len(seconds),
+            'number': 1,
+            'items': 1,
+            'itemsPerSecond': 1 / min(seconds),
+            'peakKb': peak,
+        }
+    return results
+
+
+def bench_records(repeats, quick):
+    """嵌套字典与紧凑记录对比：保存 N 个家庭的输入 / 结果的峰值内存，以及批量计算耗时"""
+    from batch_engine import analyze_batch
+    from records import HouseholdRecord, StageResult, analyze_records
+
+    n = QUICK_BATCH_SIZES[0] if quick else QUICK_BATCH_SIZES[-1]
+    rng = np.random.default_rng(0)
+    form_datas = []
+    for salary in rng.uniform(8000, 40000, n):
+        data = default_form_data()
+        data['salaryA'] = float(salary)
+        form_datas.append(data)
+    records = [HouseholdRecord.from_form_data(data) for data in form_datas]
+    dict_results = analyze_batch(form_datas)
+
+    return {
+        f'records.store.form_data.{n}': measure(lambda: [json.loads(json.dumps(d)) for d in form_datas],
+                                                repeats, items=n),
+        f'records.store.household_record.{n}': measure(
+            lambda: [HouseholdRecord.from_form_data(d) for d in form_datas], repeats, items=n),
+        f'records.store.result_dict.{n}': measure(lambda: json.loads(json.dumps(dict_results)), repeats, items=n),
+        f'records.store.stage_result.{n}': measure(
+            lambda: [StageResult.from_result(r) for r in dict_results], repeats, items=n),
+        f'records.analyze_batch.{n}': measure(lambda: analyze_batch(form_datas), repeats, items=n),
+        f'records.analyze_records.{n}': measure(lambda: analyze_records(records), repeats, items=n),
+    }
+
+
+BENCHMARK_GROUPS = {
+    'scalar': bench_scalar,
+    'batch': bench_batch,
+    'simulation': bench_simulation,
+    'chart': bench_chart,
+    'gui': bench_preset,
+    'records': bench_records,
+    'import': bench_imports,
+}
+
+
+def run_benchmarks(groups=None, repeats=DEFAULT_REPEATS, quick=False):
+    """运行各组基准测试，返回 {'meta': 环境信息, 'results': {名称: 测量结果}}"""
+    results = {}
+    for name in groups or BENCHMARK_GROUPS:
+        results.update(BENCHMARK_GROUPS[name](repeats, quick))
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpuCount': os.cpu_count(),
+            'repeats': repeats,
+            'quick': quick,
+        },
+        'results': results,
+    }
+
+
+def compare_to_baseline(report, baseline, threshold=DEFAULT_THRESHOLD, memory_threshold=None):
+    """与基线比较，返回 [(名称, 指标, 基线值, 当前值, 变化百分比, 是否回退)]
+
+    耗时比较最短耗时（受干扰最小），内存比较峰值；只比较两边都有的项目。
+    """
+    memory_threshold = threshold if memory_threshold is None else memory_threshold
+    rows = []
+    for name, current in report['results'].items():
+        previous = baseline['results'].get(name)
+        if previous is None:
+            continue
+        for metric, limit in (('seconds', threshold), ('peakKb', memory_threshold)):
+            before, after = previous.get(metric), current.get(metric)
+            if not before or after is None:
+                continue
+            change = (after / before - 1) * 100
+            rows.append((name, metric, before, after, change, change > limit))
+    return rows
+
+
+def format_report(report):
+    """格式化为文本表格"""
+    width = max([len(name) for name in report['results']] + [10]) + 2
+    lines = [f"{'项目':<{width - 2}}{'最短(ms)':>12}{'中位(ms)':>12}{'吞吐量(/s)':>14}{'峰值内存(KB)':>14}"]
+    for name, row in report['results'].items():
+        lines.append(f"{name:<{width}}{row['seconds'] * 1000:>12.3f}{row['median'] * 1000:>12.3f}"
+                     f"{row['itemsPerSecond']:>14,.0f}{row['peakKb']:>14.0f}")
+    return "\n".join(lines)
+
+
+def format_comparison(rows):
+    """格式化基线比较结果"""
+    lines = []
+    for name, metric, before, after, change, regressed in rows:
+        unit = 'ms' if metric == 'seconds' else 'KB'
+        scale = 1000 if metric == 'seconds' else 1
+        mark = '❌ 回退' if regressed else ''
+        lines.append(f"{name:<40}{unit:>4}{before * scale:>12.3f}{after * scale:>12.3f}{change:>+9.1f}% {mark}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="性能基准测试")
+    parser.add_argument("--groups", nargs="+", choices=list(BENCHMARK_GROUPS), help="只运行指定的组")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help="每项的样本数")
+    parser.add_argument("--quick", action="store_true", help="缩小批量规模和模拟路径数")
+    parser.add_argument("--out", help="将结果保存为JSON")
+    parser.add_argument("--baseline", help="基线JSON文件，比较并在回退时返回退出码 1")
+    parser.add_argument("--save-baseline", help="将本次结果保存为基线")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="耗时回退阈值（百分比）")
+    parser.add_argument("--memory-threshold", type=float, help="峰值内存回退阈值（百分比，默认同 --threshold）")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.groups, args.repeats, args.quick)
+    print(format_report(report))
+
+    for path in (args.out, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            print(f"结果已保存到 {path}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        rows = compare_to_baseline(report, baseline, args.threshold, args.memory_threshold)
+        print(f"\n与基线比较（阈值 {args.threshold:.0f}%）：")
+        print(format_comparison(rows))
+        regressions = [row for row in rows if row[-1]]
+        if regressions:
+            print(f"\n❌ {len(regressions)} 项超过阈值")
+            sys.exit(1)
+        print("\n✅ 没有超过阈值的回退")
@@ -0,0 +1,359 @@
+"""
+本地计算服务
+Local asyncio HTTP service with request micro-batching
+
+只依赖标准库（asyncio）的 HTTP/1.1 服务，把短时间内到达的多个请求合并为一次批量计算：
+
+- POST /analyze    请求体为一份配置（form_data JSON，缺少的字段取默认值），返回 perform_analysis 格式的结果；
+                   JSON 无效或数值字段不是数字时返回 400
+- GET  /metrics    请求数、批次数、批大小、延迟 p50/p95/最大值、吞吐量、结果缓存统计
+- GET  /health     健康检查
+
+合并规则：收到第一个请求后最多再等待 max_wait_ms 毫秒或凑满 max_batch 个请求，然后在后台线程中
+调用一次 batch_engine.analyze_batch（共用 ANALYSIS_CACHE）。计算期间到达的请求进入下一批，
+负载越高批越大。
+
+    python calc_server.py serve --port 8765 --max-batch 256 --max-wait-ms 5
+    python calc_server.py loadgen --port 8765 --concurrency 64 --requests 20000
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from perf_spans import SpanRecorder
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_MAX_BATCH = 256
+DEFAULT_MAX_WAIT_MS = 5.0
+
+MAX_BODY_BYTES = 1024 * 1024
+METRICS_WINDOW = 4096
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+def evaluate_requests(payloads, cache):
+    """解析并计算一批请求体，返回 [(状态码, 响应 JSON 字节)]；在后台线程中执行"""
+    from calculator_engine import default_form_data, perform_analysis, validate_form_data
+    from batch_engine import analyze_batch
+    from scenario_compare import merge_form_data
+
+    responses = [None] * len(payloads)
+    form_datas = []
+    valid = []
+    for i, payload in enumerate(payloads):
+        try:
+            overrides = json.loads(payload)
+            if not isinstance(overrides, dict):
+                raise ValueError(f"请求体应为 JSON 对象，实际为 {type(overrides).__name__}")
+            form_datas.append(validate_form_data(merge_form_data(default_form_data(), overrides)))
+            valid.append(i)
+        except (ValueError, AttributeError) as e:
+            responses[i] = (400, {'error': f"无效的配置：{e}"})
+
+    # 无效的请求已在解析时返回 400，其余请求照常合并为一次批量计算
+    try:
+        results = analyze_batch(form_datas, cache=cache)
+    except Exception:
+        # 整批失败时逐个计算，只让出错的请求返回错误
+        results = []
+        for data in form_datas:
+            try:
+                results.append(perform_analysis(data))
+            except Exception as e:
+                results.append(e)
+    for i, result in zip(valid, results):
+        responses[i] = (500, {'error': str(result)}) if isinstance(result, Exception) else (200, result)
+
+    return [(status, json.dumps(body, ensure_ascii=False).encode('utf-8')) for status, body in responses]
+
+
+class MicroBatcher:
+    """把短时间内到达的请求合并为一次批量计算"""
+
+    def __init__(self, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS, cache=None):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.cache = cache
+        self.queue = asyncio.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.spans = SpanRecorder(window=METRICS_WINDOW)
+        self.batch_sizes = deque(maxlen=METRICS_WINDOW)
+        self.requests = 0
+        self.batches = 0
+        self.started = time.perf_counter()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+        self.executor.shutdown(wait=False)
+
+    async def submit(self, payload):
+        """提交一个请求体，返回 (状态码, 响应字节)"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((payload, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self):
+        """等待第一个请求，再在 max_wait 内最多收集 max_batch 个"""
+        batch = [await self.queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            payloads = [payload for payload, _, _ in batch]
+            start = time.perf_counter()
+            try:
+                responses = await loop.run_in_executor(self.executor, evaluate_requests, payloads, self.cache)
+            except Exception as e:
+                body = json.dumps({'error': str(e)}, ensure_ascii=False).encode('utf-8')
+                responses = [(500, body)] * len(batch)
+            finished = time.perf_counter()
+
+            self.spans.record('batch.compute', finished - start)
+            self.batch_sizes.append(len(batch))
+            self.batches += 1
+            self.requests += len(batch)
+            for (_, future, enqueued), response in zip(batch, responses):
+                self.spans.record('request.queue', start - enqueued)
+                self.spans.record('request.total', finished - enqueued)
+                if not future.done():
+                    future.set_result(response)
+
+    def metrics(self):
+        """延迟（毫秒，最近 METRICS_WINDOW 次）、批大小和吞吐量"""
+        uptime = time.perf_counter() - self.started
+        sizes = list(self.batch_sizes)
+        metrics = {
+            'uptimeSeconds': uptime,
+            'requests': self.requests,
+            'batches': self.batches,
+            'queued': self.queue.qsize(),
+            'maxBatch': self.max_batch,
+            'maxWaitMs': self.max_wait * 1000,
+            'meanBatchSize': sum(sizes) / len(sizes) if sizes else 0.0,
+            'largestBatch': max(sizes) if sizes else 0,
+            'requestsPerSecond': self.requests / uptime if uptime else 0.0,
+            'latencyMs': self.spans.summary(),
+        }
+        if self.cache is not None:
+            metrics['cache'] = self.cache.stats()
+        return metrics
+
+
+async def read_request(reader):
+    """读取一个 HTTP/1.1 请求，返回 (方法, 路径, 头, 请求体)；连接关闭时返回 None"""
+    line = await reader.readline()
+    if not line:
+        return None
+    method, path, _ = line.decode('latin-1').split(' ', 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get('content-length', 0))
+    if length > MAX_BODY_BYTES:
+        raise ValueError('请求体过大')
+    body = await reader.readexactly(length) if length else b''
+    return method, path, headers, body
+
+
+def http_response(status, body, keep_alive=True):
+    """组装 JSON 响应"""
+    head = (f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode('latin-1') + body
+
+
+def json_body(data):
+    return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+
+class CalcServer:
+    """计算服务：HTTP 连接处理 + MicroBatcher"""
+
+    def __init__(self, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS, use_cache=True):
+        from result_cache import ANALYSIS_CACHE
+        self.batcher = MicroBatcher(max_batch, max_wait_ms, ANALYSIS_CACHE if use_cache else None)
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except (ValueError, asyncio.IncompleteReadError) as e:
+                    writer.write(http_response(413 if '过大' in str(e) else 400, json_body({'error': str(e)}), False))
+                    break
+                if request is None:
+                    break
+
+                method, path, headers, body = request
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                path = path.split('?', 1)[0]
+                if path == '/analyze':
+                    if method == 'POST':
+                        status, response = await self.batcher.submit(body)
+                    else:
+                        status, response = 405, json_body({'error': '请使用 POST'})
+                elif path == '/metrics':
+                    status, response = 200, json_body(self.batcher.metrics())
+                elif path == '/health':
+                    status, response = 200, json_body({'status': 'ok'})
+                else:
+                    status, response = 404, json_body({'error': f"未知路径 {path}"})
+
+                writer.write(http_response(status, response, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.batcher.start()
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"计算服务已启动：http://{host}:{port}  (max_batch={self.batcher.max_batch}, "
+              f"max_wait={self.batcher.max_wait * 1000:.1f}ms)")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.batcher.stop()
+
+
+async def _client(host, port, bodies, latencies, statuses):
+    """一个保持连接的客户端，依次发送 bodies 中的请求"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for body in bodies:
+            request = (f"POST /analyze HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                       f"Content-Length: {len(body)}\r\n\r\n").encode('latin-1') + body
+            start = time.perf_counter()
+            writer.write(request)
+            status_line = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                if line.lower().startswith(b'content-length:'):
+                    length = int(line.split(b':', 1)[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            statuses[int(status_line.split()[1])] = statuses.get(int(status_line.split()[1]), 0) + 1
+    finally:
+        writer.close()
+
+
+async def _fetch_json(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode('latin-1'))
+    data = await reader.read()
+    writer.close()
+    return json.loads(data.split(b'\r\n\r\n', 1)[1])
+
+
+async def run_loadgen(host=DEFAULT_HOST, port=DEFAULT_PORT, concurrency=64, requests=10000, distinct=None, seed=0):
+    """本地负载生成：concurrency 个保持连接的客户端共发送 requests 个请求，返回吞吐量和延迟统计
+
+    distinct: 不同配置的个数（默认每个请求都不同，全部缓存未命中）
+    """
+    import random
+    rng = random.Random(seed)
+    distinct = distinct or requests
+    variants = [json_body({'salaryA': rng.randint(8000, 40000), 'salaryB': rng.randint(6000, 30000),
+                           'monthlyMortgage': rng.randint(2000, 15000)}) for _ in range(distinct)]
+    bodies = [variants[i % distinct] for i in range(requests)]
+
+    latencies = []
+    statuses = {}
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, bodies[i::concurrency], latencies, statuses)
+                           for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'concurrency': concurrency,
+        'seconds': elapsed,
+        'requestsPerSecond': len(latencies) / elapsed,
+        'statuses': statuses,
+        'latencyMs': {
+            'p50': latencies[len(latencies) // 2] * 1000,
+            'p95': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+            'max': latencies[-1] * 1000,
+        },
+        'server': await _fetch_json(host, port, '/metrics'),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="本地计算服务（请求合并批量计算）")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="启动服务")
+    serve_parser.add_argument("--host", default=DEFAULT_HOST)
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH, help="每批最多请求数")
+    serve_parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS, help="凑批最长等待时间（毫秒）")
+    serve_parser.add_argument("--no-cache", action="store_true", help="不使用结果缓存")
+
+    load_parser = subparsers.add_parser("loadgen", help="对本地服务施加负载")
+    load_parser.add_argument("--host", default=DEFAULT_HOST)
+    load_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    load_parser.add_argument("--concurrency", type=int, default=64, help="并发连接数")
+    load_parser.add_argument("--requests", type=int, default=10000, help="请求总数")
+    load_parser.add_argument("--distinct", type=int, help="不同配置的个数（默认全部不同）")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        server = CalcServer(args.max_batch, args.max_wait_ms, use_cache=not args.no_cache)
+        try:
+            asyncio.run(server.serve(args.host, args.port))
+        except KeyboardInterrupt:
+            print("服务已停止")
+    else:
+        report = asyncio.run(run_loadgen(args.host, args.port, args.concurrency, args.requests, args.distinct))
+        server_metrics = report.pop('server')
+        print(f"{report['requests']} 个请求，{report['concurrency']} 个连接，耗时 {report['seconds']:.2f}s，"
+              f"{report['requestsPerSecond']:,.0f} 请求/秒，状态码 {report['statuses']}")
+        print(f"客户端延迟(ms): p50 {report['latencyMs']['p50']:.1f} / p95 {report['latencyMs']['p95']:.1f} / "
+              f"最大 {report['latencyMs']['max']:.1f}")
+        print(f"服务端：{server_metrics['batches']} 批，平均批大小 {server_metrics['meanBatchSize']:.1f}，"
+              f"最大批 {server_metrics['largestBatch']}")
@@ -0,0 +1,521 @@
+"""
+结婚生育成本计算引擎
+Marriage & Parenting Cost Calculation Engine
+
+纯计算模块：输入为普通的 form_data 字典，输出为分析结果字典。
+不依赖 tkinter / customtkinter / matplotlib，可在脚本和服务器环境中直接调用。
+"""
+
+import copy
+import math
+
+# 生命周期阶段定义（第0阶段为结婚准备期）
+STAGES = (
+    {'name': '结婚准备', 'years': 1, 'isMarriageStage': True},
+    {'name': '0-3岁', 'years': 3},
+    {'name': '3-6岁', 'years': 3},
+    {'name': '6-12岁', 'years': 6},
+    {'name': '12-15岁', 'years': 3},
+    {'name': '15-18岁', 'years': 3},
+)
+
+# 图表序列名称（与 chartData 中的键保持一致）
+CHART_SERIES = ('净现金流', '资产增值贬值', '结婚生育成本', '投资与支持', '综合家庭损益')
+
+MARRIAGE_COST_LABELS = {
+    'betrothalGift': '彩礼',
+    'weddingCeremony': '婚礼',
+    'weddingRing': '钻戒首饰',
+    'honeymoon': '蜜月旅行',
+    'newHouseDownPayment': '新房首付',
+    'renovation': '装修'
+}
+
+CHILD_COST_LABELS = {
+    'prenatalCare': '产检费用',
+    'delivery': '分娩费用',
+    'postpartumCare': '月子中心',
+    'monthlyBabyCost': '月均婴儿用品',
+    'kindergarten': '幼儿园3年',
+    'primarySchool': '小学6年',
+    'juniorHigh': '初中3年',
+    'seniorHigh': '高中3年',
+    'university': '本科4年',
+    'extracurricular': '课外辅导'
+}
+
+FIELD_LABELS = {
+    'salaryA': '配偶A月薪',
+    'salaryB': '配偶B月薪',
+    'annualBonus': '年终奖',
+    'incomeStability': '工资稳定性',
+    'propertyValue': '房产总市值',
+    'propertyAppreciation': '预期年化增值率',
+    'monthlyMortgage': '月供总额',
+    'childCount': '孩子数量',
+}
+
+OTHER_PARAM_LABELS = {
+    'annualParentSupport': '父母每年现金支持',
+    'investmentReturn': '投资收益率(%)',
+    'baseLivingCost': '基础生活成本(月)',
+    'livingInflation': '生活通胀率(%)'
+}
+
+DEFAULT_FORM_DATA = {
+    # 收入与稳定性 - 基于2023年国家统计局数据
+    # 2023年全国城镇居民人均可支配收入约49,000元，考虑夫妻二人收入
+    'salaryA': 22000,  # 丈夫月薪（略高于平均水平，基于统计局数据）
+    'salaryB': 18000,  # 妻子月薪
+    'annualBonus': 80000,  # 年终奖合计（基于企业奖金统计）
+    'incomeStability': 82,  # 工资稳定性 (0-100)，基于就业统计
+
+    # 房产资产 - 基于2023年房价数据
+    # 全国平均房价约10,000-15,000元/㎡，考虑120㎡三居室
+    'propertyValue': 1800000,  # 二线城市120㎡房产总价
+    'propertyAppreciation': -1.2,  # 2023年多数城市房价下跌
+    'monthlyMortgage': 6500,  # 相应月供（30年等额本息）
+
+    # 父母支持 - 基于2023年老年人口收入统计
+    # 城镇退休人员月人均养老金约3,500元
+    'annualParentSupport': 35000,  # 父母每年现金支持
+
+    # 结婚成本细分 - 基于2023年婚姻大数据和统计
+    'marriageCosts': {
+        'betrothalGift': 58000,     # 彩礼（二线城市平均，民政局数据）
+        'weddingCeremony': 128000,  # 婚礼（包含酒席、摄影、婚庆，平均水平）
+        'weddingRing': 35000,       # 钻戒首饰（平均水平）
+        'honeymoon': 45000,         # 蜜月旅行（国内外游）
+        'newHouseDownPayment': 360000, # 新房首付（二线城市首付比例30%）
+        'renovation': 180000,       # 装修（硬装+软装，中等标准）
+    },
+
+    # 生育与育儿成本 - 基于2023年统计和相关研究
+    'childCount': 1,
+    'cityTier': 'tier2',
+    'children': [
+        {
+            'prenatalCare': 8500,    # 产检费用（15次检查+营养品）
+            'delivery': 12000,       # 分娩费用（顺产，医保报销后）
+            'postpartumCare': 22000, # 月子中心（42天，平均水平）
+            'monthlyBabyCost': 2200, # 月均婴儿用品（奶粉、尿布、辅食）
+            'kindergarten': 96000,   # 幼儿园3年（公立园+兴趣班）
+            'primarySchool': 180000, # 小学6年（公立教育+校服学杂）
+            'juniorHigh': 156000,    # 初中3年（公立教育+补习）
+            'seniorHigh': 132000,    # 高中3年（公立教育+补习）
+            'university': 720000,    # 本科4年（平均8,000元/年×4+生活费）
+            'extracurricular': 120000, # 课外辅导（英语、奥数等，6年）
+        }
+    ],
+
+    # 生活成本与通胀 - 基于2023年国家统计局CPI数据
+    'baseLivingCost': 6200,    # 基础生活成本（月，房租+水电+交通+通讯）
+    'livingInflation': 2.1,    # 2023年实际CPI涨幅
+    'investmentReturn': 3.8,   # 2023年理财产品平均收益率
+
+    'riskSimulation': False
+}
+
+PRESET_NAMES = {
+    "tier1": "一线城市", "tier2": "二线城市", "tier3": "三线城市",
+    "conservative": "保守型", "aggressive": "激进型", "balanced": "平衡型"
+}
+
+PRESETS = {
+    "tier1": {  # 一线城市 - 基于2023年北京上海数据
+        'salaryA': 28000, 'salaryB': 24000, 'annualBonus': 120000,  # 高收入水平
+        'incomeStability': 78, 'propertyValue': 12000000,  # 北京上海平均房价
+        'propertyAppreciation': 0.2, 'monthlyMortgage': 18000,  # 高房贷压力
+        'annualParentSupport': 60000,  # 高父母支持
+        'marriageCosts': {
+            'betrothalGift': 120000, 'weddingCeremony': 200000,  # 高端婚礼
+            'weddingRing': 60000, 'honeymoon': 80000,  # 豪华蜜月
+            'newHouseDownPayment': 1200000, 'renovation': 400000  # 高房价装修
+        },
+        'children': [{
+            'prenatalCare': 15000, 'delivery': 25000, 'postpartumCare': 35000,
+            'monthlyBabyCost': 3500, 'kindergarten': 240000, 'primarySchool': 480000,
+            'juniorHigh': 360000, 'seniorHigh': 300000, 'university': 1200000,
+            'extracurricular': 200000
+        }],
+        'baseLivingCost': 12000, 'livingInflation': 2.8, 'investmentReturn': 4.5
+    },
+    "tier2": {  # 二线城市 - 基于2023年杭州南京数据
+        'salaryA': 22000, 'salaryB': 18000, 'annualBonus': 80000,  # 中等收入
+        'incomeStability': 82, 'propertyValue': 1800000,  # 2-3万/㎡房价
+        'propertyAppreciation': -1.2, 'monthlyMortgage': 6500,  # 中等房贷
+        'annualParentSupport': 35000,  # 中等父母支持
+        'marriageCosts': {
+            'betrothalGift': 58000, 'weddingCeremony': 128000,  # 中等婚礼
+            'weddingRing': 35000, 'honeymoon': 45000,  # 中等蜜月
+            'newHouseDownPayment': 360000, 'renovation': 180000  # 中等装修
+        },
+        'children': [{
+            'prenatalCare': 8500, 'delivery': 12000, 'postpartumCare': 22000,
+            'monthlyBabyCost': 2200, 'kindergarten': 96000, 'primarySchool': 180000,
+            'juniorHigh': 156000, 'seniorHigh': 132000, 'university': 720000,
+            'extracurricular': 120000
+        }],
+        'baseLivingCost': 6200, 'livingInflation': 2.1, 'investmentReturn': 3.8
+    },
+    "tier3": {  # 三线城市 - 基于2023年普通地级市数据
+        'salaryA': 12000, 'salaryB': 10000, 'annualBonus': 40000,  # 较低收入
+        'incomeStability': 85, 'propertyValue': 800000,  # 6-8千/㎡房价
+        'propertyAppreciation': -1.8, 'monthlyMortgage': 2800,  # 较低房贷
+        'annualParentSupport': 20000,  # 较低父母支持
+        'marriageCosts': {
+            'betrothalGift': 35000, 'weddingCeremony': 68000,  # 简约婚礼
+            'weddingRing': 20000, 'honeymoon': 25000,  # 简单蜜月
+            'newHouseDownPayment': 160000, 'renovation': 90000  # 简单装修
+        },
+        'children': [{
+            'prenatalCare': 5500, 'delivery': 8000, 'postpartumCare': 15000,
+            'monthlyBabyCost': 1600, 'kindergarten': 72000, 'primarySchool': 132000,
+            'juniorHigh': 108000, 'seniorHigh': 96000, 'university': 480000,
+            'extracurricular': 80000
+        }],
+        'baseLivingCost': 4200, 'livingInflation': 2.0, 'investmentReturn': 3.5
+    },
+    "conservative": {  # 保守型 - 低风险偏好，稳定配置
+        'salaryA': 16000, 'salaryB': 14000, 'annualBonus': 50000,
+        'incomeStability': 92, 'propertyValue': 1500000,  # 小户型，现金多
+        'propertyAppreciation': -0.8, 'monthlyMortgage': 4500,  # 低杠杆
+        'annualParentSupport': 45000,  # 多父母支持
+        'marriageCosts': {
+            'betrothalGift': 38000, 'weddingCeremony': 88000,  # 节约婚礼
+            'weddingRing': 25000, 'honeymoon': 30000,  # 适中消费
+            'newHouseDownPayment': 300000, 'renovation': 120000  # 简单装修
+        },
+        'children': [{
+            'prenatalCare': 6500, 'delivery': 9500, 'postpartumCare': 18000,
+            'monthlyBabyCost': 1800, 'kindergarten': 72000, 'primarySchool': 144000,
+            'juniorHigh': 120000, 'seniorHigh': 108000, 'university': 600000,
+            'extracurricular': 96000
+        }],
+        'baseLivingCost': 5200, 'livingInflation': 2.0, 'investmentReturn': 3.0
+    },
+    "aggressive": {  # 激进型 - 高风险偏好，激进配置
+        'salaryA': 32000, 'salaryB': 28000, 'annualBonus': 150000,  # 高收入
+        'incomeStability': 65, 'propertyValue': 2800000,  # 大户型，杠杆高
+        'propertyAppreciation': 1.5, 'monthlyMortgage': 11000,  # 高杠杆
+        'annualParentSupport': 25000,  # 少父母支持
+        'marriageCosts': {
+            'betrothalGift': 88000, 'weddingCeremony': 180000,  # 豪华婚礼
+            'weddingRing': 80000, 'honeymoon': 100000,  # 奢侈消费
+            'newHouseDownPayment': 560000, 'renovation': 350000  # 豪华装修
+        },
+        'children': [{
+            'prenatalCare': 12000, 'delivery': 20000, 'postpartumCare': 35000,
+            'monthlyBabyCost': 3200, 'kindergarten': 180000, 'primarySchool': 360000,
+            'juniorHigh': 300000, 'seniorHigh': 240000, 'university': 1200000,
+            'extracurricular': 240000
+        }],
+        'baseLivingCost': 9200, 'livingInflation': 3.0, 'investmentReturn': 7.0
+    },
+    "balanced": {  # 平衡型 - 稳健配置，均衡发展
+        'salaryA': 24000, 'salaryB': 20000, 'annualBonus': 90000,  # 中高收入
+        'incomeStability': 80, 'propertyValue': 2200000,  # 舒适户型
+        'propertyAppreciation': 0.3, 'monthlyMortgage': 7800,  # 中等杠杆
+        'annualParentSupport': 38000,  # 中等父母支持
+        'marriageCosts': {
+            'betrothalGift': 65000, 'weddingCeremony': 135000,  # 体面婚礼
+            'weddingRing': 45000, 'honeymoon': 55000,  # 品质消费
+            'newHouseDownPayment': 440000, 'renovation': 220000  # 舒适装修
+        },
+        'children': [{
+            'prenatalCare': 9500, 'delivery': 14000, 'postpartumCare': 26000,
+            'monthlyBabyCost': 2500, 'kindergarten': 120000, 'primarySchool': 240000,
+            'juniorHigh': 192000, 'seniorHigh': 168000, 'university': 960000,
+            'extracurricular': 144000
+        }],
+        'baseLivingCost': 7200, 'livingInflation': 2.3, 'investmentReturn': 4.5
+    }
+}
+
+
+# 所有数值型输入的字段路径（嵌套字段用 "marriageCosts.xxx" / "children[0].xxx" 表示）
+FIELD_PATHS = (
+    ('salaryA', 'salaryB', 'annualBonus', 'incomeStability',
+     'propertyValue', 'propertyAppreciation', 'monthlyMortgage',
+     'annualParentSupport')
+    + tuple(f'marriageCosts.{key}' for key in MARRIAGE_COST_LABELS)
+    + ('childCount',)
+    + tuple(f'children[0].{key}' for key in CHILD_COST_LABELS)
+    + tuple(OTHER_PARAM_LABELS)
+)
+
+
+def parse_field_path(path):
+    """将字段路径拆分为键序列，如 "children[0].delivery" -> ['children', 0, 'delivery']"""
+    parts = []
+    for token in path.split('.'):
+        if '[' in token:
+            name, _, rest = token.partition('[')
+            if name:
+                parts.append(name)
+            for index in rest.rstrip(']').split(']['):
+                parts.append(int(index))
+        else:
+            parts.append(token)
+    return parts
+
+
+def get_field(data, path):
+    """按字段路径读取 form_data 中的值"""
+    value = data
+    for key in parse_field_path(path):
+        value = value[key]
+    return value
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def validate_form_data(data):
+    """检查 FIELD_PATHS 中的字段以及每个孩子填写的成本项都是有限的数字，否则抛出 ValueError
+
+    用于解析外部输入（JSON 请求、配置文件）：类型错误的输入在进入批量计算之前被拒绝，
+    不会让整批计算失败。
+    """
+    for path in FIELD_PATHS:
+        try:
+            value = get_field(data, path)
+        except (KeyError, IndexError, TypeError):
+            raise ValueError(f"缺少字段 {path}") from None
+        if not _is_number(value):
+            raise ValueError(f"{field_label(path)}（{path}）应为数字，实际为 {value!r}")
+    for j, child in enumerate(data['children']):
+        if not isinstance(child, dict):
+            raise ValueError(f"children[{j}] 应为 JSON 对象，实际为 {child!r}")
+        for key, value in child.items():
+            if key in CHILD_COST_LABELS or key == 'birthOffset':
+                if not _is_number(value):
+                    raise ValueError(f"{field_label(key)}（children[{j}].{key}）应为数字，实际为 {value!r}")
+    return data
+
+
+def set_field(data, path, value):
+    """按字段路径写入 form_data 中的值（原地修改）"""
+    keys = parse_field_path(path)
+    target = data
+    for key in keys[:-1]:
+        target = target[key]
+    target[keys[-1]] = value
+
+
+def field_label(path):
+    """返回字段路径对应的中文名称"""
+    key = parse_field_path(path)[-1]
+    for labels in (MARRIAGE_COST_LABELS, CHILD_COST_LABELS, OTHER_PARAM_LABELS, FIELD_LABELS):
+        if key in labels:
+            return labels[key]
+    return path
+
+
+def default_form_data():
+    """返回一份默认参数（二线城市基准配置）的副本"""
+    return copy.deepcopy(DEFAULT_FORM_DATA)
+
+
+def apply_preset(form_data, preset_type):
+    """将预设配置合并到 form_data 中（原地修改），返回是否找到该预设"""
+    if preset_type not in PRESETS:
+        return False
+
+    for key, value in PRESETS[preset_type].items():
+        if key in form_data:
+            if isinstance(value, dict):
+                form_data[key].update(value)
+            else:
+                form_data[key] = copy.deepcopy(value)
+    return True
+
+
+def portfolio_gain(balance, net_cash_flow, rate, growth, year_count):
+    """家庭组合账户在一个阶段内的投资收益
+
+    期初余额按 growth = (1 + rate) ** year_count 复利；阶段净现金流按年均匀存入（为负时取出），
+    每笔按剩余年数复利到阶段末。阶段末余额 = balance + net_cash_flow + 收益。
+    余额为负时视为按同一利率借款。
+    """
+    annuity = (growth - 1) / (rate * year_count) if rate != 0 and year_count != 1 else 1
+    return balance * (growth - 1) + net_cash_flow * (annuity - 1)
+
+
+def counted_children(data):
+    """计入的孩子条目：前 ceil(childCount) 项（至少一项；列表不够长时多出的孩子沿用最后一项）"""
+    children = data['children']
+    return children[:max(1, math.ceil(data['childCount']))]
+
+
+def _child_profile(child):
+    """孩子的成本和出生时间（birthOffset 为 0 与未设置相同）"""
+    return {key: value for key, value in child.items() if not (key == 'birthOffset' and not value)}
+
+
+def uses_timeline(data):
+    """是否需要时间网格引擎：设置了 timeResolution，或计入的孩子中有出生时间不同 / 成本与第一个孩子不同的
+
+    多个完全相同的孩子与"第一个孩子的成本 × childCount"是同一个家庭，仍按 6 个固定阶段计算。
+    """
+    if data.get('timeResolution'):
+        return True
+    children = counted_children(data)
+    if any(child.get('birthOffset') for child in children):
+        return True
+    first = _child_profile(children[0])
+    return any(_child_profile(child) != first for child in children[1:])
+
+
+def perform_analysis(data):
+    """执行财务分析计算
+
+    form_data 中设置了 timeResolution（'yearly' / 'monthly'），或 children 中有多个不同的孩子
+    （各自的成本和出生时间 birthOffset，见 uses_timeline）时使用时间网格引擎，否则按 6 个固定阶段计算。
+    """
+    if uses_timeline(data):
+        # 按需导入 NumPy 版的时间网格引擎
+        from timeline_engine import analyze_timeline
+        result = analyze_timeline(data)
+    else:
+        result = analyze_stages(data)
+
+    # 风险模拟（按需导入 NumPy，保持引擎本身的导入开销很小）；时间网格的配置不做模拟，只记录原因，
+    # 避免附上描述另一个家庭的分位数区间
+    if data.get('riskSimulation'):
+        from risk_simulation import run_risk_simulation, TIMELINE_NOT_SUPPORTED
+        if uses_timeline(data):
+            result['riskSimulationSkipped'] = TIMELINE_NOT_SUPPORTED
+        else:
+            result['riskSimulation'] = run_risk_simulation(data)
+
+    return result
+
+
+def analyze_stages(data):
+    """按 6 个固定阶段执行财务分析"""
+    # 结婚总成本
+    total_marriage_cost = sum(data['marriageCosts'].values())
+
+    # 计算每个孩子的总教育成本
+    child = data['children'][0]
+    child_education_cost = (
+        child['prenatalCare'] + child['delivery'] + child['postpartumCare'] +
+        child['monthlyBabyCost'] * 12 * 3 +  # 3年婴儿期
+        child['kindergarten'] + child['primarySchool'] + child['juniorHigh'] +
+        child['seniorHigh'] + child['university'] + child['extracurricular']
+    )
+
+    total_child_cost = child_education_cost * data['childCount']
+    total_cost = total_marriage_cost + total_child_cost
+
+    # 房贷还款计划（设置了 mortgage 时代替 monthlyMortgage，按需导入 NumPy）
+    schedule = None
+    if data.get('mortgage'):
+        from mortgage import loan_schedule
+        schedule = loan_schedule(data['mortgage'])
+    months_paid = 0
+
+    current_property_value = data['propertyValue']
+    total_net_assets_change = -total_marriage_cost
+    min_cash_flow_surplus = float('inf')
+    # 家庭组合账户：净现金流存入（取出），余额按投资收益率复利
+    portfolio = 0
+
+    chart_data = []
+
+    for idx, stage in enumerate(STAGES):
+        year_count = stage['years']
+        elapsed_years = max(0, (idx - 1) * 3)
+        is_marriage_stage = stage.get('isMarriageStage', False)
+
+        # 收入计算
+        annual_income_base = (data['salaryA'] + data['salaryB']) * 12 + data['annualBonus']
+        effective_annual_income = annual_income_base * (data['incomeStability'] / 100)
+        stage_income = 0 if is_marriage_stage else effective_annual_income * year_count
+
+        # 支出计算
+        stage_living_cost = 0 if is_marriage_stage else data['baseLivingCost'] * 12 * year_count * (1 + data['livingInflation']/100) ** elapsed_years
+        stage_mortgage = 0 if is_marriage_stage else data['monthlyMortgage'] * 12 * year_count
+        # 还本部分计入房产净值的增加
+        stage_equity_gain = 0
+        if schedule is not None and not is_marriage_stage:
+            stage_months = slice(months_paid, months_paid + year_count * 12)
+            stage_mortgage = float(schedule['payment'][stage_months].sum())
+            stage_equity_gain = float(schedule['principal'][stage_months].sum())
+            months_paid += year_count * 12
+
+        # 育儿成本
+        stage_child_cost = 0
+        if not is_marriage_stage:
+            if idx == 1:  # 0-3岁
+                stage_child_cost = (child['prenatalCare'] + child['delivery'] + child['postpartumCare'] + child['monthlyBabyCost'] * 12 * 3) * data['childCount']
+            elif idx == 2:  # 3-6岁
+                stage_child_cost = child['kindergarten'] * data['childCount']
+            elif idx == 3:  # 6-12岁
+                stage_child_cost = child['primarySchool'] * data['childCount']
+            elif idx == 4:  # 12-15岁
+                stage_child_cost = child['juniorHigh'] * data['childCount']
+            elif idx == 5:  # 15-18岁
+                stage_child_cost = (child['seniorHigh'] + child['extracurricular']) * data['childCount']
+
+            stage_child_cost *= (1 + data['livingInflation']/100) ** elapsed_years
+
+        # 结婚成本
+        stage_marriage_cost = total_marriage_cost if is_marriage_stage else 0
+
+        # 房产增值
+        property_value_at_end = current_property_value * (1 + data['propertyAppreciation']/100) ** year_count
+        stage_property_gain = property_value_at_end - current_property_value + stage_equity_gain
+        current_property_value = property_value_at_end
+
+        # 父母支持
+        stage_support = 0 if is_marriage_stage else data['annualParentSupport'] * year_count
+
+        # 净现金流
+        net_cash_flow = stage_income + stage_support - stage_living_cost - stage_mortgage - stage_child_cost - stage_marriage_cost
+
+        # 投资收益：组合账户复利
+        stage_invest_gain = portfolio_gain(portfolio, net_cash_flow, data['investmentReturn'] / 100,
+                                           (1 + data['investmentReturn'] / 100) ** year_count, year_count)
+        portfolio = portfolio + net_cash_flow + stage_invest_gain
+
+        # 总损益
+        total_economic_gain = net_cash_flow + stage_property_gain + stage_invest_gain
+
+        if not is_marriage_stage and net_cash_flow < min_cash_flow_surplus:
+            min_cash_flow_surplus = net_cash_flow
+
+        total_net_assets_change += total_economic_gain
+
+        chart_data.append({
+            'name': stage['name'],
+            '净现金流': net_cash_flow,
+            '资产增值贬值': stage_property_gain,
+            '结婚生育成本': stage_marriage_cost + stage_child_cost,
+            '投资与支持': stage_invest_gain + stage_support,
+            '综合家庭损益': total_economic_gain,
+            'isMarriageStage': is_marriage_stage
+        })
+
+    # 计算抗风险系数
+    monthly_income = (data['salaryA'] + data['salaryB'] + data['annualParentSupport']/12)
+    monthly_mortgage = float(schedule['payment'][0]) if schedule is not None else data['monthlyMortgage']
+    monthly_expenses = monthly_mortgage + data['baseLivingCost']
+    risk_coefficient = monthly_income / monthly_expenses if monthly_expenses > 0 else 0
+
+    result = {
+        'chartData': chart_data,
+        'totalNetAssetsChange': total_net_assets_change,
+        'minCashFlowSurplus': min_cash_flow_surplus if min_cash_flow_surplus != float('inf') else 0,
+        'totalMarriageCost': total_marriage_cost,
+        'childEducationCost': total_child_cost,
+        'totalCost': total_cost,
+        'riskCoefficient': risk_coefficient,
+        'endingPortfolio': portfolio
+    }
+    if schedule is not None:
+        from mortgage import mortgage_summary
+        result['mortgage'] = mortgage_summary(schedule, months_paid, current_property_value)
+    return result
@@ -0,0 +1,101 @@
+"""
+图表字体设置
+Chinese font resolution for matplotlib charts
+
+界面和离屏渲染（chart_renderer）共用。按优先级查找已安装的中文字体，解析结果缓存在 matplotlib 缓存目录中，
+已安装字体变化时自动失效。只在调用时导入 matplotlib。
+"""
+
+import hashlib
+import json
+import os
+
+# 字体解析结果缓存在 matplotlib 缓存目录中，已安装字体变化时自动失效
+FONT_CACHE_FILE = "marriage_calculator_fonts.json"
+
+# 优先级排序的中文字体列表
+CHINESE_FONTS = [
+    'SimHei',           # 黑体 (Windows)
+    'Microsoft YaHei',  # 微软雅黑 (Windows)
+    'PingFang SC',      # 苹方 (macOS)
+    'Hiragino Sans GB', # 冬青黑体 (macOS)
+    'WenQuanYi Micro Hei', # 文泉驿微米黑 (Linux)
+    'AR PL UMing CN',   # 文鼎 (Linux)
+    'DejaVu Sans',      # 备用英文字体
+    'Arial Unicode MS', # 备用
+]
+
+
+def font_fingerprint(ttflist):
+    """已安装字体集合的指纹（字体文件路径 + 名称）"""
+    digest = hashlib.sha256()
+    for fname, name in sorted((f.fname, f.name) for f in ttflist):
+        digest.update(f"{fname}|{name}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def resolve_fonts(ttflist):
+    """扫描已安装字体，返回可用的候选字体（按优先级）"""
+    available_fonts = {f.name.lower() for f in ttflist}
+    return [font for font in CHINESE_FONTS if any(font.lower() in af for af in available_fonts)]
+
+
+def load_font_cache(path, fingerprint):
+    """读取字体缓存，指纹不一致或文件损坏时返回 None"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        if cache.get('fingerprint') == fingerprint:
+            return cache['fonts']
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+
+def save_font_cache(path, fingerprint, fonts):
+    """保存字体缓存（写入失败不影响使用）"""
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({'fingerprint': fingerprint, 'fonts': fonts}, f, ensure_ascii=False)
+    except OSError as e:
+        print(f"字体缓存保存失败: {e}")
+
+
+def setup_matplotlib_fonts(verbose=True):
+    """设置matplotlib字体，确保图表文字正常显示；返回可用的中文字体列表（为空表示使用英文）"""
+    import matplotlib
+    import matplotlib.font_manager as fm
+
+    try:
+        # 指纹未变化时直接使用上次的解析结果，跳过字体扫描
+        cache_path = os.path.join(matplotlib.get_cachedir(), FONT_CACHE_FILE)
+        fingerprint = font_fingerprint(fm.fontManager.ttflist)
+        usable_fonts = load_font_cache(cache_path, fingerprint)
+        if usable_fonts is None:
+            usable_fonts = resolve_fonts(fm.fontManager.ttflist)
+            save_font_cache(cache_path, fingerprint, usable_fonts)
+    except Exception as e:
+        print(f"字体设置失败: {e}")
+        usable_fonts = []
+
+    # 统一设置字体相关的 rcParams
+    matplotlib.rcParams['axes.unicode_minus'] = False
+    if usable_fonts:
+        matplotlib.rcParams.update({
+            'font.family': 'sans-serif',
+            'font.sans-serif': usable_fonts + [f for f in ('DejaVu Sans', 'Arial') if f not in usable_fonts],
+            'axes.titlesize': 14,
+            'axes.titleweight': 'bold',
+            'axes.labelsize': 11,
+            'axes.labelweight': 'bold',
+            'xtick.labelsize': 10,
+            'ytick.labelsize': 10,
+        })
+        if verbose:
+            print(f"使用字体: {usable_fonts[0]}")
+    else:
+        # 如果没有中文字体，使用英文并设置备用字体
+        matplotlib.rcParams['font.sans-serif'] = ['DejaVu Sans', 'Arial', 'Helvetica']
+        if verbose:
+            print("未找到中文字体，使用英文标签")
+    return usable_fonts
@@ -0,0 +1,224 @@
+"""
+离屏图表渲染
+Off-screen rendering of the stage chart to PNG / SVG
+
+用 Agg 画布（不需要 Tk 和显示器）绘制与界面相同的"家庭财务损益分析"图表（stage_chart.StageChart），
+输出 PNG 或 SVG 字节，可用于报告和批量导出。
+
+- 渲染结果按输入哈希（规范化 form_data 的 SHA-256 + 渲染参数）缓存在磁盘上，未修改的方案不会重新渲染
+- 批量渲染时先用一次 analyze_batch 计算所有未命中的方案，再把绘图分给多个进程
+  （workers 与 risk_simulation 相同：1 为当前进程，0 为全部CPU核心）
+"""
+
+import hashlib
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+FORMATS = ('png', 'svg')
+DEFAULT_FIGSIZE = (12, 7)
+DEFAULT_DPI = 100
+
+# 渲染方式变化时修改版本号，使旧的缓存失效
+RENDER_VERSION = 1
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'marriage_calculator', 'charts')
+
+# 每个进程任务渲染的图表数
+RENDER_CHUNK_SIZE = 8
+
+_FONT_FAMILY = None
+
+
+def _font_family():
+    """第一次渲染时设置中文字体（只设置 rcParams，不切换后端），返回图表字体"""
+    global _FONT_FAMILY
+    if _FONT_FAMILY is None:
+        from chart_fonts import setup_matplotlib_fonts
+        usable_fonts = setup_matplotlib_fonts(verbose=False)
+        _FONT_FAMILY = usable_fonts[0] if usable_fonts else 'DejaVu Sans'
+    return _FONT_FAMILY
+
+
+def render_options(fmt='png', dpi=DEFAULT_DPI, figsize=DEFAULT_FIGSIZE):
+    """检查并规范化渲染参数"""
+    if fmt not in FORMATS:
+        raise ValueError(f"不支持的图片格式：{fmt}（可选 {', '.join(FORMATS)}）")
+    return {'format': fmt, 'dpi': int(dpi), 'figsize': [float(v) for v in figsize], 'version': RENDER_VERSION}
+
+
+def render_key(form_data, options):
+    """缓存键：规范化 form_data 的哈希 + 渲染参数"""
+    from result_cache import canonical_key
+    text = canonical_key(form_data) + json.dumps(options, sort_keys=True)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def render_chart(result, fmt='png', dpi=DEFAULT_DPI, figsize=DEFAULT_FIGSIZE):
+    """把一个分析结果绘制为图片，返回 PNG / SVG 字节
+
+    每次使用新的 Figure：输出只取决于本次数据，与之前渲染过什么无关。
+    """
+    import matplotlib
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from stage_chart import StageChart
+
+    options = render_options(fmt, dpi, figsize)
+    chart_data = result['chartData']
+    figure = Figure(figsize=options['figsize'], dpi=options['dpi'])
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot(111)
+    ax.grid(True, alpha=0.3)
+    chart = StageChart(ax, stage_names=[row['name'] for row in chart_data], font_family=_font_family(),
+                       use_blit=False)
+
+    chart.set_data(chart_data, (result.get('riskSimulation') or {}).get('percentileChartData'))
+    figure.tight_layout()
+
+    buffer = io.BytesIO()
+    # 去掉日期等元数据，相同输入得到逐字相同的文件
+    metadata = {'Date': None} if fmt == 'svg' else {'Software': None}
+    with matplotlib.rc_context({'svg.hashsalt': 'marriage-calculator'}):
+        figure.savefig(buffer, format=fmt, metadata=metadata)
+    return buffer.getvalue()
+
+
+def _render_chunk(task):
+    """在工作进程中渲染一批结果"""
+    results, options = task
+    return [render_chart(result, options['format'], options['dpi'], options['figsize']) for result in results]
+
+
+class RenderCache:
+    """按键保存渲染结果的磁盘缓存（key[:2] 子目录 / key.格式）"""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, key, fmt):
+        return os.path.join(self.directory, key[:2], f"{key}.{fmt}")
+
+    def get(self, key, fmt):
+        """读取缓存的图片，未命中返回 None"""
+        try:
+            with open(self.path(key, fmt), 'rb') as f:
+                data = f.read()
+            self.hits += 1
+            return data
+        except OSError:
+            self.misses += 1
+            return None
+
+    def put(self, key, fmt, data):
+        """写入缓存（先写临时文件再替换，并发写入也不会留下不完整的文件）"""
+        path = self.path(key, fmt)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def clear(self):
+        """删除所有缓存的图片"""
+        import shutil
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.hits = 0
+        self.misses = 0
+
+
+def render_form(form_data, fmt='png', dpi=DEFAULT_DPI, figsize=DEFAULT_FIGSIZE, cache=None):
+    """计算并渲染一个方案；传入 cache 时命中则直接返回缓存的图片（不计算也不绘图）"""
+    options = render_options(fmt, dpi, figsize)
+    key = render_key(form_data, options) if cache is not None else None
+    if cache is not None:
+        data = cache.get(key, fmt)
+        if data is not None:
+            return data
+
+    from result_cache import cached_analysis
+    data = render_chart(cached_analysis(form_data), fmt, dpi, figsize)
+    if cache is not None:
+        cache.put(key, fmt, data)
+    return data
+
+
+def render_many(form_datas, fmt='png', dpi=DEFAULT_DPI, figsize=DEFAULT_FIGSIZE, cache=None, workers=0):
+    """批量渲染多个方案，返回与输入顺序相同的图片字节列表
+
+    缓存未命中的方案先合并为一次 analyze_batch 计算，再分块交给 workers 个进程绘图。
+    """
+    form_datas = list(form_datas)
+    options = render_options(fmt, dpi, figsize)
+    images = [None] * len(form_datas)
+    keys = [None] * len(form_datas)
+    if cache is not None:
+        for i, data in enumerate(form_datas):
+            keys[i] = render_key(data, options)
+            images[i] = cache.get(keys[i], fmt)
+
+    missing = [i for i, image in enumerate(images) if image is None]
+    if not missing:
+        return images
+
+    from batch_engine import analyze_batch
+    results = analyze_batch([form_datas[i] for i in missing])
+    chunks = [results[i:i + RENDER_CHUNK_SIZE] for i in range(0, len(results), RENDER_CHUNK_SIZE)]
+    tasks = [(chunk, options) for chunk in chunks]
+
+    workers = int(workers) or os.cpu_count() or 1
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            rendered = [image for chunk in executor.map(_render_chunk, tasks) for image in chunk]
+    else:
+        rendered = [image for task in tasks for image in _render_chunk(task)]
+
+    for i, image in zip(missing, rendered):
+        images[i] = image
+        if cache is not None:
+            cache.put(keys[i], fmt, image)
+    return images
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from scenario_compare import expand_paths, load_scenarios, preset_scenarios
+
+    parser = argparse.ArgumentParser(description="离屏渲染家庭财务损益图表")
+    parser.add_argument("paths", nargs="*", help="方案文件、目录或通配符")
+    parser.add_argument("--presets", action="store_true", help="加入 6 个内置预设")
+    parser.add_argument("--out", default="charts", help="输出目录")
+    parser.add_argument("--format", choices=FORMATS, default="png", help="图片格式")
+    parser.add_argument("--dpi", type=int, default=DEFAULT_DPI)
+    parser.add_argument("--workers", type=int, default=0, help="绘图进程数，1 为单进程，0 为全部CPU核心")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="渲染缓存目录")
+    parser.add_argument("--no-cache", action="store_true", help="不使用渲染缓存")
+    args = parser.parse_args()
+
+    scenarios, errors = load_scenarios(expand_paths(args.paths), workers=1)
+    if args.presets:
+        scenarios += preset_scenarios()
+    for path, error in errors:
+        print(f"⚠️ 跳过 {path}: {error}")
+    if not scenarios:
+        parser.error("没有可渲染的方案（请指定方案文件或 --presets）")
+
+    cache = None if args.no_cache else RenderCache(args.cache_dir)
+    start = time.perf_counter()
+    images = render_many([s['formData'] for s in scenarios], args.format, args.dpi, cache=cache,
+                         workers=args.workers)
+    elapsed = time.perf_counter() - start
+
+    os.makedirs(args.out, exist_ok=True)
+    for scenario, image in zip(scenarios, images):
+        with open(os.path.join(args.out, f"{scenario['name']}.{args.format}"), 'wb') as f:
+            f.write(image)
+
+    hits = cache.hits if cache is not None else 0
+    print(f"{len(images)} 张图表（缓存命中 {hits} 张，新渲染 {len(images) - hits} 张），"
+          f"耗时 {elapsed:.2f}s，已保存到 {args.out}")
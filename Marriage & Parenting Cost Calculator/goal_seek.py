@@ -0,0 +1,182 @@
+"""
+目标求解（盈亏平衡点）
+Goal-seek solver for break-even inputs
+
+给定一个输入字段和对任意结果字段的目标，求使目标恰好成立的输入值，例如：
+- 最低现金流 minCashFlowSurplus >= 0 时，夫妻合计月薪最低是多少
+- 抗风险系数 riskCoefficient >= 1.5 时，月供最高是多少
+
+对 N 个家庭同时做向量化二分：每轮只把尚未收敛的家庭送入批量引擎计算一次。
+求解字段可以是多个字段的组合（如 ('salaryA', 'salaryB')），此时按基准值的比例分配。
+需要时间网格或房贷还款计划的家庭每轮逐个用 perform_analysis 计算。
+"""
+
+import numpy as np
+
+from calculator_engine import FIELD_PATHS, field_label, get_field, set_field, default_form_data
+from batch_engine import form_data_to_columns, evaluate_forms
+
+DEFAULT_TOLERANCE = 0.01
+DEFAULT_MAX_ITER = 100
+MAX_EXPAND = 60
+
+
+def _as_fields(field):
+    """统一为字段路径元组"""
+    fields = (field,) if isinstance(field, str) else tuple(field)
+    for path in fields:
+        if path not in FIELD_PATHS:
+            raise ValueError(f"未知字段: {path}")
+    return fields
+
+
+def field_shares(form_data, field):
+    """组合字段中各字段所占比例（基准值合计为 0 时平均分配）"""
+    fields = _as_fields(field)
+    values = [float(get_field(form_data, path)) for path in fields]
+    total = sum(values)
+    if total == 0:
+        return {path: 1 / len(fields) for path in fields}
+    return {path: value / total for path, value in zip(fields, values)}
+
+
+def apply_solution(form_data, field, value):
+    """将求得的值写回 form_data（组合字段按比例分配，原地修改）"""
+    for path, share in field_shares(form_data, field).items():
+        set_field(form_data, path, value * share)
+
+
+def goal_seek_batch(form_datas, field, metric, target, relation='>=', low=0.0, high=None,
+                    tol=DEFAULT_TOLERANCE, max_iter=DEFAULT_MAX_ITER):
+    """对多个家庭同时求解
+
+    field: 字段路径或字段路径元组（组合字段按基准比例分配）
+    metric: batch_engine.RESULT_FIELDS 中的任一结果字段，如 'minCashFlowSurplus'
+    relation: '>=' 或 '<='，返回的值满足 metric relation target，且位于可行/不可行的边界上
+    low, high: 搜索区间；high 缺省时从基准值的 4 倍（至少为 1）开始逐次翻倍，直到包含边界
+
+    返回: {'value': (N,) 求得的输入值（未找到边界的为 nan）,
+           'metricValue': (N,) 该输入值对应的指标值,
+           'bracketed': (N,) 是否在区间内找到边界,
+           'converged': (N,) 区间宽度是否已小于 tol,
+           'iterations': 二分轮数}
+    """
+    if relation not in ('>=', '<='):
+        raise ValueError(f"relation 只能为 '>=' 或 '<=': {relation}")
+    fields = _as_fields(field)
+    sign = 1.0 if relation == '>=' else -1.0
+
+    form_datas = list(form_datas)
+    columns = form_data_to_columns(form_datas)
+    n = len(columns['salaryA'])
+    base_total = sum(columns[path] for path in fields)
+    shares = {
+        path: np.where(base_total != 0, columns[path] / np.where(base_total != 0, base_total, 1), 1 / len(fields))
+        for path in fields
+    }
+
+    def excess(index, x):
+        """目标余量：>= 0 表示满足条件"""
+        subset = {path: values[index] for path, values in columns.items()}
+        for path in fields:
+            subset[path] = x * shares[path][index]
+        result = evaluate_forms(subset, [form_datas[i] for i in index])
+        return sign * (np.asarray(result[metric]) - target)
+
+    everyone = np.arange(n)
+    a = np.broadcast_to(np.asarray(low, dtype=np.float64), (n,)).copy()
+    if high is None:
+        b = np.maximum(np.abs(base_total) * 4, 1.0)
+        expand = MAX_EXPAND
+    else:
+        b = np.broadcast_to(np.asarray(high, dtype=np.float64), (n,)).copy()
+        expand = 0
+    ga = excess(everyone, a)
+    gb = excess(everyone, b)
+
+    # 区间两端可行性相同时向上扩展上界
+    pending = np.flatnonzero((ga >= 0) == (gb >= 0))
+    for _ in range(expand):
+        if len(pending) == 0:
+            break
+        b[pending] *= 2
+        gb[pending] = excess(pending, b[pending])
+        pending = pending[(ga[pending] >= 0) == (gb[pending] >= 0)]
+
+    bracketed = (ga >= 0) != (gb >= 0)
+    active = np.flatnonzero(bracketed & (np.abs(b - a) > tol))
+    iterations = 0
+    while len(active) and iterations < max_iter:
+        iterations += 1
+        mid = (a[active] + b[active]) / 2
+        gm = excess(active, mid)
+        same_as_a = (gm >= 0) == (ga[active] >= 0)
+        left = active[same_as_a]
+        right = active[~same_as_a]
+        a[left] = mid[same_as_a]
+        ga[left] = gm[same_as_a]
+        b[right] = mid[~same_as_a]
+        gb[right] = gm[~same_as_a]
+        active = active[np.abs(b[active] - a[active]) > tol]
+
+    # 取区间中可行的一端，保证返回值满足条件
+    value = np.where(ga >= 0, a, b)
+    metric_value = sign * np.where(ga >= 0, ga, gb) + target
+    value[~bracketed] = np.nan
+    metric_value[~bracketed] = np.nan
+
+    return {
+        'value': value,
+        'metricValue': metric_value,
+        'bracketed': bracketed,
+        'converged': bracketed & (np.abs(b - a) <= tol),
+        'iterations': iterations,
+    }
+
+
+def goal_seek(form_data, field, metric, target, relation='>=', low=0.0, high=None,
+              tol=DEFAULT_TOLERANCE, max_iter=DEFAULT_MAX_ITER):
+    """单个家庭求解，返回 {'value', 'metricValue', 'bracketed', 'converged', 'iterations'}"""
+    result = goal_seek_batch([form_data], field, metric, target, relation, low, high, tol, max_iter)
+    return {
+        'value': float(result['value'][0]),
+        'metricValue': float(result['metricValue'][0]),
+        'bracketed': bool(result['bracketed'][0]),
+        'converged': bool(result['converged'][0]),
+        'iterations': result['iterations'],
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import time
+
+    parser = argparse.ArgumentParser(description="目标求解（盈亏平衡点）")
+    parser.add_argument("config", nargs="?", help="配置文件路径（默认使用内置二线城市参数）")
+    parser.add_argument("--field", required=True, help="求解字段，多个字段用逗号分隔（按比例分配），如 salaryA,salaryB")
+    parser.add_argument("--metric", required=True, help="目标指标，如 minCashFlowSurplus、riskCoefficient")
+    parser.add_argument("--target", type=float, default=0.0, help="目标值，默认 0")
+    parser.add_argument("--relation", choices=['>=', '<='], default='>=', help="指标与目标值的关系")
+    parser.add_argument("--low", type=float, default=0.0, help="搜索下界")
+    parser.add_argument("--high", type=float, help="搜索上界（默认自动扩展）")
+    parser.add_argument("--tol", type=float, default=DEFAULT_TOLERANCE, help="求解精度")
+    args = parser.parse_args()
+
+    form_data = default_form_data()
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            form_data = json.load(f)
+
+    fields = tuple(path.strip() for path in args.field.split(','))
+    start = time.perf_counter()
+    result = goal_seek(form_data, fields, args.metric, args.target, args.relation, args.low, args.high, args.tol)
+    elapsed = time.perf_counter() - start
+
+    label = " + ".join(field_label(path) for path in fields)
+    if result['bracketed']:
+        print(f"{label} = {result['value']:.2f} 时 {args.metric} = {result['metricValue']:.2f} "
+              f"({args.relation} {args.target})")
+        print(f"二分 {result['iterations']} 轮，耗时 {elapsed * 1000:.2f}ms")
+    else:
+        print(f"在搜索区间内未找到使 {args.metric} {args.relation} {args.target} 的边界")
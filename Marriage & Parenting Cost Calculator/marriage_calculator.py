@@ -1,83 +1,47 @@
+import time
+STARTUP_TIME = time.perf_counter()  # 用于统计首屏显示耗时
+
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import customtkinter as ctk
 from tkinter import scrolledtext
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.font_manager as fm
-import numpy as np
+import copy
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 
-# 设置matplotlib中文字体
-import matplotlib
-matplotlib.use('TkAgg')
-
-def setup_matplotlib_fonts():
-    """设置matplotlib字体，确保图表文字正常显示"""
-    try:
-        # 获取系统可用字体
-        available_fonts = [f.name for f in fm.fontManager.ttflist]
-
-        # 优先级排序的中文字体列表
-        chinese_fonts = [
-            'SimHei',           # 黑体 (Windows)
-            'Microsoft YaHei',  # 微软雅黑 (Windows)
-            'PingFang SC',      # 苹方 (macOS)
-            'Hiragino Sans GB', # 冬青黑体 (macOS)
-            'WenQuanYi Micro Hei', # 文泉驿微米黑 (Linux)
-            'AR PL UMing CN',   # 文鼎 (Linux)
-            'DejaVu Sans',      # 备用英文字体
-            'Arial Unicode MS', # 备用
-        ]
+from calculator_engine import (
+    default_form_data, perform_analysis, apply_preset, PRESET_NAMES,
+    MARRIAGE_COST_LABELS, CHILD_COST_LABELS, OTHER_PARAM_LABELS
+)
+from result_cache import ANALYSIS_CACHE, canonical_key
+from perf_spans import SPANS
+from chart_fonts import setup_matplotlib_fonts
+
+# matplotlib（含 numpy）和字体设置较慢，在第一次需要图表时才加载，见 load_matplotlib
+_MATPLOTLIB = None
+
+def load_matplotlib():
+    """加载matplotlib（TkAgg后端）并设置中文字体，返回 (plt, FigureCanvasTkAgg, 图表字体)；只在第一次调用时执行"""
+    global _MATPLOTLIB
+    if _MATPLOTLIB is not None:
+        return _MATPLOTLIB
 
-        # 找出可用的中文字体
-        usable_fonts = []
-        for font in chinese_fonts:
-            if any(font.lower() in af.lower() for af in available_fonts):
-                usable_fonts.append(font)
-
-        if usable_fonts:
-            plt.rcParams['font.sans-serif'] = usable_fonts + ['DejaVu Sans', 'Arial']
-            plt.rcParams['axes.unicode_minus'] = False
-            print(f"使用字体: {usable_fonts[0]}")
-            return True
-        else:
-            # 如果没有中文字体，使用英文并设置备用字体
-            plt.rcParams['font.sans-serif'] = ['DejaVu Sans', 'Arial', 'Helvetica']
-            plt.rcParams['axes.unicode_minus'] = False
-            print("未找到中文字体，使用英文标签")
-            return False
-
-    except Exception as e:
-        print(f"字体设置失败: {e}")
-        # 最后的备用设置
-        plt.rcParams['font.sans-serif'] = ['DejaVu Sans', 'Arial']
-        plt.rcParams['axes.unicode_minus'] = False
-        return False
-
-# 初始化字体设置
-FONT_SUPPORT_CHINESE = setup_matplotlib_fonts()
-
-# 确保matplotlib后端设置正确
-plt.switch_backend('TkAgg')
-
-# 设置默认字体属性，确保所有文本元素都使用中文字体
-if FONT_SUPPORT_CHINESE:
-    plt.rcParams.update({
-        'font.family': 'sans-serif',
-        'font.sans-serif': ['SimHei', 'Microsoft YaHei', 'DejaVu Sans'],
-        'axes.unicode_minus': False,
-        'axes.titlesize': 14,
-        'axes.titleweight': 'bold',
-        'axes.labelsize': 11,
-        'axes.labelweight': 'bold',
-        'xtick.labelsize': 10,
-        'ytick.labelsize': 10,
-    })
-    print("matplotlib全局字体设置为中文")
-else:
-    print("matplotlib使用英文标签")
+    import matplotlib
+    matplotlib.use('TkAgg')
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+    # 先恢复默认样式，再设置字体，避免样式重置覆盖字体设置
+    plt.style.use('default')
+    usable_fonts = setup_matplotlib_fonts()
+
+    _MATPLOTLIB = (plt, FigureCanvasTkAgg, usable_fonts[0] if usable_fonts else 'DejaVu Sans')
+    return _MATPLOTLIB
+
+# 实时计算：输入停止变化后延迟多久开始计算、后台结果的轮询间隔（毫秒）
+LIVE_DEBOUNCE_MS = 300
+LIVE_POLL_MS = 30
 
 class MarriageCalculatorApp:
     def __init__(self):
@@ -93,67 +57,24 @@ class MarriageCalculatorApp:
         # 初始化数据
         self.init_data()
 
-        # 创建界面
+        # 创建界面（只创建参数设置页，其余选项卡首次打开时再创建）
         self.create_widgets()
 
-        # 计算初始结果
-        self.calculate()
+        # 窗口显示后再计算初始结果，并统计首屏显示耗时
+        self.first_paint_seconds = None
+        self.root.bind("<Map>", self.on_first_map, add="+")
 
     def init_data(self):
         """初始化数据模型"""
-        self.form_data = {
-            # 收入与稳定性 - 基于2023年国家统计局数据
-            # 2023年全国城镇居民人均可支配收入约49,000元，考虑夫妻二人收入
-            'salaryA': 22000,  # 丈夫月薪（略高于平均水平，基于统计局数据）
-            'salaryB': 18000,  # 妻子月薪
-            'annualBonus': 80000,  # 年终奖合计（基于企业奖金统计）
-            'incomeStability': 82,  # 工资稳定性 (0-100)，基于就业统计
-
-            # 房产资产 - 基于2023年房价数据
-            # 全国平均房价约10,000-15,000元/㎡，考虑120㎡三居室
-            'propertyValue': 1800000,  # 二线城市120㎡房产总价
-            'propertyAppreciation': -1.2,  # 2023年多数城市房价下跌
-            'monthlyMortgage': 6500,  # 相应月供（30年等额本息）
-
-            # 父母支持 - 基于2023年老年人口收入统计
-            # 城镇退休人员月人均养老金约3,500元
-            'annualParentSupport': 35000,  # 父母每年现金支持
-
-            # 结婚成本细分 - 基于2023年婚姻大数据和统计
-            'marriageCosts': {
-                'betrothalGift': 58000,     # 彩礼（二线城市平均，民政局数据）
-                'weddingCeremony': 128000,  # 婚礼（包含酒席、摄影、婚庆，平均水平）
-                'weddingRing': 35000,       # 钻戒首饰（平均水平）
-                'honeymoon': 45000,         # 蜜月旅行（国内外游）
-                'newHouseDownPayment': 360000, # 新房首付（二线城市首付比例30%）
-                'renovation': 180000,       # 装修（硬装+软装，中等标准）
-            },
-
-            # 生育与育儿成本 - 基于2023年统计和相关研究
-            'childCount': 1,
-            'cityTier': 'tier2',
-            'children': [
-                {
-                    'prenatalCare': 8500,    # 产检费用（15次检查+营养品）
-                    'delivery': 12000,       # 分娩费用（顺产，医保报销后）
-                    'postpartumCare': 22000, # 月子中心（42天，平均水平）
-                    'monthlyBabyCost': 2200, # 月均婴儿用品（奶粉、尿布、辅食）
-                    'kindergarten': 96000,   # 幼儿园3年（公立园+兴趣班）
-                    'primarySchool': 180000, # 小学6年（公立教育+校服学杂）
-                    'juniorHigh': 156000,    # 初中3年（公立教育+补习）
-                    'seniorHigh': 132000,    # 高中3年（公立教育+补习）
-                    'university': 720000,    # 本科4年（平均8,000元/年×4+生活费）
-                    'extracurricular': 120000, # 课外辅导（英语、奥数等，6年）
-                }
-            ],
-
-            # 生活成本与通胀 - 基于2023年国家统计局CPI数据
-            'baseLivingCost': 6200,    # 基础生活成本（月，房租+水电+交通+通讯）
-            'livingInflation': 2.1,    # 2023年实际CPI涨幅
-            'investmentReturn': 3.8,   # 2023年理财产品平均收益率
-
-            'riskSimulation': False
-        }
+        self.form_data = default_form_data()
+        self.analysis_key = None  # 当前显示结果对应的输入键，输入未变化时跳过重绘
+
+        # 实时计算状态：单个后台线程执行分析，generation 用于丢弃过期的结果
+        self.live_executor = ThreadPoolExecutor(max_workers=1)
+        self.live_generation = 0
+        self.live_after_id = None
+        self.live_future = None
+        self.live_polling = False
 
         # 分析结果
         self.analysis_result = {}
@@ -195,7 +116,7 @@ class MarriageCalculatorApp:
         self.total_change_label.pack(pady=(0, 15))
 
         # 创建选项卡
-        self.tabview = ctk.CTkTabview(main_frame, width=1300, height=750)
+        self.tabview = ctk.CTkTabview(main_frame, width=1300, height=750, command=self.on_tab_changed)
         self.tabview.pack(fill="both", expand=True, padx=20, pady=10)
 
         # 创建各个选项卡
@@ -204,17 +125,46 @@ class MarriageCalculatorApp:
         self.tabview.add("AI分析")
         self.tabview.add("数据管理")
 
-        # 创建参数设置页面
-        self.create_settings_tab()
-
-        # 创建成本分析页面
-        self.create_analysis_tab()
+        # 各选项卡的创建函数；参数设置页立即创建，其余在首次打开时创建
+        self.tab_builders = {
+            "参数设置": self.create_settings_tab,
+            "成本分析": self.create_analysis_tab,
+            "AI分析": self.create_ai_tab,
+            "数据管理": self.create_data_tab,
+        }
+        self.built_tabs = set()
+        self.ensure_tab("参数设置")
 
-        # 创建AI分析页面
-        self.create_ai_tab()
+    def ensure_tab(self, name):
+        """确保选项卡内容已创建，首次创建后用当前结果填充"""
+        if name in self.built_tabs:
+            return
+        self.tab_builders[name]()
+        self.built_tabs.add(name)
 
-        # 创建数据管理页面
-        self.create_data_tab()
+        if name == "成本分析" and self.analysis_result:
+            self.update_display()
+            self.update_chart()
+        elif name == "数据管理":
+            self.update_cache_label()
+            self.update_perf_panel()
+
+    def on_tab_changed(self):
+        """切换选项卡"""
+        self.ensure_tab(self.tabview.get())
+
+    def on_first_map(self, event):
+        """主窗口第一次显示：等待界面绘制完成后记录耗时，再计算初始结果"""
+        if event.widget is not self.root or self.first_paint_seconds is not None:
+            return
+        self.first_paint_seconds = 0
+        self.root.after_idle(self.on_first_paint)
+
+    def on_first_paint(self):
+        """记录首屏显示耗时并计算初始结果"""
+        self.first_paint_seconds = time.perf_counter() - STARTUP_TIME
+        print(f"首屏显示耗时: {self.first_paint_seconds * 1000:.0f}ms")
+        self.calculate()
 
     def create_settings_tab(self):
         """创建参数设置选项卡"""
@@ -320,16 +270,7 @@ class MarriageCalculatorApp:
         marriage_costs = self.form_data['marriageCosts']
         self.marriage_entries = {}
 
-        cost_labels = {
-            'betrothalGift': '彩礼',
-            'weddingCeremony': '婚礼',
-            'weddingRing': '钻戒首饰',
-            'honeymoon': '蜜月旅行',
-            'newHouseDownPayment': '新房首付',
-            'renovation': '装修'
-        }
-
-        for i, (key, label) in enumerate(cost_labels.items()):
+        for i, (key, label) in enumerate(MARRIAGE_COST_LABELS.items()):
             row = ctk.CTkFrame(marriage_grid, fg_color="transparent")
             row.pack(fill="x", pady=3)
 
@@ -362,20 +303,7 @@ class MarriageCalculatorApp:
         child_costs = self.form_data['children'][0]
         self.child_entries = {}
 
-        child_cost_labels = {
-            'prenatalCare': '产检费用',
-            'delivery': '分娩费用',
-            'postpartumCare': '月子中心',
-            'monthlyBabyCost': '月均婴儿用品',
-            'kindergarten': '幼儿园3年',
-            'primarySchool': '小学6年',
-            'juniorHigh': '初中3年',
-            'seniorHigh': '高中3年',
-            'university': '本科4年',
-            'extracurricular': '课外辅导'
-        }
-
-        for i, (key, label) in enumerate(child_cost_labels.items()):
+        for i, (key, label) in enumerate(CHILD_COST_LABELS.items()):
             row = ctk.CTkFrame(child_grid, fg_color="transparent")
             row.pack(fill="x", pady=3)
 
@@ -396,15 +324,8 @@ class MarriageCalculatorApp:
         other_grid.pack(fill="x", padx=20, pady=10)
 
         # 父母支持、投资收益率、生活成本、通胀率
-        params = [
-            ('annualParentSupport', '父母每年现金支持'),
-            ('investmentReturn', '投资收益率(%)'),
-            ('baseLivingCost', '基础生活成本(月)'),
-            ('livingInflation', '生活通胀率(%)')
-        ]
-
         self.other_entries = {}
-        for param_key, param_label in params:
+        for param_key, param_label in OTHER_PARAM_LABELS.items():
             row = ctk.CTkFrame(other_grid, fg_color="transparent")
             row.pack(fill="x", pady=5)
 
@@ -414,6 +335,15 @@ class MarriageCalculatorApp:
             entry.insert(0, str(self.form_data[param_key]))
             self.other_entries[param_key] = entry
 
+        # 风险模拟开关
+        risk_row = ctk.CTkFrame(other_grid, fg_color="transparent")
+        risk_row.pack(fill="x", pady=5)
+
+        self.risk_switch = ctk.CTkSwitch(risk_row, text="风险模拟（蒙特卡洛）", font=ctk.CTkFont(size=11))
+        self.risk_switch.pack(side="left")
+        if self.form_data.get('riskSimulation', False):
+            self.risk_switch.select()
+
         # 计算按钮
         calc_button = ctk.CTkButton(
             scrollable_frame,
@@ -422,11 +352,25 @@ class MarriageCalculatorApp:
             font=ctk.CTkFont(size=12, weight="bold"),
             height=40
         )
-        calc_button.pack(pady=20)
+        calc_button.pack(pady=(20, 5))
+
+        # 实时计算状态
+        self.live_status_label = ctk.CTkLabel(scrollable_frame, text="", font=ctk.CTkFont(size=11))
+        self.live_status_label.pack(pady=(0, 20))
 
         # 绑定事件
         self.stability_slider.configure(command=self.update_stability_label)
         self.appreciation_slider.configure(command=self.update_appreciation_label)
+        self.risk_switch.configure(command=self.schedule_live_calculation)
+
+        # 所有输入框修改后自动重新计算
+        entries = [self.salary_a_entry, self.salary_b_entry, self.bonus_entry,
+                   self.property_value_entry, self.mortgage_entry, self.child_count_entry]
+        entries += list(self.marriage_entries.values())
+        entries += list(self.child_entries.values())
+        entries += list(self.other_entries.values())
+        for entry in entries:
+            entry.bind("<KeyRelease>", self.schedule_live_calculation)
 
     def create_analysis_tab(self):
         """创建成本分析选项卡"""
@@ -437,14 +381,15 @@ class MarriageCalculatorApp:
         chart_frame.pack(fill="both", expand=True, padx=10, pady=10)
 
         # 创建matplotlib图形
+        plt, FigureCanvasTkAgg, font_family = load_matplotlib()
+        from stage_chart import StageChart
         self.figure, self.ax = plt.subplots(figsize=(12, 7), dpi=100)
-        # 设置matplotlib样式
-        plt.style.use('default')
         self.ax.grid(True, alpha=0.3)
         self.ax.set_facecolor('#f8fafc')
 
         self.canvas = FigureCanvasTkAgg(self.figure, chart_frame)
         self.canvas.get_tk_widget().pack(fill="both", expand=True, padx=10, pady=10)
+        self.stage_chart = StageChart(self.ax, font_family=font_family)
 
         # 统计信息面板
         stats_frame = ctk.CTkFrame(analysis_frame, height=200)
@@ -490,6 +435,11 @@ class MarriageCalculatorApp:
             label.grid(row=1, column=i, padx=15, pady=10, sticky="w")  # 移到第二行
             self.stats_labels[key] = label
 
+        # 风险模拟结果（仅在开启风险模拟时显示内容）
+        risk_label = ctk.CTkLabel(stats_frame, text="", font=ctk.CTkFont(size=11, family="SimHei"))
+        risk_label.grid(row=2, column=0, columnspan=len(stats_names), padx=15, pady=(0, 10), sticky="w")
+        self.stats_labels['risk_simulation'] = risk_label
+
     def create_ai_tab(self):
         """创建AI分析选项卡"""
         ai_frame = self.tabview.tab("AI分析")
@@ -520,6 +470,15 @@ class MarriageCalculatorApp:
         )
         generate_button.pack(side="left", padx=(0,10))
 
+        # 敏感性分析按钮
+        sensitivity_button = ctk.CTkButton(
+            button_frame,
+            text="敏感性分析",
+            command=self.show_sensitivity_analysis,
+            font=ctk.CTkFont(size=12, weight="bold")
+        )
+        sensitivity_button.pack(side="left", padx=(0,10))
+
         # 清空按钮
         clear_button = ctk.CTkButton(
             button_frame,
@@ -661,28 +620,169 @@ class MarriageCalculatorApp:
         preset_grid.grid_columnconfigure(1, weight=1)
         preset_grid.grid_columnconfigure(2, weight=1)
 
+        # 多方案对比
+        compare_frame = ctk.CTkFrame(data_panel, fg_color="transparent")
+        compare_frame.pack(fill="x", padx=20, pady=(0, 20))
+
+        compare_files_button = ctk.CTkButton(
+            compare_frame,
+            text="📊 多方案对比",
+            command=self.compare_config_files,
+            font=ctk.CTkFont(size=12, weight="bold"),
+            fg_color="#0ea5e9",
+            hover_color="#0284c7"
+        )
+        compare_files_button.pack(side="left", padx=(0, 20))
+
+        compare_presets_button = ctk.CTkButton(
+            compare_frame,
+            text="🎯 预设方案对比",
+            command=lambda: self.show_scenario_comparison(None),
+            font=ctk.CTkFont(size=12, weight="bold"),
+            fg_color="#0ea5e9",
+            hover_color="#0284c7"
+        )
+        compare_presets_button.pack(side="left")
+
+        # 结果缓存统计
+        self.cache_label = ctk.CTkLabel(data_panel, text="", font=ctk.CTkFont(size=11))
+        self.cache_label.pack(padx=20, pady=(0, 10), anchor="w")
+
+        # 各阶段计算耗时
+        perf_frame = ctk.CTkFrame(data_panel)
+        perf_frame.pack(fill="both", expand=True, padx=20, pady=(0, 20))
+
+        perf_header = ctk.CTkFrame(perf_frame, fg_color="transparent")
+        perf_header.pack(fill="x", padx=10, pady=(10, 0))
+
+        perf_title = ctk.CTkLabel(perf_header, text="⏱️ 计算耗时", font=ctk.CTkFont(size=14, weight="bold"))
+        perf_title.pack(side="left")
+
+        self.perf_switch = ctk.CTkSwitch(perf_header, text="启用计时", command=self.toggle_perf_spans)
+        self.perf_switch.pack(side="right")
+        if SPANS.enabled:
+            self.perf_switch.select()
+
+        for text, command in (("导出JSON", self.export_perf_spans), ("清空", self.reset_perf_spans),
+                              ("刷新", self.update_perf_panel)):
+            ctk.CTkButton(perf_header, text=text, width=80, command=command).pack(side="right", padx=(0, 10))
+
+        self.perf_text = ctk.CTkTextbox(perf_frame, height=140, font=ctk.CTkFont(size=11, family="Courier New"))
+        self.perf_text.pack(fill="both", expand=True, padx=10, pady=10)
+
     def update_stability_label(self, value):
         """更新稳定性标签"""
         self.stability_label.configure(text=f"{int(float(value))}%")
+        self.schedule_live_calculation()
 
     def update_appreciation_label(self, value):
         """更新增值率标签"""
         self.appreciation_label.configure(text=f"{float(value):.1f}%")
+        self.schedule_live_calculation()
 
-    def calculate(self):
-        """执行成本计算"""
+    def schedule_live_calculation(self, event=None):
+        """输入变化后防抖：在 LIVE_DEBOUNCE_MS 内没有新的变化才开始计算"""
+        if self.live_after_id is not None:
+            self.root.after_cancel(self.live_after_id)
+        self.live_after_id = self.root.after(LIVE_DEBOUNCE_MS, self.start_live_calculation)
+
+    def start_live_calculation(self):
+        """在主线程读取输入，把分析交给后台线程"""
+        self.live_after_id = None
         try:
-            # 更新数据
-            self.update_form_data()
+            with SPANS.span("update_form_data"):
+                self.update_form_data()
+        except ValueError:
+            # 输入尚未填写完整时不弹窗，只提示
+            self.live_status_label.configure(text="⚠️ 输入格式有误，暂停实时计算", text_color="#ef4444")
+            return
+
+        key = canonical_key(self.form_data)
+        if key == self.analysis_key:
+            self.live_status_label.configure(text="")
+            return
+
+        # 新的请求使之前尚未完成的请求过期；还没开始执行的直接取消
+        self.live_generation += 1
+        if self.live_future is not None:
+            self.live_future.cancel()
+
+        form_data = copy.deepcopy(self.form_data)
+        self.live_future = self.live_executor.submit(
+            SPANS.traced("live.perform_analysis", ANALYSIS_CACHE.get_or_compute), form_data, perform_analysis, key
+        )
+        self.live_future.generation = self.live_generation
+        self.live_future.key = key
+        self.live_status_label.configure(text="⏳ 实时计算中...", text_color="#64748b")
+
+        if not self.live_polling:
+            self.live_polling = True
+            self.root.after(LIVE_POLL_MS, self.poll_live_result)
+
+    def poll_live_result(self):
+        """通过 root.after 轮询后台结果，只在主线程更新界面"""
+        future = self.live_future
+        if future is None:
+            self.live_polling = False
+            return
+        if not future.done():
+            self.root.after(LIVE_POLL_MS, self.poll_live_result)
+            return
+
+        self.live_polling = False
+        self.live_future = None
+        if future.cancelled() or future.generation != self.live_generation:
+            return
 
-            # 执行分析
-            self.analysis_result = self.perform_analysis()
+        try:
+            result = future.result()
+        except Exception as e:
+            self.live_status_label.configure(text=f"⚠️ 计算出错：{str(e)}", text_color="#ef4444")
+            return
 
-            # 更新显示
+        self.analysis_result = result
+        self.analysis_key = future.key
+        with SPANS.span("update_display"):
             self.update_display()
-
-            # 重绘图表
+        with SPANS.span("update_chart"):
             self.update_chart()
+        self.update_cache_label()
+        self.update_perf_panel()
+        self.live_status_label.configure(text="")
+
+    def calculate(self):
+        """执行成本计算"""
+        # 手动计算优先，正在进行的实时计算结果作废
+        self.live_generation += 1
+        if self.live_after_id is not None:
+            self.root.after_cancel(self.live_after_id)
+            self.live_after_id = None
+        self.live_status_label.configure(text="")
+
+        try:
+            with SPANS.span("calculate"):
+                # 更新数据
+                with SPANS.span("update_form_data"):
+                    self.update_form_data()
+
+                # 输入与当前显示的结果相同时不重新计算和重绘
+                key = canonical_key(self.form_data)
+                if key != self.analysis_key:
+                    # 执行分析
+                    with SPANS.span("perform_analysis"):
+                        self.analysis_result = self.perform_analysis(key)
+                    self.analysis_key = key
+
+                    # 更新显示
+                    with SPANS.span("update_display"):
+                        self.update_display()
+
+                    # 重绘图表
+                    with SPANS.span("update_chart"):
+                        self.update_chart()
+
+            self.update_cache_label()
+            self.update_perf_panel()
 
         except Exception as e:
             messagebox.showerror("计算错误", f"计算过程中出现错误：{str(e)}")
@@ -714,127 +814,74 @@ class MarriageCalculatorApp:
             for key, entry in self.other_entries.items():
                 self.form_data[key] = float(entry.get())
 
+            self.form_data['riskSimulation'] = bool(self.risk_switch.get())
+
         except ValueError as e:
             raise ValueError(f"输入数据格式错误，请检查所有字段都是数字：{str(e)}")
 
-    def perform_analysis(self):
-        """执行财务分析计算"""
-        data = self.form_data
-
-        # 结婚总成本
-        total_marriage_cost = sum(data['marriageCosts'].values())
-
-        # 计算每个孩子的总教育成本
-        child = data['children'][0]
-        child_education_cost = (
-            child['prenatalCare'] + child['delivery'] + child['postpartumCare'] +
-            child['monthlyBabyCost'] * 12 * 3 +  # 3年婴儿期
-            child['kindergarten'] + child['primarySchool'] + child['juniorHigh'] +
-            child['seniorHigh'] + child['university'] + child['extracurricular']
+    def perform_analysis(self, key=None):
+        """执行财务分析计算（结果缓存在共享的 ANALYSIS_CACHE 中）"""
+        return ANALYSIS_CACHE.get_or_compute(self.form_data, perform_analysis, key)
+
+    def update_cache_label(self):
+        """更新数据管理页的缓存统计"""
+        if "数据管理" not in self.built_tabs:
+            return
+        stats = ANALYSIS_CACHE.stats()
+        self.cache_label.configure(
+            text=f"结果缓存: 命中 {stats['hits']} 次 / 未命中 {stats['misses']} 次 / "
+                 f"{stats['size']}/{stats['maxsize']} 条 (命中率 {stats['hitRate'] * 100:.0f}%)"
         )
 
-        total_child_cost = child_education_cost * data['childCount']
-        total_cost = total_marriage_cost + total_child_cost
-
-        stages = [
-            { 'name': '结婚准备', 'years': 1, 'isMarriageStage': True },
-            { 'name': '0-3岁', 'years': 3 },
-            { 'name': '3-6岁', 'years': 3 },
-            { 'name': '6-12岁', 'years': 6 },
-            { 'name': '12-15岁', 'years': 3 },
-            { 'name': '15-18岁', 'years': 3 }
-        ]
-
-        current_property_value = data['propertyValue']
-        total_net_assets_change = -total_marriage_cost
-        min_cash_flow_surplus = float('inf')
-
-        chart_data = []
-
-        for idx, stage in enumerate(stages):
-            year_count = stage['years']
-            elapsed_years = max(0, (idx - 1) * 3)
-
-            # 收入计算
-            annual_income_base = (data['salaryA'] + data['salaryB']) * 12 + data['annualBonus']
-            effective_annual_income = annual_income_base * (data['incomeStability'] / 100)
-            stage_income = 0 if stage.get('isMarriageStage', False) else effective_annual_income * year_count
-
-            # 支出计算
-            stage_living_cost = 0 if stage.get('isMarriageStage', False) else data['baseLivingCost'] * 12 * year_count * (1 + data['livingInflation']/100) ** elapsed_years
-            stage_mortgage = 0 if stage.get('isMarriageStage', False) else data['monthlyMortgage'] * 12 * year_count
-
-            # 育儿成本
-            stage_child_cost = 0
-            if not stage.get('isMarriageStage', False):
-                if idx == 1:  # 0-3岁
-                    stage_child_cost = (child['prenatalCare'] + child['delivery'] + child['postpartumCare'] + child['monthlyBabyCost'] * 12 * 3) * data['childCount']
-                elif idx == 2:  # 3-6岁
-                    stage_child_cost = child['kindergarten'] * data['childCount']
-                elif idx == 3:  # 6-12岁
-                    stage_child_cost = child['primarySchool'] * data['childCount']
-                elif idx == 4:  # 12-15岁
-                    stage_child_cost = child['juniorHigh'] * data['childCount']
-                elif idx == 5:  # 15-18岁
-                    stage_child_cost = (child['seniorHigh'] + child['extracurricular']) * data['childCount']
-
-                stage_child_cost *= (1 + data['livingInflation']/100) ** elapsed_years
-
-            # 结婚成本
-            stage_marriage_cost = total_marriage_cost if stage.get('isMarriageStage', False) else 0
-
-            # 房产增值
-            property_value_at_end = current_property_value * (1 + data['propertyAppreciation']/100) ** year_count
-            stage_property_gain = property_value_at_end - current_property_value
-            current_property_value = property_value_at_end
-
-            # 投资收益和父母支持
-            stage_support = 0 if stage.get('isMarriageStage', False) else data['annualParentSupport'] * year_count
-            stage_invest_gain = 0 if stage.get('isMarriageStage', False) else (stage_income * 0.2) * (data['investmentReturn'] / 100) * year_count
-
-            # 净现金流和总损益
-            net_cash_flow = stage_income + stage_support - stage_living_cost - stage_mortgage - stage_child_cost - stage_marriage_cost
-            total_economic_gain = net_cash_flow + stage_property_gain + stage_invest_gain
-
-            if not stage.get('isMarriageStage', False) and net_cash_flow < min_cash_flow_surplus:
-                min_cash_flow_surplus = net_cash_flow
-
-            total_net_assets_change += total_economic_gain
-
-            chart_data.append({
-                'name': stage['name'],
-                '净现金流': net_cash_flow,
-                '资产增值贬值': stage_property_gain,
-                '结婚生育成本': stage_marriage_cost + stage_child_cost,
-                '投资与支持': stage_invest_gain + stage_support,
-                '综合家庭损益': total_economic_gain,
-                'isMarriageStage': stage.get('isMarriageStage', False)
-            })
-
-        # 计算抗风险系数
-        monthly_income = (data['salaryA'] + data['salaryB'] + data['annualParentSupport']/12)
-        monthly_expenses = data['monthlyMortgage'] + data['baseLivingCost']
-        risk_coefficient = monthly_income / monthly_expenses if monthly_expenses > 0 else 0
-
-        return {
-            'chartData': chart_data,
-            'totalNetAssetsChange': total_net_assets_change,
-            'minCashFlowSurplus': min_cash_flow_surplus if min_cash_flow_surplus != float('inf') else 0,
-            'totalMarriageCost': total_marriage_cost,
-            'childEducationCost': total_child_cost,
-            'totalCost': total_cost,
-            'riskCoefficient': risk_coefficient
-        }
+    def update_perf_panel(self):
+        """更新数据管理页的各阶段耗时（最近若干次的 p50 / p95 / 最大值）"""
+        if "数据管理" not in self.built_tabs:
+            return
+        self.perf_text.configure(state="normal")
+        self.perf_text.delete("1.0", tk.END)
+        self.perf_text.insert("1.0", SPANS.format_summary())
+        self.perf_text.configure(state="disabled")
+
+    def toggle_perf_spans(self):
+        """开关计时（关闭后计时点不再读时钟）"""
+        SPANS.enabled = bool(self.perf_switch.get())
+        self.update_perf_panel()
+
+    def reset_perf_spans(self):
+        """清空计时记录"""
+        SPANS.reset()
+        self.update_perf_panel()
+
+    def export_perf_spans(self):
+        """导出计时统计和原始耗时为 JSON"""
+        path = filedialog.asksaveasfilename(
+            title="导出计算耗时",
+            defaultextension=".json",
+            initialfile="perf_spans.json",
+            filetypes=[("JSON", "*.json")]
+        )
+        if not path:
+            return
+        try:
+            SPANS.dump(path)
+            messagebox.showinfo("导出成功", f"计算耗时已导出到 {path}")
+        except Exception as e:
+            messagebox.showerror("导出失败", f"导出计算耗时时出现错误：{str(e)}")
 
     def update_display(self):
         """更新显示"""
         result = self.analysis_result
 
         # 更新标题栏的总资产变化
-        change_text = f"18年综合净资产变化预期: {(result['totalNetAssetsChange'] / 10000):.1f}万"
+        change_text = (f"18年综合净资产变化预期: {(result['totalNetAssetsChange'] / 10000):.1f}万  |  "
+                       f"期末投资账户: {(result['endingPortfolio'] / 10000):.1f}万")
         color = "#10b981" if result['totalNetAssetsChange'] >= 0 else "#ef4444"
         self.total_change_label.configure(text=change_text, text_color=color)
 
+        # 成本分析页尚未打开时只更新标题，打开时再填充
+        if "成本分析" not in self.built_tabs:
+            return
+
         # 更新统计信息
         try:
             total_cost_text = f"总成本: {(result['totalCost'] / 10000):.1f}万"
@@ -852,8 +899,25 @@ class MarriageCalculatorApp:
             )
             self.stats_labels['risk_coefficient'].configure(text=risk_coefficient_text)
 
-            # 调试输出
-            print(f"更新统计信息: 总成本={result['totalCost']}, 结婚成本={result['totalMarriageCost']}, 教育成本={result['childEducationCost']}")
+            risk = result.get('riskSimulation')
+            if risk:
+                net = risk['totalNetAssetsChange']
+                cash = risk['minCashFlowSurplus']
+                risk_text = (
+                    f"风险模拟({risk['paths']}条路径): "
+                    f"净资产 P5/P50/P95 = {net['P5'] / 10000:.1f} / {net['P50'] / 10000:.1f} / {net['P95'] / 10000:.1f}万  |  "
+                    f"最低现金流 P5/P50/P95 = {cash['P5'] / 10000:.1f} / {cash['P50'] / 10000:.1f} / {cash['P95'] / 10000:.1f}万  |  "
+                    f"现金流为负概率: {risk['negativeCashFlowProbability'] * 100:.1f}%"
+                )
+                self.stats_labels['risk_simulation'].configure(
+                    text=risk_text,
+                    text_color="#ef4444" if risk['negativeCashFlowProbability'] > 0.2 else "#10b981"
+                )
+            elif result.get('riskSimulationSkipped'):
+                self.stats_labels['risk_simulation'].configure(
+                    text=f"风险模拟未运行：{result['riskSimulationSkipped']}", text_color="#64748b")
+            else:
+                self.stats_labels['risk_simulation'].configure(text="")
 
         except Exception as e:
             print(f"更新统计信息时出错: {e}")
@@ -865,95 +929,27 @@ class MarriageCalculatorApp:
             self.stats_labels['risk_coefficient'].configure(text="抗风险系数: 计算中...")
 
     def update_chart(self):
-        """更新图表"""
-        self.ax.clear()
-        self.ax.set_facecolor('#f8fafc')
-
-        data = self.analysis_result['chartData']
-        stages = [item['name'] for item in data]
-
-        # 绘制柱状图
-        x = np.arange(len(stages))
-        width = 0.25
-
-        # 资产增值贬值
-        property_values = [item['资产增值贬值'] for item in data]
-        bars1 = self.ax.bar(x - width, property_values, width, label='资产增值贬值',
-                           color=['#ef4444' if v < 0 else '#10b981' for v in property_values],
-                           alpha=0.8, edgecolor='white', linewidth=0.5)
-
-        # 结婚生育成本
-        cost_values = [item['结婚生育成本'] for item in data]
-        bars2 = self.ax.bar(x, cost_values, width, label='结婚生育成本', color='#f59e0b',
-                           alpha=0.8, edgecolor='white', linewidth=0.5)
-
-        # 投资与支持
-        invest_values = [item['投资与支持'] for item in data]
-        bars3 = self.ax.bar(x + width, invest_values, width, label='投资与支持', color='#3b82f6',
-                           alpha=0.8, edgecolor='white', linewidth=0.5)
-
-        # 绘制综合损益线
-        total_values = [item['综合家庭损益'] for item in data]
-        line = self.ax.plot(x, total_values, 'k-', linewidth=4, label='综合家庭损益',
-                           marker='o', markersize=6, markerfacecolor='white', markeredgecolor='black', markeredgewidth=2)
-
-        # 添加净现金流区域
-        cash_flow_values = [item['净现金流'] for item in data]
-        self.ax.fill_between(x, 0, cash_flow_values, alpha=0.2, color='#64748b', label='净现金流')
-
-        # 添加基准线
-        self.ax.axhline(y=0, color='black', linestyle='-', alpha=0.3, linewidth=1)
-
-        # 强制使用中文字体（已确认系统支持）
-        try:
-            self.ax.set_xlabel('生命周期阶段', fontsize=11, fontweight='bold', fontfamily='SimHei')
-            self.ax.set_ylabel('金额 (元)', fontsize=11, fontweight='bold', fontfamily='SimHei')
-            self.ax.set_title('家庭财务损益分析 - 18年生命周期', fontsize=14, fontweight='bold', pad=20, fontfamily='SimHei')
-            self.ax.set_xticks(x)
-            self.ax.set_xticklabels(stages, rotation=45, ha='right', fontsize=10, fontfamily='SimHei')
-        except Exception as e:
-            print(f"中文标签设置失败，使用英文: {e}")
-            self.ax.set_xlabel('Life Stage', fontsize=11, fontweight='bold')
-            self.ax.set_ylabel('Amount (CNY)', fontsize=11, fontweight='bold')
-            self.ax.set_title('Family Financial Analysis - 18 Years', fontsize=14, fontweight='bold', pad=20)
-            self.ax.set_xticks(x)
-            self.ax.set_xticklabels(stages, rotation=45, ha='right', fontsize=10)
-
-        # 美化图例
-        try:
-            legend = self.ax.legend(loc='upper left', bbox_to_anchor=(1.02, 1), fontsize=9, prop={'family': 'SimHei', 'size': 9})
-            legend.get_frame().set_alpha(0.9)
-        except Exception as e:
-            print(f"图例中文显示失败，使用英文图例: {e}")
-            try:
-                legend = self.ax.legend(loc='upper left', bbox_to_anchor=(1.02, 1), fontsize=9)
-                legend.get_frame().set_alpha(0.9)
-            except Exception as e2:
-                print(f"英文图例也失败: {e2}")
-                try:
-                    self.ax.legend().set_visible(False)
-                except:
-                    pass
-
-        # 美化网格
-        self.ax.grid(True, alpha=0.3, linestyle='--')
-
-        # 格式化Y轴
-        self.ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'¥{x/1000:.0f}k'))
-
-        # 添加数值标签
-        for i, v in enumerate(total_values):
-            if abs(v) > 10000:  # 只为较大的值添加标签
-                self.ax.text(i, v + (50000 if v >= 0 else -50000),
-                           f'{v/10000:.1f}万', ha='center', va='bottom' if v >= 0 else 'top',
-                           fontsize=9, fontweight='bold', fontfamily='SimHei')
-
-        self.figure.tight_layout()
-        self.canvas.draw()
+        """更新图表（原地更新已有图形元素，只在坐标范围或图例变化时完整重绘）"""
+        if "成本分析" not in self.built_tabs:
+            return
+        self.stage_chart.update(self.analysis_result)
 
     def generate_ai_analysis(self):
         """生成AI分析报告"""
         try:
+            # 风险模拟结果（开启风险模拟时才有）
+            risk_section = ""
+            risk = self.analysis_result.get('riskSimulation')
+            if risk:
+                net = risk['totalNetAssetsChange']
+                cash = risk['minCashFlowSurplus']
+                risk_section = f"""
+🎲 风险模拟 ({risk['paths']}条路径, 种子{risk['seed']})
+净资产变化 P5/P50/P95: ¥{net['P5'] / 10000:.1f}万 / ¥{net['P50'] / 10000:.1f}万 / ¥{net['P95'] / 10000:.1f}万
+最低现金流 P5/P50/P95: ¥{cash['P5'] / 10000:.1f}万 / ¥{cash['P50'] / 10000:.1f}万 / ¥{cash['P95'] / 10000:.1f}万
+现金流为负概率: {risk['negativeCashFlowProbability'] * 100:.1f}%
+"""
+
             # 这里可以集成AI API，暂时提供模板分析
             analysis = f"""
 深度资产审计报告 (AI Generated)
@@ -982,7 +978,7 @@ class MarriageCalculatorApp:
 ⚠️ 风险提示
 {'⚠️ 现金流存在风险，建议优化支出结构' if self.analysis_result['minCashFlowSurplus'] < 0 else '✅ 现金流状况良好'}
 {'⚠️ 房产贬值风险较高，建议分散投资' if self.form_data['propertyAppreciation'] < -2 else '✅ 房产配置相对稳健'}
-
+{risk_section}
 💡 优化建议
 1. 合理控制结婚成本，避免过度消费
 2. 提前规划教育基金，建立专项理财
@@ -996,6 +992,87 @@ class MarriageCalculatorApp:
         except Exception as e:
             messagebox.showerror("AI分析错误", f"生成分析报告时出现错误：{str(e)}")
 
+    def show_sensitivity_analysis(self):
+        """各输入 ±10% 的敏感性分析：表格写入报告区，龙卷风图在新窗口中显示"""
+        try:
+            from sensitivity import sensitivity_analysis, format_tornado_table, plot_tornado, SENSITIVITY_METRICS
+
+            self.update_form_data()
+            table = sensitivity_analysis(self.form_data)
+
+            self.ai_text.delete(1.0, tk.END)
+            self.ai_text.insert(tk.END, format_tornado_table(table))
+
+            plt, FigureCanvasTkAgg, font_family = load_matplotlib()
+            window = ctk.CTkToplevel(self.root)
+            window.title("敏感性分析 - 龙卷风图")
+            window.geometry("1000x700")
+
+            figure, axes = plt.subplots(1, 2, figsize=(12, 7), dpi=100)
+            for ax, metric in zip(axes, SENSITIVITY_METRICS):
+                plot_tornado(table, metric, ax=ax)
+            figure.tight_layout()
+
+            canvas = FigureCanvasTkAgg(figure, window)
+            canvas.get_tk_widget().pack(fill="both", expand=True, padx=10, pady=10)
+            canvas.draw()
+
+        except Exception as e:
+            messagebox.showerror("敏感性分析错误", f"敏感性分析时出现错误：{str(e)}")
+
+    def compare_config_files(self):
+        """选择多个配置文件进行对比"""
+        paths = filedialog.askopenfilenames(
+            title="选择要对比的配置文件",
+            filetypes=[("JSON 配置", "*.json"), ("所有文件", "*.*")]
+        )
+        if paths:
+            self.show_scenario_comparison(paths)
+
+    def show_scenario_comparison(self, paths):
+        """当前配置与所选配置文件（paths 为 None 时为 6 个预设）并排对比：表格和叠加图在新窗口中显示"""
+        try:
+            from scenario_compare import (
+                load_scenarios, preset_scenarios, evaluate_scenarios, comparison_table,
+                format_comparison_table, plot_overlay
+            )
+
+            self.update_form_data()
+            current = copy.deepcopy(self.form_data)
+            scenarios = [{'name': '当前配置', 'path': None, 'key': canonical_key(current), 'formData': current}]
+            errors = []
+            if paths is None:
+                scenarios += preset_scenarios()
+            else:
+                loaded, errors = load_scenarios(paths)
+                scenarios += loaded
+            evaluate_scenarios(scenarios)
+
+            table = format_comparison_table(comparison_table(scenarios, sort_by='totalNetAssetsChange'))
+            if errors:
+                table += "\n\n无法读取的文件：\n" + "\n".join(f"{path}: {error}" for path, error in errors)
+
+            plt, FigureCanvasTkAgg, font_family = load_matplotlib()
+            window = ctk.CTkToplevel(self.root)
+            window.title(f"多方案对比 - {len(scenarios)}个方案")
+            window.geometry("1100x800")
+
+            table_text = ctk.CTkTextbox(window, height=200, font=ctk.CTkFont(size=11, family="Courier New"))
+            table_text.pack(fill="x", padx=10, pady=(10, 0))
+            table_text.insert("1.0", table)
+            table_text.configure(state="disabled")
+
+            figure, ax = plt.subplots(figsize=(12, 6), dpi=100)
+            plot_overlay(scenarios, ax=ax)
+            figure.tight_layout()
+
+            canvas = FigureCanvasTkAgg(figure, window)
+            canvas.get_tk_widget().pack(fill="both", expand=True, padx=10, pady=10)
+            canvas.draw()
+
+        except Exception as e:
+            messagebox.showerror("多方案对比错误", f"多方案对比时出现错误：{str(e)}")
+
     def clear_ai_analysis(self):
         """清空AI分析"""
         self.ai_text.delete(1.0, tk.END)
@@ -1041,6 +1118,8 @@ class MarriageCalculatorApp:
 
             # 生成报告内容
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            basename = f"marriage_cost_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            chart_filename = f"{basename}.png"
             report_content = f"""
 结婚生育成本分析报告
 生成时间: {timestamp}
@@ -1070,6 +1149,7 @@ class MarriageCalculatorApp:
 📈 投资参数
 投资收益率: {self.form_data['investmentReturn']}%
 生活通胀率: {self.form_data['livingInflation']}%
+期末投资账户: ¥{(self.analysis_result['endingPortfolio'] / 10000):.1f}万
 
 ⚠️ 风险评估
 最低现金流: ¥{(self.analysis_result['minCashFlowSurplus'] / 10000):.1f}万
@@ -1079,14 +1159,21 @@ class MarriageCalculatorApp:
 {'✅ 财务状况良好' if self.analysis_result['totalNetAssetsChange'] > 0 else '⚠️ 财务状况需优化'}
 {'✅ 现金流稳定' if self.analysis_result['minCashFlowSurplus'] > 0 else '⚠️ 现金流紧张'}
 {'✅ 抗风险能力强' if self.analysis_result['riskCoefficient'] > 1.5 else '⚠️ 抗风险能力需提升'}
+
+📉 损益图表: {chart_filename}
             """
 
+            # 保存图表（离屏渲染，不影响界面上的图表）
+            from chart_renderer import render_chart
+            with open(chart_filename, "wb") as f:
+                f.write(render_chart(self.analysis_result))
+
             # 保存报告
-            filename = f"marriage_cost_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+            filename = f"{basename}.txt"
             with open(filename, "w", encoding="utf-8") as f:
                 f.write(report_content.strip())
 
-            messagebox.showinfo("导出成功", f"分析报告已导出到 {filename}")
+            messagebox.showinfo("导出成功", f"分析报告已导出到 {filename}\n图表已导出到 {chart_filename}")
 
         except Exception as e:
             messagebox.showerror("导出失败", f"导出报告时出现错误：{str(e)}")
@@ -1094,136 +1181,12 @@ class MarriageCalculatorApp:
     def load_preset(self, preset_type):
         """加载预设配置"""
         try:
-            presets = {
-                "tier1": {  # 一线城市 - 基于2023年北京上海数据
-                    'salaryA': 28000, 'salaryB': 24000, 'annualBonus': 120000,  # 高收入水平
-                    'incomeStability': 78, 'propertyValue': 12000000,  # 北京上海平均房价
-                    'propertyAppreciation': 0.2, 'monthlyMortgage': 18000,  # 高房贷压力
-                    'annualParentSupport': 60000,  # 高父母支持
-                    'marriageCosts': {
-                        'betrothalGift': 120000, 'weddingCeremony': 200000,  # 高端婚礼
-                        'weddingRing': 60000, 'honeymoon': 80000,  # 豪华蜜月
-                        'newHouseDownPayment': 1200000, 'renovation': 400000  # 高房价装修
-                    },
-                    'children': [{
-                        'prenatalCare': 15000, 'delivery': 25000, 'postpartumCare': 35000,
-                        'monthlyBabyCost': 3500, 'kindergarten': 240000, 'primarySchool': 480000,
-                        'juniorHigh': 360000, 'seniorHigh': 300000, 'university': 1200000,
-                        'extracurricular': 200000
-                    }],
-                    'baseLivingCost': 12000, 'livingInflation': 2.8, 'investmentReturn': 4.5
-                },
-                "tier2": {  # 二线城市 - 基于2023年杭州南京数据
-                    'salaryA': 22000, 'salaryB': 18000, 'annualBonus': 80000,  # 中等收入
-                    'incomeStability': 82, 'propertyValue': 1800000,  # 2-3万/㎡房价
-                    'propertyAppreciation': -1.2, 'monthlyMortgage': 6500,  # 中等房贷
-                    'annualParentSupport': 35000,  # 中等父母支持
-                    'marriageCosts': {
-                        'betrothalGift': 58000, 'weddingCeremony': 128000,  # 中等婚礼
-                        'weddingRing': 35000, 'honeymoon': 45000,  # 中等蜜月
-                        'newHouseDownPayment': 360000, 'renovation': 180000  # 中等装修
-                    },
-                    'children': [{
-                        'prenatalCare': 8500, 'delivery': 12000, 'postpartumCare': 22000,
-                        'monthlyBabyCost': 2200, 'kindergarten': 96000, 'primarySchool': 180000,
-                        'juniorHigh': 156000, 'seniorHigh': 132000, 'university': 720000,
-                        'extracurricular': 120000
-                    }],
-                    'baseLivingCost': 6200, 'livingInflation': 2.1, 'investmentReturn': 3.8
-                },
-                "tier3": {  # 三线城市 - 基于2023年普通地级市数据
-                    'salaryA': 12000, 'salaryB': 10000, 'annualBonus': 40000,  # 较低收入
-                    'incomeStability': 85, 'propertyValue': 800000,  # 6-8千/㎡房价
-                    'propertyAppreciation': -1.8, 'monthlyMortgage': 2800,  # 较低房贷
-                    'annualParentSupport': 20000,  # 较低父母支持
-                    'marriageCosts': {
-                        'betrothalGift': 35000, 'weddingCeremony': 68000,  # 简约婚礼
-                        'weddingRing': 20000, 'honeymoon': 25000,  # 简单蜜月
-                        'newHouseDownPayment': 160000, 'renovation': 90000  # 简单装修
-                    },
-                    'children': [{
-                        'prenatalCare': 5500, 'delivery': 8000, 'postpartumCare': 15000,
-                        'monthlyBabyCost': 1600, 'kindergarten': 72000, 'primarySchool': 132000,
-                        'juniorHigh': 108000, 'seniorHigh': 96000, 'university': 480000,
-                        'extracurricular': 80000
-                    }],
-                    'baseLivingCost': 4200, 'livingInflation': 2.0, 'investmentReturn': 3.5
-                },
-                "conservative": {  # 保守型 - 低风险偏好，稳定配置
-                    'salaryA': 16000, 'salaryB': 14000, 'annualBonus': 50000,
-                    'incomeStability': 92, 'propertyValue': 1500000,  # 小户型，现金多
-                    'propertyAppreciation': -0.8, 'monthlyMortgage': 4500,  # 低杠杆
-                    'annualParentSupport': 45000,  # 多父母支持
-                    'marriageCosts': {
-                        'betrothalGift': 38000, 'weddingCeremony': 88000,  # 节约婚礼
-                        'weddingRing': 25000, 'honeymoon': 30000,  # 适中消费
-                        'newHouseDownPayment': 300000, 'renovation': 120000  # 简单装修
-                    },
-                    'children': [{
-                        'prenatalCare': 6500, 'delivery': 9500, 'postpartumCare': 18000,
-                        'monthlyBabyCost': 1800, 'kindergarten': 72000, 'primarySchool': 144000,
-                        'juniorHigh': 120000, 'seniorHigh': 108000, 'university': 600000,
-                        'extracurricular': 96000
-                    }],
-                    'baseLivingCost': 5200, 'livingInflation': 2.0, 'investmentReturn': 3.0
-                },
-                "aggressive": {  # 激进型 - 高风险偏好，激进配置
-                    'salaryA': 32000, 'salaryB': 28000, 'annualBonus': 150000,  # 高收入
-                    'incomeStability': 65, 'propertyValue': 2800000,  # 大户型，杠杆高
-                    'propertyAppreciation': 1.5, 'monthlyMortgage': 11000,  # 高杠杆
-                    'annualParentSupport': 25000,  # 少父母支持
-                    'marriageCosts': {
-                        'betrothalGift': 88000, 'weddingCeremony': 180000,  # 豪华婚礼
-                        'weddingRing': 80000, 'honeymoon': 100000,  # 奢侈消费
-                        'newHouseDownPayment': 560000, 'renovation': 350000  # 豪华装修
-                    },
-                    'children': [{
-                        'prenatalCare': 12000, 'delivery': 20000, 'postpartumCare': 35000,
-                        'monthlyBabyCost': 3200, 'kindergarten': 180000, 'primarySchool': 360000,
-                        'juniorHigh': 300000, 'seniorHigh': 240000, 'university': 1200000,
-                        'extracurricular': 240000
-                    }],
-                    'baseLivingCost': 9200, 'livingInflation': 3.0, 'investmentReturn': 7.0
-                },
-                "balanced": {  # 平衡型 - 稳健配置，均衡发展
-                    'salaryA': 24000, 'salaryB': 20000, 'annualBonus': 90000,  # 中高收入
-                    'incomeStability': 80, 'propertyValue': 2200000,  # 舒适户型
-                    'propertyAppreciation': 0.3, 'monthlyMortgage': 7800,  # 中等杠杆
-                    'annualParentSupport': 38000,  # 中等父母支持
-                    'marriageCosts': {
-                        'betrothalGift': 65000, 'weddingCeremony': 135000,  # 体面婚礼
-                        'weddingRing': 45000, 'honeymoon': 55000,  # 品质消费
-                        'newHouseDownPayment': 440000, 'renovation': 220000  # 舒适装修
-                    },
-                    'children': [{
-                        'prenatalCare': 9500, 'delivery': 14000, 'postpartumCare': 26000,
-                        'monthlyBabyCost': 2500, 'kindergarten': 120000, 'primarySchool': 240000,
-                        'juniorHigh': 192000, 'seniorHigh': 168000, 'university': 960000,
-                        'extracurricular': 144000
-                    }],
-                    'baseLivingCost': 7200, 'livingInflation': 2.3, 'investmentReturn': 4.5
-                }
-            }
-
-            if preset_type in presets:
-                # 合并预设配置到当前数据
-                preset = presets[preset_type]
-                for key, value in preset.items():
-                    if key in self.form_data:
-                        if isinstance(value, dict):
-                            self.form_data[key].update(value)
-                        else:
-                            self.form_data[key] = value
-
+            if apply_preset(self.form_data, preset_type):
                 # 更新界面
                 self.update_ui_from_data()
                 self.calculate()
 
-                preset_names = {
-                    "tier1": "一线城市", "tier2": "二线城市", "tier3": "三线城市",
-                    "conservative": "保守型", "aggressive": "激进型", "balanced": "平衡型"
-                }
-                messagebox.showinfo("预设加载成功", f"{preset_names[preset_type]}配置已加载")
+                messagebox.showinfo("预设加载成功", f"{PRESET_NAMES[preset_type]}配置已加载")
 
         except Exception as e:
             messagebox.showerror("预设加载失败", f"加载预设配置时出现错误：{str(e)}")
@@ -1270,12 +1233,18 @@ class MarriageCalculatorApp:
                 entry.delete(0, tk.END)
                 entry.insert(0, str(self.form_data[key]))
 
+            if self.form_data.get('riskSimulation', False):
+                self.risk_switch.select()
+            else:
+                self.risk_switch.deselect()
+
         except Exception as e:
             print(f"更新界面时出现错误: {e}")
 
     def run(self):
         """运行应用程序"""
         self.root.mainloop()
+        self.live_executor.shutdown(wait=False, cancel_futures=True)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,294 @@
+"""
+房贷还款计划
+Mortgage amortization schedules (equal installment / equal principal)
+
+支持等额本息（equalInstallment）和等额本金（equalPrincipal）两种方式，
+以及提前还款（缩短年限 reduceTerm / 减少月供 reducePayment）和 LPR 利率调整。
+
+每段还款计划用闭式解一次算出所有月份：
+- 等额本息：第 k 期末余额 B_k = B·(1+r)^k - M·((1+r)^k - 1)/r
+- 等额本金：第 k 期末余额 B_k = B - k·B/n
+每期利息 = 上期末余额 × 月利率，每期还本 = 余额之差。提前还款、利率调整把计划分成若干段，逐段套用闭式解。
+
+form_data 中的 mortgage 字段（可选，设置后代替 monthlyMortgage）：
+    'mortgage': {
+        'principal': 840000,            # 贷款本金
+        'annualRate': 3.95,             # 年利率（%）
+        'termYears': 30,                # 贷款年限
+        'method': 'equalInstallment',   # 或 'equalPrincipal'
+        'prepayments': [{'year': 5, 'amount': 100000, 'mode': 'reduceTerm'}],
+        'rateResets': [{'year': 1, 'annualRate': 3.45}],
+    }
+year 为第一次还款起的年数，事件发生在第 year×12 期还款之后。月供从结婚准备期之后开始（与 monthlyMortgage 相同）。
+
+单笔贷款的计划按 (本金, 利率, 年限, 方式, 提前还款, 利率调整) 缓存；批量计算时相同的贷款只计算一次。
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+METHODS = {'equalInstallment': '等额本息', 'equalPrincipal': '等额本金'}
+PREPAYMENT_MODES = {'reduceTerm': '缩短年限', 'reducePayment': '减少月供'}
+
+# 批量列中 mortgage.method 的数值编码
+METHOD_CODES = {'equalInstallment': 0, 'equalPrincipal': 1}
+
+MORTGAGE_PATHS = ('mortgage.principal', 'mortgage.annualRate', 'mortgage.termYears', 'mortgage.method')
+
+SCHEDULE_CACHE_SIZE = 1024
+
+
+def _closed_form(balance, monthly_rate, months, equal_principal, length):
+    """L 笔贷款从余额 balance 起按月还款 length 个月的闭式解，超过剩余期数 months 的月份为 0
+
+    参数均为长度 L 的数组，返回 (还款额, 利息, 还本, 期末余额)，形状均为 (L, length)
+    """
+    balance = np.asarray(balance, dtype=np.float64)[:, None]
+    rate = np.asarray(monthly_rate, dtype=np.float64)[:, None]
+    months = np.asarray(months, dtype=np.float64)[:, None]
+    equal_principal = np.asarray(equal_principal, dtype=bool)[:, None]
+    k = np.arange(1, length + 1, dtype=np.float64)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = np.exp(np.log1p(rate) * k)
+        growth_n = np.exp(np.log1p(rate) * months)
+        installment = np.where(rate > 0, balance * rate * growth_n / (growth_n - 1), balance / months)
+        annuity_balance = np.where(rate > 0, balance * growth - installment * (growth - 1) / rate,
+                                   balance - installment * k)
+    principal_balance = balance - balance / months * k
+
+    end_balance = np.where(equal_principal, principal_balance, annuity_balance)
+    end_balance = np.where(k < months, np.maximum(end_balance, 0.0), 0.0)
+    start_balance = np.concatenate([balance, end_balance[:, :-1]], axis=1)
+    start_balance[:, 1:] *= k[:-1] < months
+
+    interest = start_balance * rate
+    principal = start_balance - end_balance
+    return principal + interest, interest, principal, end_balance
+
+
+def _remaining_months(balance, monthly_rate, payment, equal_principal, principal_per_month):
+    """提前还款后保持月供（等额本息）或每月还本额（等额本金）不变时的剩余期数"""
+    if equal_principal:
+        return int(np.ceil(balance / principal_per_month - 1e-9))
+    if monthly_rate == 0:
+        return int(np.ceil(balance / payment - 1e-9))
+    return int(np.ceil(np.log(payment / (payment - balance * monthly_rate)) / np.log1p(monthly_rate) - 1e-9))
+
+
+@lru_cache(maxsize=SCHEDULE_CACHE_SIZE)
+def amortization_schedule(principal, annual_rate, term_years, method='equalInstallment',
+                          prepayments=(), rate_resets=()):
+    """单笔贷款的逐月还款计划
+
+    prepayments: ((year, amount, mode), ...)；rate_resets: ((year, annual_rate), ...)
+    返回 {'payment', 'interest', 'principal', 'balance'}（逐月数组，只读，会被多个调用方共享）
+    和 'totalInterest'、'months'
+    """
+    if method not in METHODS:
+        raise ValueError(f"不支持的还款方式: {method}（可选 {', '.join(METHODS)}）")
+    months = int(round(term_years * 12))
+    if months < 1:
+        raise ValueError(f"贷款年限必须大于 0: {term_years}")
+    equal_principal = method == 'equalPrincipal'
+
+    events = [(max(1, int(round(year * 12))), 0, float(rate), None) for year, rate in rate_resets]
+    for year, amount, mode in prepayments:
+        if mode not in PREPAYMENT_MODES:
+            raise ValueError(f"不支持的提前还款方式: {mode}（可选 {', '.join(PREPAYMENT_MODES)}）")
+        events.append((max(1, int(round(year * 12))), 1, float(amount), mode))
+    events.sort(key=lambda event: event[:2])
+
+    balance = float(principal)
+    rate = annual_rate / 1200
+    remaining = months
+    elapsed = 0
+    pieces = []
+
+    def run(length):
+        nonlocal balance, remaining, elapsed
+        segment = _closed_form([balance], [rate], [remaining], [equal_principal], length)
+        pieces.append([part[0].copy() for part in segment])
+        balance = float(segment[3][0, -1])
+        remaining -= length
+        elapsed += length
+
+    for month, kind, value, mode in events:
+        if remaining <= 0:
+            break
+        if month > elapsed:
+            principal_per_month = balance / remaining
+            run(min(month - elapsed, remaining))
+            if remaining <= 0:
+                break
+        else:
+            principal_per_month = balance / remaining
+
+        if kind == 0:
+            rate = value / 1200
+            continue
+
+        # 提前还款计入当期（第 month 期）的还款额和还本额
+        amount = min(value, balance)
+        payment = pieces[-1][0][-1] if pieces else 0.0
+        if pieces:
+            pieces[-1][0][-1] += amount
+            pieces[-1][2][-1] += amount
+            pieces[-1][3][-1] -= amount
+        balance -= amount
+        if balance <= 1e-6:
+            balance = 0.0
+            remaining = 0
+        elif mode == 'reduceTerm' and pieces:
+            remaining = min(remaining, _remaining_months(balance, rate, payment, equal_principal, principal_per_month))
+
+    if remaining > 0:
+        run(remaining)
+
+    payment, interest, principal_paid, end_balance = (np.concatenate(part) for part in zip(*pieces))
+    for array in (payment, interest, principal_paid, end_balance):
+        array.flags.writeable = False
+    return {
+        'payment': payment,
+        'interest': interest,
+        'principal': principal_paid,
+        'balance': end_balance,
+        'totalInterest': float(interest.sum()),
+        'months': len(payment),
+    }
+
+
+def loan_schedule(mortgage):
+    """按 form_data['mortgage'] 生成（或从缓存取出）还款计划"""
+    prepayments = tuple(
+        (float(item['year']), float(item['amount']), item.get('mode', 'reduceTerm'))
+        for item in mortgage.get('prepayments', ())
+    )
+    rate_resets = tuple(
+        (float(item['year']), float(item['annualRate']))
+        for item in mortgage.get('rateResets', ())
+    )
+    return amortization_schedule(float(mortgage['principal']), float(mortgage['annualRate']),
+                                 float(mortgage['termYears']), mortgage.get('method', 'equalInstallment'),
+                                 prepayments, rate_resets)
+
+
+def mortgage_columns(form_datas):
+    """按列组织的贷款参数（没有 mortgage 的家庭本金为 0），提前还款和利率调整不在批量列中"""
+    loans = [data.get('mortgage') or {} for data in form_datas]
+    return {
+        'mortgage.principal': np.array([loan.get('principal', 0) for loan in loans], dtype=np.float64),
+        'mortgage.annualRate': np.array([loan.get('annualRate', 0) for loan in loans], dtype=np.float64),
+        'mortgage.termYears': np.array([loan.get('termYears', 0) for loan in loans], dtype=np.float64),
+        'mortgage.method': np.array([METHOD_CODES[loan.get('method', 'equalInstallment')] for loan in loans],
+                                    dtype=np.float64),
+    }
+
+
+def period_schedules(payment, principal, months_per_period, n_periods):
+    """逐月还款额、还本额 (L, 月数) 截断或补零到 n_periods 期后按期汇总
+
+    返回 {'payment', 'principal': (L, n_periods), 'balance': 期末剩余本金 (L,), 'firstPayment': (L,)}
+    """
+    payment = np.atleast_2d(payment)
+    principal = np.atleast_2d(principal)
+    payment_periods = period_totals(payment, months_per_period, n_periods)
+    principal_periods = period_totals(principal, months_per_period, n_periods)
+    return {
+        'payment': payment_periods,
+        'principal': principal_periods,
+        'balance': principal.sum(axis=1) - principal_periods.sum(axis=1),
+        'firstPayment': payment[:, 0].copy(),
+    }
+
+
+def batch_schedules(principal, annual_rate, term_years, method, months_per_period=1, n_periods=None,
+                    block_size=1024):
+    """N 笔贷款按期汇总的还款计划，相同的 (本金, 利率, 年限, 方式) 只计算一次
+
+    n_periods 缺省时按月返回、长度为最长期数。本金为 0 的家庭全为 0。
+    返回 period_schedules 的各项（每种贷款一行），另有 'index': 第 i 个家庭对应的行号 (N,)
+    """
+    keys = np.column_stack(np.broadcast_arrays(principal, annual_rate, term_years, method)).astype(np.float64)
+    unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+
+    months = np.maximum(np.rint(unique[:, 2] * 12), 1)
+    length = int(months[unique[:, 0] > 0].max()) if (unique[:, 0] > 0).any() else 1
+    if n_periods is None:
+        n_periods = length // months_per_period
+
+    # 按块计算，避免不同贷款很多时生成过大的逐月数组
+    blocks = []
+    for start in range(0, len(unique), block_size):
+        rows = slice(start, start + block_size)
+        payment, _, principal_paid, _ = _closed_form(unique[rows, 0], unique[rows, 1] / 1200, months[rows],
+                                                     unique[rows, 3] == METHOD_CODES['equalPrincipal'], length)
+        blocks.append(period_schedules(payment, principal_paid, months_per_period, n_periods))
+
+    result = {key: np.concatenate([block[key] for block in blocks]) for key in blocks[0]}
+    result['index'] = inverse.ravel()
+    return result
+
+
+def period_totals(monthly, months_per_period, n_periods):
+    """将逐月数组 (N, 月数) 截断或补零到 n_periods 期后按期求和，返回 (N, n_periods)"""
+    n_months = months_per_period * n_periods
+    monthly = np.atleast_2d(monthly)
+    if monthly.shape[1] >= n_months:
+        monthly = monthly[:, :n_months]
+    else:
+        monthly = np.pad(monthly, ((0, 0), (0, n_months - monthly.shape[1])))
+    return monthly.reshape(len(monthly), n_periods, months_per_period).sum(axis=2)
+
+
+def mortgage_summary(schedule, months_paid, property_value_end):
+    """分析期内的还款汇总：期末余额和房产净值（期末市值 - 剩余本金）"""
+    months_paid = min(months_paid, schedule['months'])
+    ending_balance = float(schedule['balance'][months_paid - 1]) if months_paid else float(
+        schedule['principal'].sum())
+    return {
+        'firstPayment': float(schedule['payment'][0]),
+        'totalPaid': float(schedule['payment'][:months_paid].sum()),
+        'totalInterest': float(schedule['interest'][:months_paid].sum()),
+        'endingBalance': ending_balance,
+        'propertyValueEnd': property_value_end,
+        'propertyEquity': property_value_end - ending_balance,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="房贷还款计划")
+    parser.add_argument("--principal", type=float, required=True, help="贷款本金")
+    parser.add_argument("--rate", type=float, required=True, help="年利率（%%）")
+    parser.add_argument("--years", type=float, default=30, help="贷款年限，默认 30")
+    parser.add_argument("--method", choices=tuple(METHODS), default='equalInstallment', help="还款方式")
+    parser.add_argument("--prepay", action="append", default=[],
+                        help="提前还款 年:金额[:reduceTerm|reducePayment]，可重复")
+    parser.add_argument("--reset", action="append", default=[], help="利率调整 年:年利率，可重复")
+    args = parser.parse_args()
+
+    prepayments = []
+    for text in args.prepay:
+        parts = text.split(':')
+        prepayments.append((float(parts[0]), float(parts[1]), parts[2] if len(parts) > 2 else 'reduceTerm'))
+    rate_resets = [tuple(float(part) for part in text.split(':')) for text in args.reset]
+
+    start = time.perf_counter()
+    schedule = amortization_schedule(args.principal, args.rate, args.years, args.method,
+                                     tuple(prepayments), tuple(rate_resets))
+    elapsed = time.perf_counter() - start
+
+    print(f"{METHODS[args.method]} 本金 {args.principal / 10000:.1f}万 年利率 {args.rate}% "
+          f"共 {schedule['months']} 期（{schedule['months'] / 12:.1f}年）")
+    print(f"首月还款 {schedule['payment'][0]:.2f}，总利息 {schedule['totalInterest'] / 10000:.2f}万")
+    print(f"{'年':>4}{'还款额':>14}{'利息':>14}{'还本':>14}{'年末余额':>14}")
+    for year in range(0, schedule['months'], 12):
+        end = min(year + 12, schedule['months'])
+        print(f"{year // 12 + 1:>4}{schedule['payment'][year:end].sum():>14.2f}"
+              f"{schedule['interest'][year:end].sum():>14.2f}{schedule['principal'][year:end].sum():>14.2f}"
+              f"{schedule['balance'][end - 1]:>14.2f}")
+    print(f"计算耗时 {elapsed * 1000:.2f}ms")
@@ -0,0 +1,292 @@
+"""
+参数扫描（网格搜索）
+Parameter sweep / grid-search runner
+
+对任意 form_data 字段（包括 marriageCosts.xxx、children[0].xxx 等嵌套字段）给出取值列表或区间，
+按笛卡尔积分块惰性展开，每块交给批量引擎计算后立即写出到 CSV 或 .npy 列文件，
+整个网格不会同时驻留内存。
+
+FIELD_PATHS 以外的字段（mortgage.principal、children[1].birthOffset 等）写入每个网格点的
+配置副本，由 perform_analysis 逐点计算；基准配置中可以没有的 timeResolution、horizonYears 也可以扫描
+（见 OPTIONAL_FIELDS）。LABEL_FIELDS 中的字段不影响计算，只作为标签原样输出。
+
+命令行示例：
+    python parameter_sweep.py --axis salaryA=10000:40000:5000 --axis childCount=0,1,2 --out sweep.csv
+    python parameter_sweep.py --config marriage_calculator_config.json \\
+        --axis monthlyMortgage=3000:12000:500 --axis propertyAppreciation=-5:5:0.5 --out sweep_npy
+"""
+
+import copy
+import csv
+import json
+import os
+import time
+
+import numpy as np
+
+from calculator_engine import FIELD_PATHS, CHART_SERIES, default_form_data, get_field, set_field, uses_timeline
+from batch_engine import form_data_to_columns, evaluate_forms
+
+RESULT_METRICS = (
+    'totalNetAssetsChange', 'minCashFlowSurplus', 'riskCoefficient',
+    'totalCost', 'totalMarriageCost', 'childEducationCost', 'endingPortfolio'
+)
+
+DEFAULT_CHUNK_SIZE = 65536
+
+# 不参与计算、只作为标签输出的字段
+LABEL_FIELDS = ('cityTier',)
+
+# 基准配置中可以没有的时间网格设置：字段 -> 是否接受该取值
+OPTIONAL_FIELDS = {
+    'timeResolution': lambda value: value in ('yearly', 'monthly'),
+    'horizonYears': lambda value: isinstance(value, (int, float)) and value >= 1 and float(value).is_integer(),
+}
+
+# 扫描只输出确定性结果，风险模拟的设置不能作为扫描轴
+UNSWEEPABLE_PREFIXES = ('riskSimulation', 'riskSettings')
+
+
+def parse_axis_values(text):
+    """解析取值：区间 "起:止:步长"（包含终点）或逗号分隔的列表"""
+    if ':' in text:
+        parts = text.split(':')
+        try:
+            start, stop, step = (float(v) for v in parts)
+        except ValueError:
+            raise ValueError(f"区间格式应为 起:止:步长（均为数值）: {text}")
+        if step == 0:
+            raise ValueError(f"步长不能为0: {text}")
+        count = int(np.floor((stop - start) / step + 1e-9)) + 1
+        return [start + i * step for i in range(max(count, 0))]
+
+    values = []
+    for item in text.split(','):
+        item = item.strip()
+        try:
+            values.append(float(item))
+        except ValueError:
+            values.append(item)
+    return values
+
+
+def parse_axis_spec(spec):
+    """解析 "字段路径=取值" 形式的扫描轴"""
+    path, sep, text = spec.partition('=')
+    if not sep:
+        raise ValueError(f"扫描轴格式应为 字段路径=取值: {spec}")
+    return path.strip(), parse_axis_values(text)
+
+
+def _validate_axes(base, axes):
+    """检查扫描轴：FIELD_PATHS 中的字段只接受数值，其他字段必须存在于基准配置中"""
+    for path, values in axes.items():
+        if not values:
+            raise ValueError(f"扫描轴 {path} 没有取值")
+        numeric = all(isinstance(v, (int, float)) for v in values)
+        if path in FIELD_PATHS:
+            if not numeric:
+                raise ValueError(f"字段 {path} 只接受数值")
+            continue
+        if path.startswith(UNSWEEPABLE_PREFIXES):
+            raise ValueError(f"字段 {path} 不能作为扫描轴（扫描不做风险模拟）")
+        if path in OPTIONAL_FIELDS:
+            invalid = [value for value in values if not OPTIONAL_FIELDS[path](value)]
+            if invalid:
+                raise ValueError(f"字段 {path} 的取值无效: {invalid}")
+            continue
+        try:
+            get_field(base, path)
+        except (KeyError, IndexError, TypeError):
+            raise ValueError(f"未知字段: {path}")
+
+    # horizonYears 只在时间网格引擎中生效，按 6 个固定阶段计算时各点结果相同
+    if 'horizonYears' in axes and 'timeResolution' not in axes and not uses_timeline(base):
+        raise ValueError("horizonYears 只在时间网格引擎中生效，请同时设置 timeResolution（配置或扫描轴）")
+
+
+def _axis_value(base, path, value):
+    """基准值为整数时把整数值的浮点数还原为 int（如 termYears、birthOffset、horizonYears）"""
+    if path in OPTIONAL_FIELDS:
+        return int(value) if path == 'horizonYears' else value
+    if type(get_field(base, path)) is int and isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _chunk_templates(base, axis_columns, template_paths):
+    """本块每个网格点的配置：FIELD_PATHS 以外的扫描轴写入基准配置的副本，相同取值共用一份"""
+    n = len(next(iter(axis_columns.values())))
+    if not template_paths:
+        return [base] * n
+    templates = {}
+    rows = []
+    for i in range(n):
+        key = tuple(axis_columns[path][i].item() for path in template_paths)
+        template = templates.get(key)
+        if template is None:
+            template = copy.deepcopy(base)
+            for path, value in zip(template_paths, key):
+                set_field(template, path, _axis_value(base, path, value))
+            templates[key] = template
+        rows.append(template)
+    return rows
+
+
+def sweep_size(axes):
+    """网格总点数"""
+    size = 1
+    for values in axes.values():
+        size *= len(values)
+    return size
+
+
+def iter_sweep_chunks(base, axes, chunk_size=DEFAULT_CHUNK_SIZE):
+    """按块惰性展开笛卡尔积并计算
+
+    每次产出 (axis_columns, result)：axis_columns 为本块各扫描轴的取值数组，
+    result 为 evaluate_forms 的结果（需要时间网格或房贷还款计划的网格点逐点用 perform_analysis 计算）。
+    """
+    _validate_axes(base, axes)
+    paths = list(axes)
+    template_paths = [path for path in paths if path not in FIELD_PATHS and path not in LABEL_FIELDS]
+    axis_arrays = [np.asarray(axes[path]) for path in paths]
+    shape = tuple(len(values) for values in axis_arrays)
+    total = sweep_size(axes)
+    base_columns = form_data_to_columns([base])
+
+    for start in range(0, total, chunk_size):
+        stop = min(start + chunk_size, total)
+        indices = np.unravel_index(np.arange(start, stop), shape)
+        axis_columns = {path: values[index] for path, values, index in zip(paths, axis_arrays, indices)}
+
+        columns = dict(base_columns)
+        for path, values in axis_columns.items():
+            if path in FIELD_PATHS:
+                columns[path] = values.astype(np.float64)
+        yield axis_columns, evaluate_forms(columns, _chunk_templates(base, axis_columns, template_paths))
+
+
+def _output_columns(axis_columns, result, include_series):
+    """组合本块要写出的列（保持顺序）"""
+    columns = dict(axis_columns)
+    for name in RESULT_METRICS:
+        columns[name] = result[name]
+    if include_series:
+        for name in CHART_SERIES:
+            for idx, stage_name in enumerate(result['stageNames']):
+                columns[f"{name}.{stage_name}"] = result['series'][name][:, idx]
+    return columns
+
+
+class CsvSweepWriter:
+    """逐块写出 CSV"""
+
+    def __init__(self, path, total):
+        self.file = open(path, "w", encoding="utf-8", newline="")
+        self.writer = csv.writer(self.file)
+        self.header_written = False
+
+    def write(self, start, columns):
+        if not self.header_written:
+            self.writer.writerow(columns.keys())
+            self.header_written = True
+        self.writer.writerows(zip(*(np.asarray(c).tolist() for c in columns.values())))
+
+    def close(self):
+        self.file.close()
+
+
+class NpySweepWriter:
+    """逐块追加写入 .npy 列文件（每列一个文件，先写入完整长度的文件头，再顺序追加数据）"""
+
+    def __init__(self, directory, total):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.total = total
+        self.files = {}
+
+    def _open(self, name, sample):
+        # 标签轴的字符串宽度由完整取值列表决定，各块一致
+        f = open(os.path.join(self.directory, f"{name}.npy"), "wb")
+        header = {'descr': np.lib.format.dtype_to_descr(sample.dtype), 'fortran_order': False, 'shape': (self.total,)}
+        np.lib.format.write_array_header_1_0(f, header)
+        return f
+
+    def write(self, start, columns):
+        for name, values in columns.items():
+            values = np.ascontiguousarray(values)
+            if name not in self.files:
+                self.files[name] = self._open(name, values)
+            self.files[name].write(values.tobytes())
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+        self.files.clear()
+
+
+def run_sweep(base, axes, output, chunk_size=DEFAULT_CHUNK_SIZE, include_series=False, output_format=None):
+    """执行参数扫描并流式写出结果，返回网格总点数
+
+    output_format: 'csv' 或 'npy'；缺省时按输出路径推断（.csv 为 CSV，否则为 .npy 列目录）
+    扫描轴在打开输出之前检查，无效时抛出 ValueError，不会清空已有的输出文件。
+    """
+    _validate_axes(base, axes)
+    if output_format is None:
+        output_format = 'csv' if output.lower().endswith('.csv') else 'npy'
+    total = sweep_size(axes)
+    writer_class = CsvSweepWriter if output_format == 'csv' else NpySweepWriter
+    writer = writer_class(output, total)
+
+    start = 0
+    stage_names = None
+    try:
+        for axis_columns, result in iter_sweep_chunks(base, axes, chunk_size):
+            if include_series:
+                # 各阶段序列按列写出，所有网格点的阶段必须相同（birthOffset、horizonYears 等会改变阶段）
+                if result['stageNames'] is None or stage_names not in (None, result['stageNames']):
+                    raise ValueError("扫描轴改变了生命周期阶段，不能同时输出各阶段序列（--series）")
+                stage_names = result['stageNames']
+            columns = _output_columns(axis_columns, result, include_series)
+            writer.write(start, columns)
+            start += len(result['minCashFlowSurplus'])
+    finally:
+        writer.close()
+    return total
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="参数扫描 / 网格搜索")
+    parser.add_argument("--config", help="基准配置文件（默认使用内置二线城市参数）")
+    parser.add_argument("--axis", action="append", required=True,
+                        help="扫描轴，如 salaryA=10000:40000:5000 或 children[0].university=480000,720000")
+    parser.add_argument("--out", required=True, help="输出路径：.csv 文件或 .npy 列目录")
+    parser.add_argument("--format", choices=["csv", "npy"], help="输出格式（默认按输出路径推断）")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="每块计算的网格点数")
+    parser.add_argument("--series", action="store_true", help="同时输出各阶段图表序列")
+    args = parser.parse_args()
+
+    base = default_form_data()
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            base = json.load(f)
+
+    try:
+        axes = dict(parse_axis_spec(spec) for spec in args.axis)
+        _validate_axes(base, axes)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"网格点数: {sweep_size(axes):,}")
+
+    start_time = time.perf_counter()
+    try:
+        total = run_sweep(base, axes, args.out, args.chunk_size, args.series, args.format)
+    except ValueError as e:
+        print(f"❌ 扫描失败: {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start_time
+    print(f"完成 {total:,} 组计算，耗时 {elapsed:.2f}s，结果已写入 {args.out}")
@@ -0,0 +1,156 @@
+"""
+分阶段计时
+Low-overhead timing spans for the GUI hot path
+
+用 with SPANS.span('名称'): 包住一个阶段，记录每次的耗时。每个名称只保留最近 window 次的耗时，
+汇总时给出次数、最近一次、p50 / p95 / 最大值。汇总可在数据管理页查看，也可导出为 JSON。
+
+关闭（SPANS.enabled = False，或启动前设置环境变量 MARRIAGE_CALC_SPANS=0）后 span() 直接返回
+一个共享的空上下文，不读时钟、不加锁，开销只有一次方法调用。
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+
+DEFAULT_WINDOW = 256
+
+
+class _Span:
+    """一次计时；退出时把耗时记入所属的 SpanRecorder"""
+
+    __slots__ = ('recorder', 'name', 'start')
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.recorder.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NullSpan:
+    """关闭计时时使用的空上下文"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+def _percentile(ordered, q):
+    """已排序序列的分位数（最近秩法）"""
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def _display_width(text):
+    """终端显示宽度（中文字符占两列）"""
+    return sum(2 if ord(ch) > 0x2E80 else 1 for ch in text)
+
+
+def _pad(text, width, align='<'):
+    """按显示宽度补齐"""
+    padding = ' ' * max(width - _display_width(text), 0)
+    return text + padding if align == '<' else padding + text
+
+
+class SpanRecorder:
+    """按名称保存最近 window 次耗时的计时器（线程安全）"""
+
+    def __init__(self, window=DEFAULT_WINDOW, enabled=True):
+        self.window = window
+        self.enabled = enabled
+        self._samples = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def span(self, name):
+        """计时上下文：with recorder.span('calculate'): ..."""
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(self, name)
+
+    def traced(self, name, func):
+        """返回带计时的 func（用于提交到后台线程的函数）"""
+        def wrapper(*args, **kwargs):
+            with self.span(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def record(self, name, seconds):
+        """记录一次耗时（秒）"""
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+                self._counts[name] = 0
+            samples.append(seconds)
+            self._counts[name] += 1
+
+    def summary(self):
+        """各阶段的统计：{名称: {'count', 'last', 'p50', 'p95', 'max'}}（毫秒，按窗口内的样本计算）"""
+        with self._lock:
+            snapshot = {name: (list(samples), self._counts[name]) for name, samples in self._samples.items()}
+
+        result = {}
+        for name, (samples, count) in snapshot.items():
+            ordered = sorted(samples)
+            result[name] = {
+                'count': count,
+                'last': samples[-1] * 1000,
+                'p50': _percentile(ordered, 50) * 1000,
+                'p95': _percentile(ordered, 95) * 1000,
+                'max': ordered[-1] * 1000,
+            }
+        return result
+
+    def format_summary(self):
+        """格式化为文本表格"""
+        summary = self.summary()
+        if not summary:
+            return "暂无计时数据" if self.enabled else "计时已关闭"
+        width = max(_display_width(name) for name in list(summary) + ['阶段']) + 2
+        header = [('次数', 8), ('最近(ms)', 10), ('p50(ms)', 10), ('p95(ms)', 10), ('最大(ms)', 10)]
+        lines = [_pad('阶段', width) + "".join(_pad(title, w, '>') for title, w in header)]
+        for name, row in summary.items():
+            lines.append(f"{_pad(name, width)}{row['count']:>8}{row['last']:>10.2f}{row['p50']:>10.2f}"
+                         f"{row['p95']:>10.2f}{row['max']:>10.2f}")
+        return "\n".join(lines)
+
+    def dump(self, path):
+        """将统计和窗口内的原始耗时（毫秒）写出为 JSON"""
+        with self._lock:
+            samples = {name: [s * 1000 for s in values] for name, values in self._samples.items()}
+        data = {
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'window': self.window,
+            'enabled': self.enabled,
+            'summary': self.summary(),
+            'samples': samples,
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+    def reset(self):
+        """清空所有记录"""
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+
+# 界面共用的计时器
+SPANS = SpanRecorder(enabled=os.environ.get('MARRIAGE_CALC_SPANS', '1') != '0')
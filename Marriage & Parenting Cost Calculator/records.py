@@ -0,0 +1,341 @@
+"""
+紧凑的家庭与结果记录
+Compact slotted household and stage-result records
+
+大批量场景下代替嵌套字典：
+
+- HouseholdRecord：FIELD_PATHS 中的数值保存在一个 array('d') 中，其余内容（城市级别、开关、
+  多出的孩子、房贷等）去掉这些数值后作为 JSON 骨架，相同的骨架在记录间共享
+  （驻留表容量有限，长时间运行的服务中不会无限增长）
+- StageResult：各阶段的图表序列和汇总指标保存在一个 array('d') 中，阶段名称共享；
+  时间网格、房贷、风险模拟等附加结果原样保留（与原结果共享，只读）
+
+两者与原有 JSON 格式可以无损互转：整数仍为整数、键的顺序不变（to_form_data() / to_result() 与原字典相等，
+json.dumps 的输出逐字相同）。analyze_records 对简单配置直接从数值数组批量计算，不经过字典。
+"""
+
+import json
+import threading
+from array import array
+from collections import OrderedDict
+
+from calculator_engine import STAGES, CHART_SERIES, FIELD_PATHS, parse_field_path, set_field, perform_analysis
+
+RESULT_METRICS = ('totalNetAssetsChange', 'minCashFlowSurplus', 'totalMarriageCost', 'childEducationCost',
+                  'totalCost', 'riskCoefficient', 'endingPortfolio')
+
+ROW_KEYS = ('name',) + CHART_SERIES + ('isMarriageStage',)
+
+FIELD_INDEX = {path: i for i, path in enumerate(FIELD_PATHS)}
+FIELD_KEYS = tuple(parse_field_path(path) for path in FIELD_PATHS)
+
+INTERN_MAXSIZE = 1024
+
+
+class _InternTable:
+    """线程安全、容量有限的 LRU 驻留表：相同内容返回同一对象
+
+    淘汰只影响之后创建的记录能否与之前的记录共享，已有记录仍持有自己的引用。
+    """
+
+    def __init__(self, maxsize=INTERN_MAXSIZE):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def intern(self, value):
+        with self._lock:
+            existing = self._items.get(value)
+            if existing is None:
+                self._items[value] = existing = value
+                while len(self._items) > self.maxsize:
+                    self._items.popitem(last=False)
+            else:
+                self._items.move_to_end(value)
+            return existing
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+# 共享的骨架与阶段布局：相同内容只保存一份
+_SKELETONS = _InternTable()
+_LAYOUTS = _InternTable()
+
+
+def _int_mask(values):
+    """整数值（非布尔）所在位置的位掩码"""
+    mask = 0
+    for i, value in enumerate(values):
+        if type(value) is int:
+            mask |= 1 << i
+    return mask
+
+
+def _restore(values, mask):
+    """按位掩码把整数位置的值还原为 int"""
+    if not mask:
+        return list(values)
+    return [int(value) if mask >> i & 1 else value for i, value in enumerate(values)]
+
+
+def _split_fields(data):
+    """取出 FIELD_PATHS 的数值，并返回把这些位置置为 None 的副本（只复制路径上的容器）"""
+    raw = []
+    shell = dict(data)
+    copied = {id(shell)}
+    for keys in FIELD_KEYS:
+        source = data
+        target = shell
+        for key in keys[:-1]:
+            source = source[key]
+            child = target[key]
+            if id(child) not in copied:
+                child = dict(child) if isinstance(child, dict) else list(child)
+                target[key] = child
+                copied.add(id(child))
+            target = child
+        raw.append(source[keys[-1]])
+        target[keys[-1]] = None
+    return raw, shell
+
+
+def _is_simple(skeleton):
+    """骨架对应的配置能否直接批量计算（单个孩子、没有时间网格 / 房贷 / 风险模拟）"""
+    data = json.loads(skeleton)
+    children = data.get('children', [])
+    return (len(children) == 1 and not data.get('timeResolution') and not data.get('mortgage')
+            and not data.get('riskSimulation') and not children[0].get('birthOffset'))
+
+
+class HouseholdRecord:
+    """一个家庭的输入参数"""
+
+    __slots__ = ('values', 'int_mask', 'skeleton')
+
+    def __init__(self, values, int_mask=0, skeleton=None):
+        self.values = values
+        self.int_mask = int_mask
+        self.skeleton = skeleton
+
+    @classmethod
+    def from_form_data(cls, data):
+        """从 form_data 创建（data 必须包含 FIELD_PATHS 中的全部字段）"""
+        raw, shell = _split_fields(data)
+        skeleton = _SKELETONS.intern(json.dumps(shell, ensure_ascii=False, separators=(',', ':')))
+        return cls(array('d', raw), _int_mask(raw), skeleton)
+
+    def to_form_data(self):
+        """还原为 form_data 字典"""
+        data = json.loads(self.skeleton)
+        for path, value in zip(FIELD_PATHS, _restore(self.values, self.int_mask)):
+            set_field(data, path, value)
+        return data
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_form_data(json.loads(text))
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_form_data(), **kwargs)
+
+    def __getitem__(self, path):
+        """按字段路径读取数值（仅限 FIELD_PATHS）"""
+        i = FIELD_INDEX[path]
+        value = self.values[i]
+        return int(value) if self.int_mask >> i & 1 else value
+
+    def __setitem__(self, path, value):
+        i = FIELD_INDEX[path]
+        self.values[i] = value
+        if type(value) is int:
+            self.int_mask |= 1 << i
+        else:
+            self.int_mask &= ~(1 << i)
+
+    def copy(self):
+        return HouseholdRecord(array('d', self.values), self.int_mask, self.skeleton)
+
+    def __eq__(self, other):
+        return (isinstance(other, HouseholdRecord) and self.values == other.values
+                and self.int_mask == other.int_mask and self.skeleton == other.skeleton)
+
+    def __repr__(self):
+        return f"HouseholdRecord({len(self.values)} fields)"
+
+
+class StageResult:
+    """一个家庭的分析结果
+
+    values 依次为各阶段的 CHART_SERIES（按阶段排列，每阶段 len(CHART_SERIES) 个）和 RESULT_METRICS；
+    layout 为共享的 (阶段名称, 是否结婚准备期) 元组。
+    """
+
+    __slots__ = ('values', 'int_mask', 'layout', 'extra')
+
+    def __init__(self, values, layout, int_mask=0, extra=None):
+        self.values = values
+        self.layout = layout
+        self.int_mask = int_mask
+        self.extra = extra
+
+    @classmethod
+    def from_result(cls, result):
+        """从 perform_analysis 格式的结果创建；其余键（timeline、mortgage、riskSimulation 等）原样保存在 extra 中"""
+        raw = []
+        names = []
+        for row in result['chartData']:
+            if tuple(row) != ROW_KEYS:
+                raise ValueError(f"无法转换的阶段数据：{list(row)}")
+            names.append((row['name'], row['isMarriageStage']))
+            raw.extend(row[series] for series in CHART_SERIES)
+        raw.extend(result[metric] for metric in RESULT_METRICS)
+
+        extra = {key: value for key, value in result.items() if key != 'chartData' and key not in RESULT_METRICS}
+        return cls(array('d', raw), _LAYOUTS.intern(tuple(names)), _int_mask(raw), extra or None)
+
+    def to_result(self):
+        """还原为 perform_analysis 格式的结果字典"""
+        values = _restore(self.values, self.int_mask)
+        width = len(CHART_SERIES)
+        chart_data = []
+        for idx, (name, is_marriage_stage) in enumerate(self.layout):
+            row = {'name': name}
+            row.update(zip(CHART_SERIES, values[idx * width:(idx + 1) * width]))
+            row['isMarriageStage'] = is_marriage_stage
+            chart_data.append(row)
+
+        result = {'chartData': chart_data}
+        result.update(zip(RESULT_METRICS, values[len(self.layout) * width:]))
+        if self.extra:
+            result.update(self.extra)
+        return result
+
+    @property
+    def stage_names(self):
+        return [name for name, _ in self.layout]
+
+    def series(self):
+        """图表序列矩阵，形状 (阶段数, len(CHART_SERIES))"""
+        import numpy as np
+        n_stages = len(self.layout)
+        return np.frombuffer(self.values, dtype=np.float64)[:n_stages * len(CHART_SERIES)].reshape(n_stages, -1)
+
+    def __getitem__(self, metric):
+        """读取汇总指标（RESULT_METRICS）或附加结果"""
+        if metric in RESULT_METRICS:
+            i = len(self.layout) * len(CHART_SERIES) + RESULT_METRICS.index(metric)
+            value = self.values[i]
+            return int(value) if self.int_mask >> i & 1 else value
+        return self.extra[metric]
+
+    def __repr__(self):
+        return f"StageResult({len(self.layout)} stages, totalNetAssetsChange={self['totalNetAssetsChange']:.0f})"
+
+
+def records_to_columns(records):
+    """把一组 HouseholdRecord 转换为 evaluate_batch 的列（不经过字典）"""
+    import numpy as np
+    matrix = np.frombuffer(b''.join(record.values for record in records), dtype=np.float64)
+    matrix = matrix.reshape(len(records), len(FIELD_PATHS))
+    return {path: matrix[:, j] for j, path in enumerate(FIELD_PATHS)}
+
+
+def batch_to_results(batch):
+    """把 evaluate_batch 的结果直接转换为 StageResult 列表（不创建 chartData 字典）"""
+    import numpy as np
+    series = np.stack([batch['series'][name] for name in CHART_SERIES], axis=2)  # (N, 阶段数, 序列数)
+    n = series.shape[0]
+    metrics = np.column_stack([batch[metric] for metric in RESULT_METRICS])
+    matrix = np.ascontiguousarray(np.concatenate([series.reshape(n, -1), metrics], axis=1), dtype=np.float64)
+
+    layout = _LAYOUTS.intern(tuple((stage['name'], stage.get('isMarriageStage', False)) for stage in STAGES))
+    row_bytes = matrix.shape[1] * 8
+    buffer = matrix.tobytes()
+    results = []
+    for i in range(n):
+        values = array('d')
+        values.frombytes(buffer[i * row_bytes:(i + 1) * row_bytes])
+        results.append(StageResult(values, layout))
+    return results
+
+
+def analyze_records(records):
+    """批量分析 HouseholdRecord，返回 StageResult 列表
+
+    简单配置直接从数值数组做一次 evaluate_batch；需要时间网格、房贷或风险模拟的配置还原为字典后逐个计算。
+    """
+    from batch_engine import evaluate_batch
+
+    records = list(records)
+    results = [None] * len(records)
+    simple = {}
+    batchable = []
+    for i, record in enumerate(records):
+        if record.skeleton not in simple:
+            simple[record.skeleton] = _is_simple(record.skeleton)
+        if simple[record.skeleton]:
+            batchable.append(i)
+        else:
+            results[i] = StageResult.from_result(perform_analysis(record.to_form_data()))
+
+    if batchable:
+        batch = evaluate_batch(records_to_columns([records[i] for i in batchable]))
+        for i, result in zip(batchable, batch_to_results(batch)):
+            results[i] = result
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    import time
+    import tracemalloc
+
+    from calculator_engine import default_form_data
+
+    parser = argparse.ArgumentParser(description="紧凑记录：内存占用与批量计算对比")
+    parser.add_argument("--count", type=int, default=10000, help="家庭数")
+    args = parser.parse_args()
+
+    import random
+    rng = random.Random(0)
+    form_datas = []
+    for _ in range(args.count):
+        data = default_form_data()
+        data['salaryA'] = rng.randint(8000, 40000)
+        data['propertyValue'] = rng.randint(5, 50) * 100000
+        form_datas.append(data)
+
+    def footprint(build):
+        tracemalloc.start()
+        items = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return items, size / args.count
+
+    _, dict_size = footprint(lambda: [json.loads(json.dumps(d)) for d in form_datas])
+    records, record_size = footprint(lambda: [HouseholdRecord.from_form_data(d) for d in form_datas])
+    print(f"每个家庭的输入：字典 {dict_size:.0f} 字节，HouseholdRecord {record_size:.0f} 字节")
+
+    from batch_engine import analyze_batch
+    dict_results, dict_result_size = footprint(lambda: analyze_batch(form_datas))
+    stage_results, record_result_size = footprint(lambda: analyze_records(records))
+    print(f"每个家庭的结果：字典 {dict_result_size:.0f} 字节，StageResult {record_result_size:.0f} 字节")
+
+    start = time.perf_counter()
+    analyze_batch(form_datas)
+    dict_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    analyze_records(records)
+    record_seconds = time.perf_counter() - start
+    print(f"批量计算 {args.count} 个家庭：analyze_batch {dict_seconds * 1000:.1f}ms，"
+          f"analyze_records {record_seconds * 1000:.1f}ms")
+
+    same = all(r.to_result() == d for r, d in zip(stage_results, dict_results))
+    print(f"结果一致: {same}")
+    sys.exit(0 if same else 1)
@@ -0,0 +1,107 @@
+"""
+分析结果缓存
+Result memoization cache keyed by canonical form_data hash
+
+对输入做规范化（数值统一为按固定位数舍入的浮点数、字典按键排序）后取 SHA-256 作为键，
+缓存 perform_analysis 的结果。界面、批量计算和服务接口共用同一个 ANALYSIS_CACHE 实例。
+
+缓存中的结果对象会被多个调用方共享，调用方只应读取，不要修改。
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from calculator_engine import perform_analysis
+
+DEFAULT_MAXSIZE = 256
+FLOAT_DIGITS = 6
+
+
+def normalize(value, digits=FLOAT_DIGITS):
+    """规范化输入：数值统一为舍入后的浮点数（1 与 1.0 相同，-0.0 记为 0.0），字典按键排序"""
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        return round(float(value), digits) + 0.0
+    if isinstance(value, dict):
+        return {str(k): normalize(value[k], digits) for k in sorted(value, key=str)}
+    if isinstance(value, (list, tuple)):
+        return [normalize(v, digits) for v in value]
+    return str(value)
+
+
+def canonical_key(form_data, digits=FLOAT_DIGITS):
+    """规范化后的 form_data 的 SHA-256 摘要"""
+    text = json.dumps(normalize(form_data, digits), sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class AnalysisCache:
+    """线程安全的 LRU 结果缓存"""
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """查找缓存，未命中返回 None"""
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, result):
+        """写入缓存，超过容量时淘汰最久未使用的条目"""
+        with self._lock:
+            self._items[key] = result
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def get_or_compute(self, form_data, compute=perform_analysis, key=None):
+        """命中时直接返回缓存结果，否则计算并写入缓存"""
+        key = key or canonical_key(form_data)
+        result = self.get(key)
+        if result is None:
+            result = compute(form_data)
+            self.put(key, result)
+        return result
+
+    def clear(self):
+        """清空缓存和计数"""
+        with self._lock:
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def stats(self):
+        """命中/未命中次数和当前条目数"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._items),
+                'maxsize': self.maxsize,
+                'hitRate': self.hits / total if total else 0.0,
+            }
+
+
+# 全局共享的缓存实例
+ANALYSIS_CACHE = AnalysisCache()
+
+
+def cached_analysis(form_data, cache=ANALYSIS_CACHE):
+    """带缓存的 perform_analysis"""
+    return cache.get_or_compute(form_data)
@@ -0,0 +1,360 @@
+"""
+蒙特卡洛风险模拟
+Monte Carlo risk simulation
+
+在 form_data['riskSimulation'] 开启时使用：
+- 工资稳定性视为每年保住收入的概率（每年独立抽样是否失去收入）
+- 房产年化增值率、生活通胀率（CPI）按正态分布逐年抽样
+其余项目与 calculator_engine.perform_analysis 的确定性模型保持一致；设置了 mortgage 时
+与确定性模型一样按还款计划扣除月供，并把还本部分计入房产净值（各路径相同）。
+模拟按 6 个固定阶段和"第一个孩子的成本 × childCount"进行，不支持时间网格引擎的配置
+（timeResolution、多个不同的孩子、birthOffset，见 uses_timeline）。
+
+路径按 chunkSize 分块计算，每块使用 SeedSequence.spawn 派生的独立随机流；
+每块的路径送入流式累加器（streaming_stats）后立即丢弃，只合并累加器，
+因此内存占用与总路径数无关。分块方式只取决于路径数和块大小，
+无论使用多少个进程，结果都逐位相同。
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from calculator_engine import STAGES, CHART_SERIES, portfolio_gain, uses_timeline
+from streaming_stats import RunningStats, FixedHistogram, QuantileSketch
+
+RISK_DEFAULTS = {
+    'paths': 100000,               # 模拟路径数
+    'seed': 20240121,              # 随机种子
+    'appreciationVolatility': 3.0, # 房产年化增值率标准差（百分点）
+    'inflationVolatility': 1.0,    # 年度通胀率标准差（百分点）
+    'chunkSize': 100000,           # 每块路径数
+    'workers': 1,                  # 进程数（1 为单进程，0 为使用全部CPU核心）
+    'histogramBins': 50,           # 直方图分箱数
+}
+
+PERCENTILES = (5, 50, 95)
+
+TIMELINE_NOT_SUPPORTED = "风险模拟按 6 个固定阶段计算，不支持时间网格、多个不同的孩子或错开出生的配置"
+
+# 分位数摘要的列：两个汇总指标 + 各图表序列的每个阶段
+SUMMARY_METRICS = ('totalNetAssetsChange', 'minCashFlowSurplus')
+
+
+def resolve_settings(data=None, **overrides):
+    """合并默认模拟参数、form_data['riskSettings'] 和显式传入的参数"""
+    settings = dict(RISK_DEFAULTS)
+    if data is not None:
+        settings.update(data.get('riskSettings') or {})
+    settings.update({k: v for k, v in overrides.items() if v is not None})
+    return settings
+
+
+def simulate_paths(data, n_paths, rng, settings):
+    """模拟 n_paths 条路径，返回每条路径的指标数组
+
+    返回: {'totalNetAssetsChange': (n,), 'minCashFlowSurplus': (n,),
+           'series': {图表序列名: (n, 阶段数)}}
+    """
+    child = data['children'][0]
+    child_count = data['childCount']
+    stability = min(max(data['incomeStability'] / 100, 0.0), 1.0)
+    appreciation_sigma = settings['appreciationVolatility']
+    inflation_sigma = settings['inflationVolatility']
+
+    total_marriage_cost = sum(data['marriageCosts'].values())
+    annual_income_base = (data['salaryA'] + data['salaryB']) * 12 + data['annualBonus']
+
+    stage_child_base = {
+        1: child['prenatalCare'] + child['delivery'] + child['postpartumCare'] + child['monthlyBabyCost'] * 12 * 3,
+        2: child['kindergarten'],
+        3: child['primarySchool'],
+        4: child['juniorHigh'],
+        5: child['seniorHigh'] + child['extracurricular'],
+    }
+
+    series = {name: np.empty((n_paths, len(STAGES))) for name in CHART_SERIES}
+    current_property_value = np.full(n_paths, float(data['propertyValue']))
+    price_level = np.ones(n_paths)
+    price_level_years = 0
+    total_net_assets_change = np.full(n_paths, -float(total_marriage_cost))
+    min_cash_flow_surplus = np.full(n_paths, np.inf)
+    portfolio = np.zeros(n_paths)
+    invest_rate = data['investmentReturn'] / 100
+
+    schedule = None
+    if data.get('mortgage'):
+        from mortgage import loan_schedule
+        schedule = loan_schedule(data['mortgage'])
+    months_paid = 0
+
+    for idx, stage in enumerate(STAGES):
+        year_count = stage['years']
+        elapsed_years = max(0, (idx - 1) * 3)
+        is_marriage_stage = stage.get('isMarriageStage', False)
+
+        # 房贷：按还款计划扣除月供，还本部分计入房产净值
+        stage_mortgage = data['monthlyMortgage'] * 12 * year_count
+        stage_equity_gain = 0.0
+        if schedule is not None and not is_marriage_stage:
+            stage_months = slice(months_paid, months_paid + year_count * 12)
+            stage_mortgage = float(schedule['payment'][stage_months].sum())
+            stage_equity_gain = float(schedule['principal'][stage_months].sum())
+            months_paid += year_count * 12
+
+        # 房产价格：逐年抽样增值率并复利
+        growth = np.ones(n_paths)
+        for _ in range(year_count):
+            growth *= 1 + rng.normal(data['propertyAppreciation'], appreciation_sigma, n_paths) / 100
+        property_value_at_end = current_property_value * growth
+        stage_property_gain = property_value_at_end - current_property_value + stage_equity_gain
+        current_property_value = property_value_at_end
+
+        portfolio_growth = (1 + invest_rate) ** year_count
+        if is_marriage_stage:
+            net_cash_flow = np.full(n_paths, -float(total_marriage_cost))
+            cost = np.full(n_paths, float(total_marriage_cost))
+            stage_invest_gain = portfolio_gain(portfolio, net_cash_flow, invest_rate, portfolio_growth, year_count)
+            invest_and_support = stage_invest_gain
+            total_economic_gain = net_cash_flow + stage_property_gain + stage_invest_gain
+        else:
+            # 物价水平：与确定性模型相同，第 idx 阶段累计 (idx-1)*3 年通胀
+            while price_level_years < elapsed_years:
+                price_level *= 1 + rng.normal(data['livingInflation'], inflation_sigma, n_paths) / 100
+                price_level_years += 1
+
+            # 收入：每年以工资稳定性为概率保住收入
+            employed_years = rng.binomial(year_count, stability, n_paths)
+            stage_income = annual_income_base * employed_years
+
+            stage_living_cost = data['baseLivingCost'] * 12 * year_count * price_level
+            stage_child_cost = stage_child_base[idx] * child_count * price_level
+            stage_support = data['annualParentSupport'] * year_count
+
+            net_cash_flow = stage_income + stage_support - stage_living_cost - stage_mortgage - stage_child_cost
+            stage_invest_gain = portfolio_gain(portfolio, net_cash_flow, invest_rate, portfolio_growth, year_count)
+            cost = stage_child_cost
+            invest_and_support = stage_invest_gain + stage_support
+            total_economic_gain = net_cash_flow + stage_property_gain + stage_invest_gain
+            np.minimum(min_cash_flow_surplus, net_cash_flow, out=min_cash_flow_surplus)
+
+        total_net_assets_change += total_economic_gain
+        portfolio = portfolio + net_cash_flow + stage_invest_gain
+
+        series['净现金流'][:, idx] = net_cash_flow
+        series['资产增值贬值'][:, idx] = stage_property_gain
+        series['结婚生育成本'][:, idx] = cost
+        series['投资与支持'][:, idx] = invest_and_support
+        series['综合家庭损益'][:, idx] = total_economic_gain
+
+    return {
+        'totalNetAssetsChange': total_net_assets_change,
+        'minCashFlowSurplus': min_cash_flow_surplus,
+        'series': series,
+    }
+
+
+def _path_matrix(paths):
+    """将一块路径整理为 (n, 列数) 矩阵，列顺序见 SUMMARY_METRICS 与 CHART_SERIES"""
+    n_paths = len(paths['totalNetAssetsChange'])
+    stage_count = len(STAGES)
+    matrix = np.empty((n_paths, len(SUMMARY_METRICS) + len(CHART_SERIES) * stage_count))
+    for j, name in enumerate(SUMMARY_METRICS):
+        matrix[:, j] = paths[name]
+    for j, name in enumerate(CHART_SERIES):
+        start = len(SUMMARY_METRICS) + j * stage_count
+        matrix[:, start:start + stage_count] = paths['series'][name]
+    return matrix
+
+
+def _histogram_edges(paths, bins):
+    """由第一块路径确定直方图分箱（两端各留出一半跨度），之后各块共用同一分箱"""
+    edges = {}
+    for name in SUMMARY_METRICS:
+        low, high = float(np.min(paths[name])), float(np.max(paths[name]))
+        margin = (high - low) / 2
+        edges[name] = FixedHistogram.from_range(low - margin, high + margin, bins).edges
+    return edges
+
+
+def _aggregate_chunk(paths, edges):
+    """将一块路径送入流式累加器"""
+    net_assets = paths['totalNetAssetsChange']
+    min_cash_flow = paths['minCashFlowSurplus']
+
+    stats = RunningStats(3)
+    stats.update(np.column_stack([net_assets, min_cash_flow, min_cash_flow < 0]))
+
+    sketch = QuantileSketch(len(SUMMARY_METRICS) + len(CHART_SERIES) * len(STAGES))
+    sketch.update(_path_matrix(paths))
+
+    histograms = {}
+    for name in SUMMARY_METRICS:
+        histograms[name] = FixedHistogram(edges[name])
+        histograms[name].update(paths[name])
+
+    return {'stats': stats, 'sketch': sketch, 'histograms': histograms}
+
+
+def _merge_aggregates(total, chunk):
+    """将一块的累加器合并到总累加器"""
+    total['stats'].merge(chunk['stats'])
+    total['sketch'].merge(chunk['sketch'])
+    for name, histogram in chunk['histograms'].items():
+        total['histograms'][name].merge(histogram)
+
+
+def _simulate_chunk(task):
+    """模拟一块路径并返回其累加器（进程池的工作函数）"""
+    data, n_paths, seed_sequence, settings, edges = task
+    rng = np.random.default_rng(seed_sequence)
+    paths = simulate_paths(data, n_paths, rng, settings)
+    if edges is None:
+        edges = _histogram_edges(paths, int(settings['histogramBins']))
+    aggregates = _aggregate_chunk(paths, edges)
+    aggregates['edges'] = edges
+    return aggregates
+
+
+def percentile_chart_data(sketch):
+    """从分位数摘要生成与 chartData 同结构的 P5 / P50 / P95 图表数据"""
+    points = sketch.quantiles([p / 100 for p in PERCENTILES])
+    stage_count = len(STAGES)
+    bands = {}
+    for i, p in enumerate(PERCENTILES):
+        rows = []
+        for idx, stage in enumerate(STAGES):
+            row = {'name': stage['name']}
+            for j, name in enumerate(CHART_SERIES):
+                row[name] = float(points[i, len(SUMMARY_METRICS) + j * stage_count + idx])
+            row['isMarriageStage'] = stage.get('isMarriageStage', False)
+            rows.append(row)
+        bands[f'P{p}'] = rows
+    metric_bands = {
+        name: {f'P{p}': float(points[i, j]) for i, p in enumerate(PERCENTILES)}
+        for j, name in enumerate(SUMMARY_METRICS)
+    }
+    return bands, metric_bands
+
+
+def _chunk_sizes(n_paths, chunk_size):
+    """按块大小切分路径数"""
+    chunk_size = max(1, int(chunk_size))
+    sizes = [chunk_size] * (n_paths // chunk_size)
+    if n_paths % chunk_size:
+        sizes.append(n_paths % chunk_size)
+    return sizes
+
+
+def run_risk_simulation(data, n_paths=None, seed=None, workers=None, chunk_size=None, **settings):
+    """执行蒙特卡洛风险模拟，返回分位数区间与现金流为负的概率
+
+    workers: 进程数，1 为在当前进程内计算，0 为使用全部CPU核心
+    chunk_size: 每块路径数；结果由种子与块大小共同决定，与进程数无关
+    """
+    if uses_timeline(data):
+        raise ValueError(TIMELINE_NOT_SUPPORTED)
+    settings = resolve_settings(data, paths=n_paths, seed=seed, workers=workers,
+                                chunkSize=chunk_size, **settings)
+    n_paths = int(settings['paths'])
+    if n_paths < 1:
+        raise ValueError("模拟路径数必须大于0")
+    workers = int(settings['workers']) or os.cpu_count() or 1
+
+    sizes = _chunk_sizes(n_paths, settings['chunkSize'])
+    seeds = np.random.SeedSequence(settings['seed']).spawn(len(sizes))
+
+    # 第一块在当前进程计算，并确定各块共用的直方图分箱
+    total = _simulate_chunk((data, sizes[0], seeds[0], settings, None))
+    edges = total.pop('edges')
+    tasks = [(data, size, seq, settings, edges) for size, seq in zip(sizes[1:], seeds[1:])]
+
+    # 按块顺序合并，保证结果与进程数无关；每块合并后即释放
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            for chunk in executor.map(_simulate_chunk, tasks):
+                _merge_aggregates(total, chunk)
+    else:
+        for task in tasks:
+            _merge_aggregates(total, _simulate_chunk(task))
+
+    stats = total['stats']
+    chart_bands, metric_bands = percentile_chart_data(total['sketch'])
+    negative_count = int(round(stats.mean[2] * stats.count))
+
+    return {
+        'paths': n_paths,
+        'seed': settings['seed'],
+        'chunks': len(sizes),
+        'totalNetAssetsChange': metric_bands['totalNetAssetsChange'],
+        'minCashFlowSurplus': metric_bands['minCashFlowSurplus'],
+        'negativeCashFlowProbability': negative_count / stats.count,
+        'meanNetAssetsChange': float(stats.mean[0]),
+        'stdNetAssetsChange': float(stats.std[0]),
+        'percentileChartData': chart_bands,
+        'histograms': {name: h.to_dict() for name, h in total['histograms'].items()},
+    }
+
+
+def scaling_report(data, n_paths=1000000, worker_counts=None, chunk_size=None, seed=None):
+    """测量不同进程数下的模拟吞吐量，并校验各进程数结果是否一致"""
+    if worker_counts is None:
+        cpu_count = os.cpu_count() or 1
+        worker_counts = sorted({1, 2, 4, 8, cpu_count} & set(range(1, cpu_count + 1)))
+
+    rows = []
+    reference = None
+    for workers in worker_counts:
+        start = time.perf_counter()
+        summary = run_risk_simulation(data, n_paths=n_paths, seed=seed, workers=workers, chunk_size=chunk_size)
+        elapsed = time.perf_counter() - start
+        if reference is None:
+            reference = (summary, elapsed)
+        rows.append({
+            'workers': workers,
+            'seconds': elapsed,
+            'pathsPerSecond': n_paths / elapsed,
+            'speedup': reference[1] / elapsed,
+            'efficiency': reference[1] / elapsed / workers,
+            'identical': summary == reference[0],
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    from calculator_engine import default_form_data
+
+    parser = argparse.ArgumentParser(description="蒙特卡洛风险模拟")
+    parser.add_argument("config", nargs="?", help="配置文件路径（默认使用内置二线城市参数）")
+    parser.add_argument("--paths", type=int, help="模拟路径数")
+    parser.add_argument("--seed", type=int, help="随机种子")
+    parser.add_argument("--workers", type=int, help="进程数，0 为使用全部CPU核心")
+    parser.add_argument("--chunk-size", type=int, help="每块路径数")
+    parser.add_argument("--scaling", action="store_true", help="输出不同进程数下的吞吐量对比")
+    args = parser.parse_args()
+
+    form_data = default_form_data()
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            form_data = json.load(f)
+
+    if args.scaling:
+        n_paths = args.paths or 1000000
+        print(f"路径数: {n_paths}, CPU核心数: {os.cpu_count()}")
+        print(f"{'进程数':>6} {'耗时(s)':>10} {'路径/秒':>14} {'加速比':>8} {'并行效率':>8} {'结果一致':>8}")
+        for row in scaling_report(form_data, n_paths, chunk_size=args.chunk_size, seed=args.seed):
+            print(f"{row['workers']:>6} {row['seconds']:>10.3f} {row['pathsPerSecond']:>14,.0f} "
+                  f"{row['speedup']:>8.2f} {row['efficiency']:>8.2f} {str(row['identical']):>8}")
+    else:
+        start = time.perf_counter()
+        summary = run_risk_simulation(form_data, n_paths=args.paths, seed=args.seed,
+                                      workers=args.workers, chunk_size=args.chunk_size)
+        elapsed = time.perf_counter() - start
+        summary.pop('histograms')
+        print(json.dumps(summary, indent=2, ensure_ascii=False))
+        print(f"{summary['paths']} 条路径耗时 {elapsed:.3f}s")
@@ -1,88 +1,249 @@
-#!/usr/bin/env python3
-# -*- coding: utf-8 -*-
-"""
-结婚生育成本计算器启动脚本
-Marriage & Parenting Cost Calculator Launcher
-"""
-
-import sys
-import os
-import subprocess
-
-def check_dependencies():
-    """检查依赖是否已安装"""
-    required_packages = ['customtkinter', 'matplotlib', 'numpy', 'Pillow']
-    missing_packages = []
-
-    for package in required_packages:
-        try:
-            if package == 'customtkinter':
-                import customtkinter as ctk
-            elif package == 'matplotlib':
-                import matplotlib
-            elif package == 'numpy':
-                import numpy
-            elif package == 'Pillow':
-                import PIL
-        except ImportError:
-            missing_packages.append(package)
-
-    return missing_packages
-
-def install_dependencies(missing_packages):
-    """安装缺失的依赖"""
-    print(f"发现缺失的依赖包: {', '.join(missing_packages)}")
-    print("正在自动安装...")
-
-    try:
-        for package in missing_packages:
-            if package == 'customtkinter':
-                subprocess.check_call([sys.executable, '-m', 'pip', 'install', 'customtkinter'])
-            else:
-                subprocess.check_call([sys.executable, '-m', 'pip', 'install', package])
-
-        print("依赖包安装完成！")
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"安装依赖包失败: {e}")
-        print("请手动运行: pip install -r requirements.txt")
-        return False
-
-def main():
-    print("=" * 50)
-    print("    💒 结婚生育成本计算器")
-    print("    Marriage & Parenting Cost Calculator")
-    print("=" * 50)
-
-    # 检查依赖
-    missing_packages = check_dependencies()
-    if missing_packages:
-        if not install_dependencies(missing_packages):
-            input("按Enter键退出...")
-            sys.exit(1)
-
-    try:
-        from marriage_calculator import MarriageCalculatorApp
-
-        print("\n🚀 启动程序...")
-        print("提示：如果界面显示异常，请尝试调整显示缩放比例")
-        print("-" * 50)
-
-        app = MarriageCalculatorApp()
-        app.run()
-
-    except ImportError as e:
-        print(f"❌ 导入错误: {e}")
-        print("请确保已安装所需依赖包：pip install -r requirements.txt")
-        input("按Enter键退出...")
-        sys.exit(1)
-
-    except Exception as e:
-        print(f"❌ 程序运行出错: {e}")
-        import traceback
-        traceback.print_exc()
-        input("按Enter键退出...")
-        sys.exit(1)
-
-if __name__ == "__main__":
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+结婚生育成本计算器启动脚本
+Marriage & Parenting Cost Calculator Launcher
+"""
+
+import sys
+import os
+import subprocess
+import time
+import json
+import importlib.util
+from collections import deque
+from itertools import islice
+
+# 依赖包名 -> 导入时的模块名
+REQUIRED_PACKAGES = {
+    'customtkinter': 'customtkinter',
+    'matplotlib': 'matplotlib',
+    'numpy': 'numpy',
+    'Pillow': 'PIL',
+}
+
+def check_dependencies():
+    """检查依赖是否已安装（只查找模块，不实际导入）"""
+    missing_packages = []
+
+    for package, module in REQUIRED_PACKAGES.items():
+        try:
+            if importlib.util.find_spec(module) is None:
+                missing_packages.append(package)
+        except (ImportError, ValueError):
+            missing_packages.append(package)
+
+    return missing_packages
+
+def install_dependencies(missing_packages):
+    """安装缺失的依赖"""
+    print(f"发现缺失的依赖包: {', '.join(missing_packages)}")
+    print("正在自动安装...")
+
+    try:
+        for package in missing_packages:
+            if package == 'customtkinter':
+                subprocess.check_call([sys.executable, '-m', 'pip', 'install', 'customtkinter'])
+            else:
+                subprocess.check_call([sys.executable, '-m', 'pip', 'install', package])
+
+        print("依赖包安装完成！")
+        return True
+    except subprocess.CalledProcessError as e:
+        print(f"安装依赖包失败: {e}")
+        print("请手动运行: pip install -r requirements.txt")
+        return False
+
+def profile_startup():
+    """按阶段统计启动耗时：导入、字体设置、界面创建、窗口显示、首次计算、首次绘图"""
+    phases = []
+
+    def timed(name, func):
+        start = time.perf_counter()
+        result = func()
+        phases.append((name, time.perf_counter() - start))
+        return result
+
+    module = timed("导入模块", lambda: __import__("marriage_calculator"))
+    timed("字体设置(matplotlib)", module.load_matplotlib)
+    app = timed("创建主窗口与参数页", module.MarriageCalculatorApp)
+    app.root.unbind("<Map>")  # 由本函数按阶段执行首次计算
+    timed("创建其余选项卡", lambda: [app.ensure_tab(name) for name in app.tab_builders])
+    timed("窗口显示", app.root.update)
+
+    def first_calculate():
+        app.update_form_data()
+        app.analysis_result = app.perform_analysis()
+        app.analysis_key = None
+
+    def first_draw():
+        app.update_display()
+        app.update_chart()
+        app.canvas.draw()
+        app.root.update()
+
+    timed("首次计算", first_calculate)
+    timed("首次绘图", first_draw)
+    app.root.destroy()
+
+    total = sum(seconds for _, seconds in phases)
+    print(f"{'阶段':<20}{'耗时(ms)':>10}{'占比':>8}")
+    for name, seconds in phases:
+        print(f"{name:<20}{seconds * 1000:>10.1f}{seconds / total * 100:>7.1f}%")
+    print(f"{'合计':<20}{total * 1000:>10.1f}")
+    return phases
+
+# 批量模式下每个任务包含的输入条数
+BATCH_CHUNK_SIZE = 256
+
+def iter_batch_inputs(inputs, stdin=None):
+    """批量模式的输入：文件、目录或通配符展开为 ('path', 路径)；没有输入或为 '-' 时逐行读取标准输入 ('line', 来源, 文本)"""
+    if not inputs or inputs == ['-']:
+        for number, line in enumerate(stdin or sys.stdin, 1):
+            if line.strip():
+                yield ('line', f"<stdin>:{number}", line)
+    else:
+        from scenario_compare import expand_paths
+        for path in expand_paths(inputs):
+            yield ('path', path, None)
+
+def evaluate_batch_chunk(items):
+    """解析并计算一批输入，返回 (JSON 行列表, 出错条数)；在工作进程中执行
+
+    每个输入是一份配置（缺少的字段取默认值），所有有效输入合并为一次 analyze_batch 调用。
+    """
+    from calculator_engine import default_form_data, validate_form_data
+    from batch_engine import analyze_batch
+    from scenario_compare import merge_form_data
+
+    records = []
+    form_datas = []
+    for kind, source, text in items:
+        try:
+            if kind == 'path':
+                with open(source, 'r', encoding='utf-8') as f:
+                    text = f.read()
+            form_datas.append(validate_form_data(merge_form_data(default_form_data(), json.loads(text))))
+            records.append({'source': source})
+        except (OSError, ValueError, AttributeError) as e:
+            records.append({'source': source, 'error': str(e)})
+
+    valid = [record for record in records if 'error' not in record]
+    try:
+        for record, result in zip(valid, analyze_batch(form_datas)):
+            record['result'] = result
+    except Exception:
+        # 整批失败时逐个计算，只把出错的输入标记为错误
+        from calculator_engine import perform_analysis
+        for record, data in zip(valid, form_datas):
+            try:
+                record['result'] = perform_analysis(data)
+            except Exception as e:
+                record['error'] = str(e)
+
+    lines = [json.dumps(record, ensure_ascii=False) for record in records]
+    return lines, sum('error' in record for record in records)
+
+def _ordered_chunks(chunks, workers):
+    """按输入顺序产生各批的计算结果；多进程时最多同时提交 2 × workers 批，输入可以是无限流"""
+    if workers <= 1:
+        for chunk in chunks:
+            yield evaluate_batch_chunk(chunk)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(evaluate_batch_chunk, chunk))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def run_batch(inputs, output=None, workers=1, chunk_size=BATCH_CHUNK_SIZE):
+    """无界面批量计算：每个输入输出一行 JSON（{source, result} 或 {source, error}），返回 (总数, 出错数)
+
+    workers: 进程数，1 为在当前进程内计算，0 为使用全部CPU核心
+    """
+    workers = int(workers) or os.cpu_count() or 1
+    items = iter_batch_inputs(inputs)
+    chunks = iter(lambda: list(islice(items, chunk_size)), [])
+
+    out = open(output, 'w', encoding='utf-8') if output else sys.stdout
+    total = errors = 0
+    try:
+        for lines, chunk_errors in _ordered_chunks(chunks, workers):
+            out.write("\n".join(lines) + "\n")
+            out.flush()
+            total += len(lines)
+            errors += chunk_errors
+    finally:
+        if output:
+            out.close()
+    return total, errors
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="结婚生育成本计算器")
+    parser.add_argument("--profile-startup", action="store_true", help="输出各启动阶段的耗时后退出")
+    parser.add_argument("--batch", nargs="*", metavar="INPUT",
+                        help="无界面批量计算：配置文件、目录或通配符；不指定或为 - 时从标准输入读取 JSON Lines")
+    parser.add_argument("--output", help="批量模式的结果文件（JSON Lines，默认输出到标准输出）")
+    parser.add_argument("--workers", type=int, default=1, help="批量模式的进程数，0 为使用全部CPU核心")
+    parser.add_argument("--chunk-size", type=int, default=BATCH_CHUNK_SIZE, help="批量模式每个任务的输入条数")
+    args = parser.parse_args()
+
+    # 批量模式不检查、不导入界面依赖（customtkinter、matplotlib），提示信息输出到标准错误
+    if args.batch is not None:
+        start = time.perf_counter()
+        total, errors = run_batch(args.batch, args.output, args.workers, args.chunk_size)
+        print(f"完成 {total} 条（出错 {errors} 条），耗时 {time.perf_counter() - start:.2f}s", file=sys.stderr)
+        sys.exit(1 if errors else 0)
+
+    print("=" * 50)
+    print("    💒 结婚生育成本计算器")
+    print("    Marriage & Parenting Cost Calculator")
+    print("=" * 50)
+
+    # 检查依赖
+    missing_packages = check_dependencies()
+    if missing_packages:
+        if not install_dependencies(missing_packages):
+            input("按Enter键退出...")
+            sys.exit(1)
+
+    if args.profile_startup:
+        try:
+            profile_startup()
+        except Exception as e:
+            print(f"❌ 启动分析失败: {e}")
+            sys.exit(1)
+        return
+
+    try:
+        from marriage_calculator import MarriageCalculatorApp
+
+        print("\n🚀 启动程序...")
+        print("提示：如果界面显示异常，请尝试调整显示缩放比例")
+        print("-" * 50)
+
+        app = MarriageCalculatorApp()
+        app.run()
+
+    except ImportError as e:
+        print(f"❌ 导入错误: {e}")
+        print("请确保已安装所需依赖包：pip install -r requirements.txt")
+        input("按Enter键退出...")
+        sys.exit(1)
+
+    except Exception as e:
+        print(f"❌ 程序运行出错: {e}")
+        import traceback
+        traceback.print_exc()
+        input("按Enter键退出...")
+        sys.exit(1)
+
+if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,320 @@
+"""
+多方案对比
+Multi-scenario comparison of saved configs and built-in presets
+
+一次加载几十到几百个方案文件（JSON 格式与 marriage_calculator_config.json 相同，
+缺少的字段取默认值），或者 6 个内置预设，合并为一次批量计算（batch_engine.analyze_batch），
+输出并排的对比表格，以及叠加图 / 小多图。
+
+- 文件解析按批分给多个进程并行完成（workers 与 risk_simulation 相同：1 为当前进程，0 为全部CPU核心）
+- 结果按文件内容的 SHA-256 缓存，文件未修改时不会重新计算
+- 对比时默认关闭风险模拟（riskSimulation），避免每个方案都运行蒙特卡洛模拟
+"""
+
+import copy
+import glob
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from calculator_engine import PRESETS, PRESET_NAMES, default_form_data, apply_preset, validate_form_data
+from result_cache import AnalysisCache, canonical_key
+
+COMPARE_METRICS = (
+    'totalNetAssetsChange', 'minCashFlowSurplus', 'endingPortfolio',
+    'totalCost', 'childEducationCost', 'riskCoefficient',
+)
+
+METRIC_LABELS = {
+    'totalNetAssetsChange': '净资产变化',
+    'minCashFlowSurplus': '最低现金流',
+    'endingPortfolio': '期末投资账户',
+    'totalCost': '总成本',
+    'totalMarriageCost': '结婚成本',
+    'childEducationCost': '教育成本',
+    'riskCoefficient': '抗风险系数',
+}
+
+# 每个进程任务解析的文件数
+PARSE_BATCH_SIZE = 32
+
+# 按方案内容哈希缓存的分析结果（界面与命令行共用）
+SCENARIO_CACHE = AnalysisCache(maxsize=4096)
+
+
+def merge_form_data(base, overrides):
+    """将 overrides 递归合并到 base 上（原地修改），字典合并、其余值直接替换
+
+    字典列表（如 children）逐项合并：第 j 项合并到 base 中第 j 项（没有时为最后一项）的副本上，
+    因此 {"children": [{"birthOffset": 0}, {"birthOffset": 3}]} 中缺少的成本项取默认值。
+    """
+    for key, value in overrides.items():
+        current = base.get(key)
+        if isinstance(value, dict) and isinstance(current, dict):
+            merge_form_data(current, value)
+        elif (isinstance(value, list) and isinstance(current, list) and current
+              and all(isinstance(item, dict) for item in current + value)):
+            base[key] = [merge_form_data(copy.deepcopy(current[min(j, len(current) - 1)]), item)
+                         for j, item in enumerate(value)]
+        else:
+            base[key] = copy.deepcopy(value)
+    return base
+
+
+def _parse_files(paths):
+    """读取并解析一批方案文件，返回 [(路径, 内容哈希, form_data 或 None, 错误信息)]"""
+    parsed = []
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                content = f.read()
+            digest = hashlib.sha256(content).hexdigest()
+            overrides = json.loads(content.decode('utf-8'))
+            if not isinstance(overrides, dict):
+                raise ValueError(f"方案文件应为 JSON 对象，实际为 {type(overrides).__name__}")
+            data = validate_form_data(merge_form_data(default_form_data(), overrides))
+            parsed.append((path, digest, data, None))
+        except (OSError, ValueError) as e:
+            parsed.append((path, None, None, str(e)))
+    return parsed
+
+
+def expand_paths(patterns):
+    """展开文件、目录（其中的 *.json）和通配符，去重后按名称排序"""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths.extend(glob.glob(os.path.join(pattern, '*.json')))
+        elif glob.has_magic(pattern):
+            paths.extend(glob.glob(pattern))
+        else:
+            paths.append(pattern)
+    return sorted(set(paths))
+
+
+def load_scenarios(paths, workers=0):
+    """并行解析方案文件
+
+    返回 (scenarios, errors)：scenarios 为 [{'name', 'path', 'key', 'formData'}]，key 为文件内容的 SHA-256；
+    errors 为 [(路径, 错误信息)]
+    """
+    paths = list(paths)
+    batches = [paths[i:i + PARSE_BATCH_SIZE] for i in range(0, len(paths), PARSE_BATCH_SIZE)]
+    workers = int(workers) or os.cpu_count() or 1
+
+    if workers > 1 and len(batches) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(batches))) as executor:
+            parsed = [item for batch in executor.map(_parse_files, batches) for item in batch]
+    else:
+        parsed = [item for batch in batches for item in _parse_files(batch)]
+
+    scenarios = []
+    errors = []
+    for path, digest, data, error in parsed:
+        if error is not None:
+            errors.append((path, error))
+            continue
+        name = os.path.splitext(os.path.basename(path))[0]
+        scenarios.append({'name': name, 'path': path, 'key': digest, 'formData': data})
+    return scenarios, errors
+
+
+def preset_scenarios(presets=None):
+    """内置预设方案（在默认参数上应用预设），key 为规范化内容的哈希"""
+    scenarios = []
+    for preset in presets or PRESETS:
+        data = default_form_data()
+        apply_preset(data, preset)
+        scenarios.append({'name': PRESET_NAMES[preset], 'path': None, 'key': canonical_key(data), 'formData': data})
+    return scenarios
+
+
+def evaluate_scenarios(scenarios, cache=SCENARIO_CACHE, risk=False):
+    """为每个方案附上分析结果（原地修改并返回 scenarios）
+
+    缓存未命中的方案合并为一次批量计算；risk 为 False 时关闭各方案的风险模拟。
+    """
+    from batch_engine import analyze_batch
+
+    suffix = ':risk' if risk else ''
+    missing = []
+    for scenario in scenarios:
+        result = cache.get(scenario['key'] + suffix) if cache is not None else None
+        scenario['result'] = result
+        scenario['cached'] = result is not None
+        if result is None:
+            missing.append(scenario)
+
+    if missing:
+        form_datas = []
+        for scenario in missing:
+            data = scenario['formData']
+            if not risk and data.get('riskSimulation'):
+                data = dict(data, riskSimulation=False)
+            form_datas.append(data)
+        for scenario, result in zip(missing, analyze_batch(form_datas)):
+            scenario['result'] = result
+            if cache is not None:
+                cache.put(scenario['key'] + suffix, result)
+    return scenarios
+
+
+def comparison_table(scenarios, metrics=COMPARE_METRICS, sort_by=None, descending=True):
+    """并排对比表：每个方案一行 {'name', 'path', 'cached', 指标...}，可按某个指标排序"""
+    rows = []
+    for scenario in scenarios:
+        row = {'name': scenario['name'], 'path': scenario['path'], 'cached': scenario.get('cached', False)}
+        for metric in metrics:
+            row[metric] = scenario['result'][metric]
+        rows.append(row)
+    if sort_by:
+        rows.sort(key=lambda row: row[sort_by], reverse=descending)
+    return rows
+
+
+def _pad(text, width, align='<'):
+    """按显示宽度补齐（中文字符占两列）"""
+    padding = ' ' * max(width - sum(2 if ord(ch) > 0x2E80 else 1 for ch in text), 0)
+    return text + padding if align == '<' else padding + text
+
+
+def format_comparison_table(rows, metrics=COMPARE_METRICS):
+    """格式化为文本表格（金额单位：万元）"""
+    width = max(len(row['name'].encode('gbk', 'replace')) for row in rows + [{'name': '方案'}]) + 2
+    lines = [_pad('方案', width) + "".join(_pad(METRIC_LABELS.get(m, m), 14, '>') for m in metrics)]
+    for row in rows:
+        line = _pad(row['name'], width)
+        for metric in metrics:
+            value = row[metric]
+            line += f"{value:>14.2f}" if metric == 'riskCoefficient' else f"{value / 10000:>14.1f}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def write_csv(rows, path, metrics=COMPARE_METRICS):
+    """将对比表写出为 CSV（金额单位：元）"""
+    import csv
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(['name', 'path'] + list(metrics))
+        for row in rows:
+            writer.writerow([row['name'], row['path'] or ''] + [row[metric] for metric in metrics])
+
+
+def _stage_values(scenario, series):
+    return [item[series] for item in scenario['result']['chartData']]
+
+
+def _stage_names(scenarios):
+    """各方案的阶段名称（时间网格方案可能多出阶段，取最长的一组）"""
+    return max(([item['name'] for item in s['result']['chartData']] for s in scenarios), key=len)
+
+
+def plot_overlay(scenarios, series='综合家庭损益', ax=None, legend_limit=12):
+    """叠加图：每个方案一条折线，横轴为生命周期阶段"""
+    import numpy as np
+    if ax is None:
+        import matplotlib.pyplot as plt
+        _, ax = plt.subplots(figsize=(12, 7), dpi=100)
+
+    names = _stage_names(scenarios)
+    alpha = 1.0 if len(scenarios) <= legend_limit else max(0.15, 6 / len(scenarios))
+    for scenario in scenarios:
+        values = _stage_values(scenario, series)
+        ax.plot(np.arange(len(values)), values, marker='o', markersize=4, linewidth=1.5, alpha=alpha,
+                label=scenario['name'])
+
+    ax.axhline(0, color='black', linewidth=1, alpha=0.3)
+    ax.set_xticks(np.arange(len(names)))
+    ax.set_xticklabels(names, rotation=45, ha='right')
+    ax.yaxis.set_major_formatter(lambda value, pos: f'{value / 10000:.0f}万')
+    ax.set_title(f'多方案对比 - {series}（{len(scenarios)}个方案）')
+    ax.grid(True, alpha=0.3, linestyle='--')
+    if len(scenarios) <= legend_limit:
+        ax.legend(loc='upper left', bbox_to_anchor=(1.02, 1), fontsize=9)
+    return ax
+
+
+def plot_small_multiples(scenarios, figure=None, max_cols=4, limit=24):
+    """小多图：每个方案一个子图（各阶段的资产增值 / 成本 / 投资与支持柱状图 + 综合损益折线），纵轴共用"""
+    import numpy as np
+    scenarios = scenarios[:limit]
+    cols = min(max_cols, len(scenarios))
+    rows = -(-len(scenarios) // cols)
+    if figure is None:
+        import matplotlib.pyplot as plt
+        figure = plt.figure(figsize=(3.2 * cols, 2.6 * rows), dpi=100)
+
+    axes = figure.subplots(rows, cols, sharex=True, sharey=True, squeeze=False)
+    width = 0.25
+    colors = {'资产增值贬值': '#10b981', '结婚生育成本': '#f59e0b', '投资与支持': '#3b82f6'}
+    for ax, scenario in zip(axes.flat, scenarios):
+        x = np.arange(len(scenario['result']['chartData']))
+        for offset, series in zip((-width, 0, width), colors):
+            ax.bar(x + offset, _stage_values(scenario, series), width, color=colors[series], alpha=0.8)
+        ax.plot(x, _stage_values(scenario, '综合家庭损益'), 'k-', marker='o', markersize=3, linewidth=1.5)
+        ax.axhline(0, color='black', linewidth=0.8, alpha=0.3)
+        ax.set_title(scenario['name'], fontsize=9)
+        ax.grid(True, alpha=0.3, linestyle='--')
+    for ax in list(axes.flat)[len(scenarios):]:
+        ax.set_visible(False)
+
+    names = _stage_names(scenarios)
+    for ax in axes[-1]:
+        ax.set_xticks(np.arange(len(names)))
+        ax.set_xticklabels(names, rotation=45, ha='right', fontsize=7)
+    axes[0, 0].yaxis.set_major_formatter(lambda value, pos: f'{value / 10000:.0f}万')
+    from matplotlib.lines import Line2D
+    from matplotlib.patches import Patch
+    handles = [Patch(color=color, alpha=0.8) for color in colors.values()] + [Line2D([], [], color='black', marker='o')]
+    figure.legend(handles, list(colors) + ['综合家庭损益'], loc='upper center', ncol=4, fontsize=9)
+    return figure
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="多方案对比")
+    parser.add_argument("paths", nargs="*", help="方案文件、目录或通配符（如 scenarios/*.json）")
+    parser.add_argument("--presets", action="store_true", help="加入 6 个内置预设")
+    parser.add_argument("--sort-by", choices=COMPARE_METRICS, help="按指标降序排列")
+    parser.add_argument("--workers", type=int, default=0, help="解析进程数，1 为单进程，0 为全部CPU核心")
+    parser.add_argument("--risk", action="store_true", help="保留各方案的风险模拟设置")
+    parser.add_argument("--csv", help="将对比表保存为CSV")
+    parser.add_argument("--png", help="将对比图保存为图片")
+    parser.add_argument("--layout", choices=('overlay', 'grid'), default='overlay', help="叠加图或小多图")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    scenarios, errors = load_scenarios(expand_paths(args.paths), args.workers)
+    parse_time = time.perf_counter() - start
+    if args.presets:
+        scenarios += preset_scenarios()
+    for path, error in errors:
+        print(f"⚠️ 跳过 {path}: {error}")
+    if not scenarios:
+        parser.error("没有可对比的方案（请指定方案文件或 --presets）")
+
+    start = time.perf_counter()
+    evaluate_scenarios(scenarios, risk=args.risk)
+    eval_time = time.perf_counter() - start
+
+    rows = comparison_table(scenarios, sort_by=args.sort_by)
+    print(format_comparison_table(rows))
+    print(f"{len(scenarios)} 个方案：解析 {parse_time * 1000:.1f}ms，计算 {eval_time * 1000:.1f}ms")
+
+    if args.csv:
+        write_csv(rows, args.csv)
+        print(f"对比表已保存到 {args.csv}")
+    if args.png:
+        import matplotlib
+        matplotlib.use('Agg')
+        if args.layout == 'overlay':
+            figure = plot_overlay(scenarios).figure
+        else:
+            figure = plot_small_multiples(scenarios)
+        figure.tight_layout()
+        figure.savefig(args.png)
+        print(f"对比图已保存到 {args.png}")
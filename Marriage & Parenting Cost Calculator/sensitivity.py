@@ -0,0 +1,191 @@
+"""
+敏感性分析（龙卷风图）
+One-pass sensitivity / tornado analysis
+
+对每个数值输入（FIELD_PATHS）分别上调、下调一定比例（默认 ±10%），
+基准值与全部 2k 个扰动组合在一次批量计算中完成，不经过界面逐个重算。
+按指标变动幅度（swing）排序，输出龙卷风表格和图表。
+
+基准值为 0 的字段按比例扰动后不变，其变动幅度为 0。
+孩子数量是整数，不按比例扰动，而是 ±1（下调后不少于 1 个）；
+工资稳定性等有取值范围的字段，扰动后截断到合法范围内。
+需要时间网格（多个孩子错开出生等）或房贷还款计划的家庭逐个用 perform_analysis 计算，与界面显示的结果一致。
+"""
+
+import numpy as np
+
+from calculator_engine import FIELD_PATHS, field_label, default_form_data
+from batch_engine import form_data_to_columns, evaluate_forms
+
+SENSITIVITY_METRICS = ('totalNetAssetsChange', 'minCashFlowSurplus')
+
+METRIC_LABELS = {'totalNetAssetsChange': '净资产变化', 'minCashFlowSurplus': '最低现金流'}
+
+DEFAULT_DELTA = 0.10
+
+# 整数字段：字段 -> (步长, 下调后的最小值)
+STEP_FIELDS = {'childCount': (1, 1)}
+
+# 有取值范围的字段：字段 -> (最小值, 最大值)
+FIELD_RANGES = {'incomeStability': (0, 100)}
+
+
+def perturb_field(path, base, delta=DEFAULT_DELTA):
+    """返回字段 path 在基准值 base（数组）下的 (下调值, 上调值)"""
+    if path in STEP_FIELDS:
+        step, floor = STEP_FIELDS[path]
+        # 基准已低于下限（如 0 个孩子）时保持不变，不向上"下调"
+        return np.maximum(base - step, np.minimum(base, floor)), base + step
+    low, high = base * (1 - delta), base * (1 + delta)
+    if path in FIELD_RANGES:
+        lower, upper = FIELD_RANGES[path]
+        low, high = np.clip(low, lower, upper), np.clip(high, lower, upper)
+    return low, high
+
+
+def batch_sensitivity(form_datas, delta=DEFAULT_DELTA, fields=FIELD_PATHS, metrics=SENSITIVITY_METRICS):
+    """一次批量计算 N 个家庭的全部扰动（按比例 ±delta，整数字段按步长，见 perturb_field）
+
+    返回: {'fields': 字段路径元组,
+           'inputs': (N, k, 2) 下调/上调后的输入值,
+           'base': {指标: (N,)},
+           'values': {指标: (N, k, 2)} 下调/上调后的指标值}
+    """
+    fields = tuple(fields)
+    form_datas = list(form_datas)
+    base_columns = form_data_to_columns(form_datas)
+    n = len(base_columns['salaryA'])
+    k = len(fields)
+    rows = 2 * k + 1
+
+    # 每个家庭占 2k+1 行：第 0 行为基准，第 2i+1 / 2i+2 行为第 i 个字段的下调 / 上调
+    columns = {path: np.repeat(values, rows) for path, values in base_columns.items()}
+    inputs = np.empty((n, k, 2))
+    for i, path in enumerate(fields):
+        inputs[:, i, 0], inputs[:, i, 1] = perturb_field(path, base_columns[path], delta)
+        view = columns[path].reshape(n, rows)
+        view[:, 2 * i + 1] = inputs[:, i, 0]
+        view[:, 2 * i + 2] = inputs[:, i, 1]
+
+    result = evaluate_forms(columns, [data for data in form_datas for _ in range(rows)])
+
+    base_values = {}
+    values = {}
+    for metric in metrics:
+        grid = np.asarray(result[metric]).reshape(n, rows)
+        base_values[metric] = grid[:, 0]
+        values[metric] = grid[:, 1:].reshape(n, k, 2)
+
+    return {'fields': fields, 'inputs': inputs, 'base': base_values, 'values': values}
+
+
+def tornado_table(batch, i=0, sort_by='totalNetAssetsChange'):
+    """从 batch_sensitivity 的结果中取出第 i 个家庭，按 sort_by 指标的变动幅度降序排列"""
+    metrics = tuple(batch['values'])
+    rows = []
+    for j, path in enumerate(batch['fields']):
+        row = {
+            'field': path,
+            'label': field_label(path),
+            'lowInput': float(batch['inputs'][i, j, 0]),
+            'highInput': float(batch['inputs'][i, j, 1]),
+        }
+        for metric in metrics:
+            low, high = (float(v) for v in batch['values'][metric][i, j])
+            row[metric] = {'low': low, 'high': high, 'swing': abs(high - low)}
+        rows.append(row)
+
+    rows.sort(key=lambda row: row[sort_by]['swing'], reverse=True)
+    return {
+        'base': {metric: float(batch['base'][metric][i]) for metric in metrics},
+        'sortBy': sort_by,
+        'rows': rows,
+    }
+
+
+def sensitivity_analysis(data, delta=DEFAULT_DELTA, sort_by='totalNetAssetsChange', fields=FIELD_PATHS):
+    """单个家庭的敏感性分析，返回龙卷风表格"""
+    table = tornado_table(batch_sensitivity([data], delta, fields), 0, sort_by)
+    table['delta'] = delta
+    return table
+
+
+def format_tornado_table(table, top=None):
+    """格式化为文本表格（金额单位：万元）"""
+    metrics = tuple(table['base'])
+    delta = table.get('delta', DEFAULT_DELTA)
+
+    steps = "".join(f"，{field_label(path)} ±{step}" for path, (step, _) in STEP_FIELDS.items())
+    lines = [f"敏感性分析（各输入 ±{delta * 100:.0f}%{steps}，按{METRIC_LABELS.get(table['sortBy'], table['sortBy'])}变动幅度排序）"]
+    lines.append("基准: " + "  ".join(
+        f"{METRIC_LABELS.get(m, m)} {table['base'][m] / 10000:.1f}万" for m in metrics
+    ))
+    lines.append(f"{'参数':<12}" + "".join(f"{METRIC_LABELS.get(m, m) + ' 下调/上调/幅度':>28}" for m in metrics))
+    for row in table['rows'][:top]:
+        line = f"{row['label']:<12}"
+        for m in metrics:
+            cell = row[m]
+            line += f"{cell['low'] / 10000:>10.1f}{cell['high'] / 10000:>10.1f}{cell['swing'] / 10000:>8.1f}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def plot_tornado(table, metric=None, ax=None, top=15):
+    """绘制龙卷风图：以基准值为中心，分别画出下调、上调后的指标值"""
+    if ax is None:
+        import matplotlib.pyplot as plt
+        _, ax = plt.subplots(figsize=(10, 7), dpi=100)
+
+    metric = metric or table['sortBy']
+    base = table['base'][metric]
+    rows = sorted(table['rows'], key=lambda row: row[metric]['swing'], reverse=True)[:top]
+    rows.reverse()  # 变动最大的画在最上面
+
+    y = np.arange(len(rows))
+    low = np.array([row[metric]['low'] for row in rows]) - base
+    high = np.array([row[metric]['high'] for row in rows]) - base
+    delta = table.get('delta', DEFAULT_DELTA)
+
+    ax.barh(y, low, left=base, color='#3b82f6', alpha=0.8, label=f'下调{delta * 100:.0f}%')
+    ax.barh(y, high, left=base, color='#f59e0b', alpha=0.8, label=f'上调{delta * 100:.0f}%')
+    ax.axvline(base, color='black', linewidth=1)
+    ax.set_yticks(y)
+    ax.set_yticklabels([row['label'] for row in rows])
+    ax.xaxis.set_major_formatter(lambda x, p: f'{x / 10000:.0f}万')
+    ax.set_title(f'敏感性分析 - {METRIC_LABELS.get(metric, metric)}')
+    ax.grid(True, axis='x', alpha=0.3, linestyle='--')
+    ax.legend(loc='lower right')
+    return ax
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import time
+
+    parser = argparse.ArgumentParser(description="敏感性分析（龙卷风图）")
+    parser.add_argument("config", nargs="?", help="配置文件路径（默认使用内置二线城市参数）")
+    parser.add_argument("--delta", type=float, default=DEFAULT_DELTA, help="扰动比例，默认 0.10")
+    parser.add_argument("--sort-by", choices=SENSITIVITY_METRICS, default='totalNetAssetsChange', help="排序指标")
+    parser.add_argument("--top", type=int, help="只显示前 N 项")
+    parser.add_argument("--png", help="将龙卷风图保存为图片")
+    args = parser.parse_args()
+
+    form_data = default_form_data()
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            form_data = json.load(f)
+
+    start = time.perf_counter()
+    table = sensitivity_analysis(form_data, args.delta, args.sort_by)
+    elapsed = time.perf_counter() - start
+    print(format_tornado_table(table, args.top))
+    print(f"{len(table['rows']) * 2 + 1} 组计算耗时 {elapsed * 1000:.2f}ms")
+
+    if args.png:
+        import matplotlib
+        matplotlib.use('Agg')
+        ax = plot_tornado(table, top=args.top or 15)
+        ax.figure.tight_layout()
+        ax.figure.savefig(args.png)
+        print(f"龙卷风图已保存到 {args.png}")
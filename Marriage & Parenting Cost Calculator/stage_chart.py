@@ -0,0 +1,281 @@
+"""
+生命周期阶段图表
+Incrementally updated stage chart
+
+所有图形元素（三组柱状图、综合损益线、净现金流区域、风险区间、数值标签）只创建一次，
+之后每次计算只原地更新数据：柱高、线的 y 值、多边形顶点、标签位置。
+
+- 坐标轴范围带滞后：数据超出当前范围时扩大，数据范围缩小到一半以下时才收缩
+- 只有范围、图例变化时才做完整重绘（draw_idle）；其余情况用 blitting 只重画变化的元素
+- 布局（tight_layout）只在首次绘制和图例变化时执行
+- 阶段数量或名称变化时（例如错开出生的孩子使时间网格多出一个阶段）重建所有元素，标题中的年数随最后一个阶段更新
+"""
+
+import re
+
+import numpy as np
+
+from calculator_engine import STAGES
+
+# 数值标签的偏移量和显示阈值（与原 update_chart 一致）
+LABEL_OFFSET = 50000
+LABEL_THRESHOLD = 10000
+
+POSITIVE_COLOR = '#10b981'
+NEGATIVE_COLOR = '#ef4444'
+RISK_COLOR = '#8b5cf6'
+
+# 纵轴范围收缩阈值：数据范围小于当前范围的该比例时才收缩
+SHRINK_RATIO = 0.5
+Y_MARGIN = 0.08
+
+
+def lifecycle_years(stage_names):
+    """从最后一个阶段名称（如 "18-25岁"）取出生命周期年数，无法识别时按 STAGES 合计（18 年）"""
+    match = re.fullmatch(r'\d+-(\d+)岁', stage_names[-1]) if stage_names else None
+    return int(match.group(1)) if match else sum(stage['years'] for stage in STAGES[1:])
+
+
+def _area_verts(x, low, high):
+    """fill_between 等价的多边形顶点：沿 high 正向，再沿 low 反向"""
+    return np.concatenate([
+        np.column_stack([x, high]),
+        np.column_stack([x[::-1], low[::-1]]),
+    ])
+
+
+class StageChart:
+    """可原地更新的家庭财务损益图表"""
+
+    def __init__(self, ax, stage_names=None, font_family='SimHei', use_blit=True):
+        self.ax = ax
+        self.figure = ax.figure
+        self.stage_names = list(stage_names or [stage['name'] for stage in STAGES])
+        self.x = np.arange(len(self.stage_names), dtype=float)
+        self.font_family = font_family
+        self.use_blit = use_blit
+        self._background = None
+        self._needs_layout = True
+        self._risk_visible = False
+        self._draw_cid = None
+
+        self._create_artists()
+
+    def _create_artists(self):
+        ax = self.ax
+        x = self.x
+        zeros = np.zeros(len(x))
+        width = 0.25
+
+        ax.set_facecolor('#f8fafc')
+        self.property_bars = ax.bar(x - width, zeros, width, label='资产增值贬值', color=POSITIVE_COLOR,
+                                    alpha=0.8, edgecolor='white', linewidth=0.5)
+        self.cost_bars = ax.bar(x, zeros, width, label='结婚生育成本', color='#f59e0b',
+                                alpha=0.8, edgecolor='white', linewidth=0.5)
+        self.invest_bars = ax.bar(x + width, zeros, width, label='投资与支持', color='#3b82f6',
+                                  alpha=0.8, edgecolor='white', linewidth=0.5)
+        self.total_line, = ax.plot(x, zeros, 'k-', linewidth=4, label='综合家庭损益', marker='o', markersize=6,
+                                   markerfacecolor='white', markeredgecolor='black', markeredgewidth=2)
+        self.risk_band = ax.fill_between(x, zeros, zeros, alpha=0.15, color=RISK_COLOR, label='综合损益 P5-P95')
+        self.risk_median, = ax.plot(x, zeros, '--', color=RISK_COLOR, linewidth=2, label='综合损益 P50')
+        self.cash_flow_area = ax.fill_between(x, 0, zeros, alpha=0.2, color='#64748b', label='净现金流')
+        ax.axhline(y=0, color='black', linestyle='-', alpha=0.3, linewidth=1)
+
+        self.value_labels = [
+            ax.text(i, 0, '', ha='center', va='bottom', fontsize=9, fontweight='bold',
+                    fontfamily=self.font_family, visible=False)
+            for i in range(len(x))
+        ]
+
+        ax.set_xlabel('生命周期阶段', fontsize=11, fontweight='bold', fontfamily=self.font_family)
+        ax.set_ylabel('金额 (元)', fontsize=11, fontweight='bold', fontfamily=self.font_family)
+        ax.set_title(f'家庭财务损益分析 - {lifecycle_years(self.stage_names)}年生命周期', fontsize=14, fontweight='bold', pad=20,
+                     fontfamily=self.font_family)
+        ax.set_xticks(x)
+        ax.set_xticklabels(self.stage_names, rotation=45, ha='right', fontsize=10, fontfamily=self.font_family)
+        ax.grid(True, alpha=0.3, linestyle='--')
+        ax.yaxis.set_major_formatter(lambda value, pos: f'¥{value / 1000:.0f}k')
+        ax.set_xlim(x[0] - 0.6, x[-1] + 0.6)
+        ax.set_ylim(-1, 1)
+        ax.set_autoscale_on(False)
+
+        self.risk_band.set_visible(False)
+        self.risk_median.set_visible(False)
+        self._build_legend()
+
+        self.dynamic_artists = (
+            list(self.property_bars) + list(self.cost_bars) + list(self.invest_bars) +
+            [self.cash_flow_area, self.risk_band, self.risk_median, self.total_line] + self.value_labels
+        )
+        if self.use_blit:
+            for artist in self.dynamic_artists:
+                artist.set_animated(True)
+            self._draw_cid = self.figure.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def set_stages(self, stage_names):
+        """阶段与当前不同时清空坐标轴并重建所有元素，返回是否重建"""
+        stage_names = list(stage_names)
+        if stage_names == self.stage_names:
+            return False
+        self.disconnect()
+        self.ax.clear()
+        self.stage_names = stage_names
+        self.x = np.arange(len(stage_names), dtype=float)
+        self._background = None
+        self._needs_layout = True
+        self._risk_visible = False
+        self._create_artists()
+        return True
+
+    def _build_legend(self):
+        """图例只包含当前可见的序列"""
+        handles = [self.property_bars, self.cost_bars, self.invest_bars, self.total_line]
+        if self._risk_visible:
+            handles += [self.risk_band, self.risk_median]
+        handles.append(self.cash_flow_area)
+        legend = self.ax.legend(handles=handles, loc='upper left', bbox_to_anchor=(1.02, 1),
+                                prop={'family': self.font_family, 'size': 9})
+        legend.get_frame().set_alpha(0.9)
+
+    def set_data(self, chart_data, percentile_chart_data=None):
+        """原地更新所有元素的数据，返回是否需要完整重绘（坐标范围或图例发生变化）
+
+        chart_data 的阶段与当前不同时先重建图表；风险区间的阶段名称与 chart_data 不一致时不画区间。
+        """
+        rebuilt = self.set_stages([item['name'] for item in chart_data])
+        property_values = np.array([item['资产增值贬值'] for item in chart_data], dtype=float)
+        cost_values = np.array([item['结婚生育成本'] for item in chart_data], dtype=float)
+        invest_values = np.array([item['投资与支持'] for item in chart_data], dtype=float)
+        total_values = np.array([item['综合家庭损益'] for item in chart_data], dtype=float)
+        cash_flow_values = np.array([item['净现金流'] for item in chart_data], dtype=float)
+
+        for bar, value in zip(self.property_bars, property_values):
+            bar.set_height(value)
+            bar.set_color(NEGATIVE_COLOR if value < 0 else POSITIVE_COLOR)
+            bar.set_edgecolor('white')
+        for bar, value in zip(self.cost_bars, cost_values):
+            bar.set_height(value)
+        for bar, value in zip(self.invest_bars, invest_values):
+            bar.set_height(value)
+
+        self.total_line.set_ydata(total_values)
+        self.cash_flow_area.set_verts([_area_verts(self.x, np.zeros(len(self.x)), cash_flow_values)])
+
+        for label, value in zip(self.value_labels, total_values):
+            if abs(value) > LABEL_THRESHOLD:
+                label.set_position((label.get_position()[0], value + (LABEL_OFFSET if value >= 0 else -LABEL_OFFSET)))
+                label.set_text(f'{value / 10000:.1f}万')
+                label.set_va('bottom' if value >= 0 else 'top')
+                label.set_visible(True)
+            else:
+                label.set_visible(False)
+
+        extents = [property_values, cost_values, invest_values, cash_flow_values,
+                   total_values + np.where(np.abs(total_values) > LABEL_THRESHOLD,
+                                           np.sign(total_values) * LABEL_OFFSET * 2, 0)]
+
+        if percentile_chart_data and [item['name'] for item in percentile_chart_data['P50']] != self.stage_names:
+            percentile_chart_data = None  # 风险模拟按 6 个固定阶段统计，与时间网格的阶段不一致
+        risk_visible = bool(percentile_chart_data)
+        if risk_visible:
+            low = np.array([item['综合家庭损益'] for item in percentile_chart_data['P5']], dtype=float)
+            median = np.array([item['综合家庭损益'] for item in percentile_chart_data['P50']], dtype=float)
+            high = np.array([item['综合家庭损益'] for item in percentile_chart_data['P95']], dtype=float)
+            self.risk_band.set_verts([_area_verts(self.x, low, high)])
+            self.risk_median.set_ydata(median)
+            extents += [low, high]
+        self.risk_band.set_visible(risk_visible)
+        self.risk_median.set_visible(risk_visible)
+
+        full_redraw = self._update_ylim(np.concatenate(extents))
+        if risk_visible != self._risk_visible:
+            self._risk_visible = risk_visible
+            self._build_legend()
+            self._needs_layout = True
+            full_redraw = True
+        return full_redraw or rebuilt or self._needs_layout
+
+    def _update_ylim(self, values):
+        """按需调整纵轴范围（包含 0），返回是否发生变化"""
+        low = min(float(values.min()), 0.0)
+        high = max(float(values.max()), 0.0)
+        span = high - low or 1.0
+        current_low, current_high = self.ax.get_ylim()
+        current_span = current_high - current_low
+
+        exceeds = low < current_low or high > current_high
+        too_loose = span < current_span * SHRINK_RATIO
+        if not (exceeds or too_loose):
+            return False
+        self.ax.set_ylim(low - span * Y_MARGIN, high + span * Y_MARGIN)
+        return True
+
+    def update(self, result):
+        """用分析结果更新图表并刷新画布"""
+        risk = result.get('riskSimulation') or {}
+        full_redraw = self.set_data(result['chartData'], risk.get('percentileChartData'))
+        self.refresh(full_redraw)
+
+    def refresh(self, full_redraw=False):
+        """刷新画布：需要时完整重绘，否则只重画变化的元素"""
+        canvas = self.figure.canvas
+        if self._needs_layout:
+            self.figure.tight_layout()
+            self._needs_layout = False
+            full_redraw = True
+
+        if not self.use_blit or full_redraw or self._background is None:
+            canvas.draw_idle()
+            return
+
+        canvas.restore_region(self._background)
+        self._draw_dynamic()
+        canvas.blit(self.ax.bbox)
+
+    def _draw_dynamic(self):
+        for artist in self.dynamic_artists:
+            if artist.get_visible():
+                self.ax.draw_artist(artist)
+
+    def _on_draw(self, event):
+        """完整重绘后保存静态背景，并补画动态元素（animated 元素不参与普通绘制）"""
+        canvas = self.figure.canvas
+        self._background = canvas.copy_from_bbox(self.ax.bbox)
+        self._draw_dynamic()
+
+    def disconnect(self):
+        """断开与画布的事件连接"""
+        if self._draw_cid is not None:
+            self.figure.canvas.mpl_disconnect(self._draw_cid)
+            self._draw_cid = None
+
+
+if __name__ == "__main__":
+    # 自检：阶段数变化（错开出生的孩子使时间网格多出一个阶段）时图表能重建并正常绘制，标题年数随之更新
+    import sys
+
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    from calculator_engine import default_form_data, perform_analysis
+
+    figure = Figure(figsize=(12, 7), dpi=100)
+    FigureCanvasAgg(figure)
+    chart = StageChart(figure.add_subplot(111), font_family='DejaVu Sans')
+
+    staggered = default_form_data()
+    staggered['childCount'] = 2
+    staggered['children'] = [staggered['children'][0], dict(staggered['children'][0], birthOffset=3)]
+    staggered['riskSimulation'] = True
+    results = [perform_analysis(default_form_data()), perform_analysis(staggered), perform_analysis(default_form_data())]
+
+    ok = True
+    for result, years in zip(results, (18, 21, 18)):
+        chart.update(result)
+        figure.canvas.draw()
+        stage_count = len(result['chartData'])
+        ok &= (len(chart.stage_names) == stage_count and len(chart.property_bars) == stage_count
+               and len(chart.value_labels) == stage_count
+               and chart.ax.get_title() == f'家庭财务损益分析 - {years}年生命周期')
+        print(f"{stage_count} 个阶段, {chart.ax.get_title()}: {'✅' if ok else '❌'}")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,203 @@
+"""
+流式统计累加器
+Constant-memory streaming aggregators
+
+模拟结果按块送入累加器后即可丢弃，内存占用与总路径数无关：
+- RunningStats: 逐列的计数、均值、方差、最小/最大值（Chan 并行合并公式）
+- FixedHistogram: 固定分箱直方图（含下溢/上溢计数）
+- QuantileSketch: 可合并的分位数摘要（KLL 风格的分层压缩，多列同时处理）
+
+所有累加器都支持 merge，且合并过程是确定性的：按相同顺序合并相同的块，结果逐位相同。
+"""
+
+import numpy as np
+
+
+def _as_columns(values, width):
+    """将输入统一为形状 (n, width) 的 float64 数组"""
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values.reshape(-1, 1) if width == 1 else values.reshape(1, -1)
+    return values
+
+
+class RunningStats:
+    """逐列的流式均值与方差"""
+
+    def __init__(self, width=1):
+        self.width = width
+        self.count = 0
+        self.mean = np.zeros(width)
+        self.m2 = np.zeros(width)
+        self.min = np.full(width, np.inf)
+        self.max = np.full(width, -np.inf)
+
+    def update(self, values):
+        """送入一块数据，形状 (n, width)"""
+        values = _as_columns(values, self.width)
+        if len(values) == 0:
+            return
+        block = RunningStats(self.width)
+        block.count = len(values)
+        block.mean = values.mean(axis=0)
+        block.m2 = ((values - block.mean) ** 2).sum(axis=0)
+        block.min = values.min(axis=0)
+        block.max = values.max(axis=0)
+        self.merge(block)
+
+    def merge(self, other):
+        """合并另一个累加器"""
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count = other.count
+            self.mean = other.mean.copy()
+            self.m2 = other.m2.copy()
+            self.min = other.min.copy()
+            self.max = other.max.copy()
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * (other.count / total)
+        self.m2 = self.m2 + other.m2 + delta * delta * (self.count * other.count / total)
+        self.count = total
+        np.minimum(self.min, other.min, out=self.min)
+        np.maximum(self.max, other.max, out=self.max)
+
+    @property
+    def variance(self):
+        """总体方差"""
+        return self.m2 / self.count if self.count else np.zeros(self.width)
+
+    @property
+    def std(self):
+        """总体标准差"""
+        return np.sqrt(self.variance)
+
+
+class FixedHistogram:
+    """固定分箱的一维直方图"""
+
+    def __init__(self, edges):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+
+    @classmethod
+    def from_range(cls, low, high, bins=50):
+        """按区间和分箱数创建"""
+        if not high > low:
+            high = low + 1.0
+        return cls(np.linspace(low, high, bins + 1))
+
+    def update(self, values):
+        """送入一块数据"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        self.counts += np.histogram(values, bins=self.edges)[0]
+        self.underflow += int(np.count_nonzero(values < self.edges[0]))
+        self.overflow += int(np.count_nonzero(values > self.edges[-1]))
+
+    def merge(self, other):
+        """合并另一个分箱相同的直方图"""
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("直方图分箱不一致，无法合并")
+        self.counts += other.counts
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+
+    def to_dict(self):
+        """导出为可 JSON 序列化的字典"""
+        return {
+            'edges': self.edges.tolist(),
+            'counts': self.counts.tolist(),
+            'underflow': self.underflow,
+            'overflow': self.overflow,
+        }
+
+
+class QuantileSketch:
+    """可合并的多列分位数摘要
+
+    第 i 层的每个元素代表 2**i 个原始值。某层超过 capacity 时，逐列排序后隔一取一
+    提升到上一层（起始位置在 0/1 间交替，避免系统性偏差）。各列独立排序，
+    但同一层各列元素个数始终相同，因此所有列可以用一个二维数组整体处理
+    （内部按 (width, m) 存储，使逐列排序在连续内存上进行）。
+    分位数的秩误差约为 O(层数 / capacity)。
+    """
+
+    def __init__(self, width=1, capacity=4096):
+        self.width = width
+        self.capacity = capacity
+        self.count = 0
+        self.levels = []
+        self._offsets = []
+
+    def _ensure_level(self, level):
+        while len(self.levels) <= level:
+            self.levels.append(np.empty((self.width, 0)))
+            self._offsets.append(0)
+
+    def update(self, values):
+        """送入一块数据，形状 (n, width)"""
+        values = np.ascontiguousarray(_as_columns(values, self.width).T)
+        n = values.shape[1]
+        if n == 0:
+            return
+        self.count += n
+
+        # 大块数据直接排序一次并下采样到合适的层，避免逐层反复压缩
+        level = 0
+        if n > self.capacity:
+            level = int(np.ceil(np.log2(n / self.capacity)))
+            step = 2 ** level
+            values = np.sort(values, axis=1)[:, step // 2::step]
+
+        self._ensure_level(level)
+        self.levels[level] = np.concatenate([self.levels[level], values], axis=1)
+        self._compress()
+
+    def merge(self, other):
+        """合并另一个摘要（按调用顺序确定性合并）"""
+        self._ensure_level(len(other.levels) - 1)
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items], axis=1)
+        self.count += other.count
+        self._compress()
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if items.shape[1] > self.capacity:
+                items = np.sort(items, axis=1)
+                keep = items.shape[1] % 2
+                offset = self._offsets[level]
+                self._offsets[level] ^= 1
+                promoted = items[:, keep:][:, offset::2]
+                self.levels[level] = items[:, :keep]
+                self._ensure_level(level + 1)
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted], axis=1)
+            level += 1
+
+    def quantiles(self, qs):
+        """返回各列的分位数，形状 (len(qs), width)；qs 取值 0~1"""
+        values = np.concatenate(self.levels, axis=1)
+        weights = np.concatenate([
+            np.full(items.shape[1], 2.0 ** level) for level, items in enumerate(self.levels)
+        ])
+        order = np.argsort(values, axis=1, kind='stable')
+        sorted_values = np.take_along_axis(values, order, axis=1)
+        cumulative = np.cumsum(weights[order], axis=1)
+        total = cumulative[:, -1:]
+
+        result = np.empty((len(qs), self.width))
+        for i, q in enumerate(qs):
+            index = np.minimum((cumulative < q * total).sum(axis=1), values.shape[1] - 1)
+            result[i] = sorted_values[np.arange(self.width), index]
+        return result
+
+    @property
+    def size(self):
+        """当前保存的元素个数（每列）"""
+        return sum(items.shape[1] for items in self.levels)
@@ -0,0 +1,54 @@
+"""
+测试公共设置：把计算器目录加入 sys.path，并提供随机配置
+"""
+
+import copy
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import calculator_engine as ce  # noqa: E402
+
+
+def make_random_forms(count, seed=5):
+    """按预设轮换并随机缩放全部数值字段（奇数项缩放，偶数项保留预设的整数值），含零收益、负收益"""
+    rng = np.random.default_rng(seed)
+    presets = list(ce.PRESETS)
+    forms = []
+    for i in range(count):
+        data = ce.default_form_data()
+        ce.apply_preset(data, presets[i % len(presets)])
+        if i % 2:
+            for path in ce.FIELD_PATHS:
+                ce.set_field(data, path, float(ce.get_field(data, path) * rng.uniform(0.5, 1.5)))
+        if i % 7 == 0:
+            data['investmentReturn'] = 0
+        if i % 11 == 0:
+            data['investmentReturn'] = -3.0
+        forms.append(data)
+    return forms
+
+
+@pytest.fixture(scope='session')
+def random_forms():
+    return make_random_forms(300)
+
+
+@pytest.fixture
+def mortgage_form():
+    data = ce.default_form_data()
+    data['mortgage'] = {'principal': 2000000, 'annualRate': 3.5, 'termYears': 30,
+                        'prepayments': [{'year': 5, 'amount': 300000}]}
+    return data
+
+
+@pytest.fixture
+def staggered_form():
+    data = ce.default_form_data()
+    data['childCount'] = 2
+    data['children'] = [data['children'][0], dict(copy.deepcopy(data['children'][0]), birthOffset=3)]
+    return data
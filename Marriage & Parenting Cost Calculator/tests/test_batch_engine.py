@@ -0,0 +1,69 @@
+"""
+批量引擎与逐个计算（perform_analysis）一致性
+"""
+
+import copy
+
+import numpy as np
+import pytest
+
+import calculator_engine as ce
+from calculator_engine import uses_timeline
+from batch_engine import (RESULT_FIELDS, analyze_batch, batch_result_row, evaluate_batch, evaluate_forms,
+                          form_data_to_columns, needs_scalar_engine)
+
+
+def test_evaluate_batch_bit_exact(random_forms):
+    batch = evaluate_batch(form_data_to_columns(random_forms))
+    for i, data in enumerate(random_forms):
+        assert batch_result_row(batch, i) == ce.analyze_stages(data), i
+
+
+def test_analyze_batch_matches_perform_analysis(random_forms):
+    forms = random_forms[:60]
+    for data, result in zip(forms, analyze_batch(forms)):
+        assert result == ce.perform_analysis(data)
+
+
+def test_evaluate_forms_mortgage_exact(mortgage_form):
+    salaries = [12000, 20000.5, 31000]
+    columns = form_data_to_columns([mortgage_form] * len(salaries))
+    columns['salaryA'] = np.array(salaries, dtype=float)
+    result = evaluate_forms(columns, [mortgage_form] * len(salaries))
+    for i, salary in enumerate(salaries):
+        reference = ce.perform_analysis(dict(copy.deepcopy(mortgage_form), salaryA=salary))
+        for name in RESULT_FIELDS:
+            assert result[name][i] == reference[name], (salary, name)
+
+
+@pytest.mark.parametrize('resolution', ['yearly', 'monthly'])
+def test_evaluate_forms_timeline_close(staggered_form, resolution):
+    staggered_form['timeResolution'] = resolution
+    counts = [1, 2, 3]
+    columns = form_data_to_columns([staggered_form] * len(counts))
+    columns['childCount'] = np.array(counts, dtype=float)
+    result = evaluate_forms(columns, [staggered_form] * len(counts))
+    for i, count in enumerate(counts):
+        reference = ce.perform_analysis(dict(copy.deepcopy(staggered_form), childCount=count))
+        for name in RESULT_FIELDS:
+            # 批量时间网格与逐个计算只可能在最后一位舍入上不同
+            assert result[name][i] == pytest.approx(reference[name], rel=1e-12, abs=1e-6), (count, name)
+
+
+def test_identical_children_use_closed_form():
+    data = ce.default_form_data()
+    data['childCount'] = 3
+    single = ce.perform_analysis(data)['totalNetAssetsChange']
+
+    data['children'] = [copy.deepcopy(data['children'][0]) for _ in range(3)]
+    data['children'][1]['birthOffset'] = 0
+    assert not uses_timeline(data)
+    assert not needs_scalar_engine(data)
+    assert ce.perform_analysis(data)['totalNetAssetsChange'] == single
+
+
+def test_differing_children_use_timeline(staggered_form):
+    assert uses_timeline(staggered_form)
+    # 只有前 ceil(childCount) 个孩子参与计算
+    staggered_form['childCount'] = 1
+    assert not uses_timeline(staggered_form)
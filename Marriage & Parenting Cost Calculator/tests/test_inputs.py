@@ -0,0 +1,82 @@
+"""
+外部输入的合并、校验，以及缓存和敏感性扰动
+"""
+
+import json
+
+import pytest
+
+import batch_engine
+import calculator_engine as ce
+from calc_server import evaluate_requests
+from result_cache import AnalysisCache, canonical_key
+from scenario_compare import merge_form_data
+from sensitivity import batch_sensitivity
+
+
+def test_merge_children_onto_default_child():
+    data = merge_form_data(ce.default_form_data(), {'childCount': 2,
+                                                    'children': [{'birthOffset': 0}, {'birthOffset': 3}]})
+    default_child = ce.default_form_data()['children'][0]
+    assert len(data['children']) == 2
+    for j, offset in enumerate((0, 3)):
+        assert data['children'][j] == dict(default_child, birthOffset=offset)
+    assert data['children'][0] is not data['children'][1]
+
+
+def test_validate_form_data_rejects_non_numbers():
+    ce.validate_form_data(ce.default_form_data())
+    for overrides in ({'salaryA': 'x'}, {'childCount': '2'}, {'incomeStability': True},
+                      {'children': [{}, {'birthOffset': '3'}]}, {'marriageCosts': {'honeymoon': None}}):
+        with pytest.raises(ValueError):
+            ce.validate_form_data(merge_form_data(ce.default_form_data(), overrides))
+
+
+def test_server_rejects_bad_rows_and_batches_the_rest(monkeypatch):
+    batch_sizes = []
+    analyze_batch = batch_engine.analyze_batch
+
+    def recording(form_datas, cache=None):
+        batch_sizes.append(len(form_datas))
+        return analyze_batch(form_datas, cache=cache)
+
+    monkeypatch.setattr(batch_engine, 'analyze_batch', recording)
+    cache = AnalysisCache()
+    payloads = [b'{"salaryA": "x"}', b'{"salaryA": 20000}', b'{"childCount": "2"}', b'[1]', b'{bad',
+                b'{"salaryB": 15000}']
+    responses = evaluate_requests(payloads, cache)
+
+    assert [status for status, _ in responses] == [400, 200, 400, 400, 400, 200]
+    assert batch_sizes == [2]
+    assert cache.stats()['size'] == 2
+    expected = ce.perform_analysis(merge_form_data(ce.default_form_data(), {'salaryA': 20000}))
+    assert json.loads(responses[1][1])['totalNetAssetsChange'] == expected['totalNetAssetsChange']
+
+
+def test_analysis_cache_lru():
+    cache = AnalysisCache(maxsize=2)
+    forms = []
+    for salary in (10000, 20000, 30000):
+        data = ce.default_form_data()
+        data['salaryA'] = salary
+        forms.append(data)
+    first = cache.get_or_compute(forms[0])
+    cache.get_or_compute(forms[1])
+    assert cache.get_or_compute(forms[0]) is first
+    cache.get_or_compute(forms[2])
+    assert len(cache) == 2
+    assert cache.get(canonical_key(forms[1])) is None
+    assert cache.get(canonical_key(forms[0])) is first
+
+
+def test_sensitivity_keeps_integer_and_bounded_fields_valid():
+    data = ce.default_form_data()
+    data['childCount'] = 2
+    data['incomeStability'] = 95
+    batch = batch_sensitivity([data], fields=('childCount', 'incomeStability', 'salaryA'))
+    assert batch['inputs'][0, :2].tolist() == [[1, 3], [85.5, 100]]
+    assert batch['inputs'][0, 2].tolist() == pytest.approx([data['salaryA'] * 0.9, data['salaryA'] * 1.1])
+
+    data['childCount'] = 1
+    batch = batch_sensitivity([data], fields=('childCount',))
+    assert batch['inputs'][0].tolist() == [[1, 2]]
@@ -0,0 +1,88 @@
+"""
+房贷闭式解与逐月递推一致性
+"""
+
+import numpy as np
+import pytest
+
+from mortgage import amortization_schedule, batch_schedules, loan_schedule
+
+
+def iterate_schedule(principal, annual_rate, term_years, method='equalInstallment'):
+    """逐月递推的参考实现（无提前还款、利率不变）"""
+    rate = annual_rate / 1200
+    months = int(round(term_years * 12))
+    balance = float(principal)
+    if method == 'equalInstallment':
+        installment = principal * rate / (1 - (1 + rate) ** -months) if rate else principal / months
+    payments, principals = [], []
+    for k in range(months):
+        interest = balance * rate
+        paid = installment - interest if method == 'equalInstallment' else principal / months
+        balance -= paid
+        payments.append(paid + interest)
+        principals.append(paid)
+    return np.array(payments), np.array(principals)
+
+
+@pytest.mark.parametrize('method', ['equalInstallment', 'equalPrincipal'])
+@pytest.mark.parametrize('rate', [0.0, 3.1, 4.9])
+def test_closed_form_matches_iteration(method, rate):
+    schedule = amortization_schedule(1000000, rate, 20, method)
+    payment, principal = iterate_schedule(1000000, rate, 20, method)
+    assert schedule['months'] == 240
+    np.testing.assert_allclose(schedule['payment'], payment, rtol=1e-9)
+    np.testing.assert_allclose(schedule['principal'], principal, rtol=1e-9, atol=1e-6)
+    assert schedule['principal'].sum() == pytest.approx(1000000, abs=1e-4)
+    assert schedule['balance'][-1] == 0
+    assert schedule['totalInterest'] == pytest.approx(schedule['payment'].sum() - 1000000, abs=1e-4)
+
+
+def test_equal_installment_payment_is_constant():
+    schedule = amortization_schedule(840000, 3.95, 30)
+    # 等额本息月供公式：M = B·r·(1+r)^n / ((1+r)^n - 1)
+    r = 3.95 / 1200
+    expected = 840000 * r * (1 + r) ** 360 / ((1 + r) ** 360 - 1)
+    np.testing.assert_allclose(schedule['payment'], expected, rtol=1e-12)
+
+
+@pytest.mark.parametrize('mode', ['reduceTerm', 'reducePayment'])
+def test_prepayment_repays_principal(mode):
+    schedule = amortization_schedule(2000000, 3.5, 30, prepayments=((5, 300000, mode),))
+    plain = amortization_schedule(2000000, 3.5, 30)
+    assert schedule['principal'].sum() == pytest.approx(2000000, abs=1e-4)
+    assert schedule['balance'][-1] == pytest.approx(0, abs=1e-6)
+    assert schedule['principal'][59] == pytest.approx(plain['principal'][59] + 300000)
+    assert schedule['totalInterest'] < plain['totalInterest']
+    if mode == 'reduceTerm':
+        assert schedule['months'] < 360
+        # 剩余期数向上取整后重新摊还，月供只略低于原月供
+        assert schedule['payment'][60] == pytest.approx(plain['payment'][60], rel=1e-3)
+        assert schedule['payment'][60] <= plain['payment'][60]
+    else:
+        assert schedule['months'] == 360
+        assert schedule['payment'][60] < plain['payment'][60]
+
+
+def test_rate_reset_and_loan_schedule():
+    mortgage = {'principal': 840000, 'annualRate': 3.95, 'termYears': 30,
+                'rateResets': [{'year': 1, 'annualRate': 3.45}]}
+    schedule = loan_schedule(mortgage)
+    assert schedule['payment'][12] < schedule['payment'][11]
+    assert schedule['principal'].sum() == pytest.approx(840000, abs=1e-4)
+    with pytest.raises(ValueError):
+        amortization_schedule(840000, 3.95, 30, 'balloon')
+
+
+def test_batch_schedules_match_single_loans():
+    principal = np.array([840000, 0, 840000, 1500000])
+    rate = np.array([3.95, 3.95, 3.95, 4.2])
+    years = np.array([30, 30, 30, 25])
+    method = np.array([0, 0, 0, 1])
+    batch = batch_schedules(principal, rate, years, method)
+    assert batch['index'][0] == batch['index'][2]
+    for i, name in ((0, 'equalInstallment'), (3, 'equalPrincipal')):
+        single = amortization_schedule(principal[i], rate[i], years[i], name)
+        row = batch['index'][i]
+        np.testing.assert_allclose(batch['payment'][row, :single['months']], single['payment'], rtol=1e-12)
+    assert not batch['payment'][batch['index'][1]].any()
@@ -0,0 +1,49 @@
+"""
+紧凑记录与 JSON 格式无损互转
+"""
+
+import copy
+import json
+
+import calculator_engine as ce
+from records import HouseholdRecord, StageResult, analyze_records
+
+
+def dumps(value):
+    return json.dumps(value, ensure_ascii=False)
+
+
+def test_household_round_trip(random_forms, mortgage_form, staggered_form):
+    for data in random_forms[:50] + [mortgage_form, staggered_form]:
+        record = HouseholdRecord.from_form_data(data)
+        restored = record.to_form_data()
+        assert restored == data
+        assert dumps(restored) == dumps(data)
+        assert HouseholdRecord.from_json(record.to_json()) == record
+
+
+def test_household_field_access_keeps_int_type():
+    record = HouseholdRecord.from_form_data(ce.default_form_data())
+    assert type(record['childCount']) is int
+    record['salaryA'] = 20000.5
+    assert record.to_form_data()['salaryA'] == 20000.5
+    copied = record.copy()
+    copied['salaryA'] = 1
+    assert record['salaryA'] == 20000.5
+
+
+def test_stage_result_round_trip(random_forms, mortgage_form, staggered_form):
+    risk_form = copy.deepcopy(random_forms[1])
+    risk_form['riskSimulation'] = True
+    for data in random_forms[:20] + [mortgage_form, staggered_form, risk_form]:
+        result = ce.perform_analysis(data)
+        restored = StageResult.from_result(result).to_result()
+        assert restored == result
+        assert dumps(restored) == dumps(result)
+
+
+def test_analyze_records_matches_perform_analysis(random_forms, mortgage_form, staggered_form):
+    forms = random_forms[:30] + [mortgage_form, staggered_form]
+    results = analyze_records(HouseholdRecord.from_form_data(data) for data in forms)
+    for data, result in zip(forms, results):
+        assert result.to_result() == ce.perform_analysis(data)
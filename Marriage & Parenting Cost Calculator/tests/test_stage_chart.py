@@ -0,0 +1,30 @@
+"""
+阶段图表在阶段数变化时重建
+"""
+
+import pytest
+
+import calculator_engine as ce
+
+pytest.importorskip('matplotlib')
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg  # noqa: E402
+from matplotlib.figure import Figure  # noqa: E402
+
+from stage_chart import StageChart  # noqa: E402
+
+
+def test_chart_rebuilds_when_stages_change(staggered_form):
+    staggered_form['riskSimulation'] = True
+    figure = Figure(figsize=(12, 7), dpi=80)
+    FigureCanvasAgg(figure)
+    chart = StageChart(figure.add_subplot(111), font_family='DejaVu Sans')
+
+    for data, years in ((ce.default_form_data(), 18), (staggered_form, 21), (ce.default_form_data(), 18)):
+        result = ce.perform_analysis(data)
+        chart.update(result)
+        figure.canvas.draw()
+        stage_count = len(result['chartData'])
+        assert chart.stage_names == [row['name'] for row in result['chartData']]
+        assert len(chart.property_bars) == len(chart.value_labels) == stage_count
+        assert chart.ax.get_title() == f'家庭财务损益分析 - {years}年生命周期'
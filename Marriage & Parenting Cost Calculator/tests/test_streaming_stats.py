@@ -0,0 +1,55 @@
+"""
+流式统计量的合并与精度
+"""
+
+import numpy as np
+
+from streaming_stats import FixedHistogram, QuantileSketch, RunningStats
+
+
+def test_running_stats_merge_matches_numpy():
+    rng = np.random.default_rng(1)
+    data = rng.normal(1e6, 3e5, size=(10000, 3))
+    total = RunningStats(3)
+    parts = [RunningStats(3) for _ in range(4)]
+    for part, block in zip(parts, np.array_split(data, 4)):
+        for chunk in np.array_split(block, 7):
+            part.update(chunk)
+    for part in parts:
+        total.merge(part)
+    assert total.count == len(data)
+    np.testing.assert_allclose(total.mean, data.mean(axis=0), rtol=1e-12)
+    np.testing.assert_allclose(total.variance, data.var(axis=0), rtol=1e-9)
+    np.testing.assert_array_equal(total.min, data.min(axis=0))
+    np.testing.assert_array_equal(total.max, data.max(axis=0))
+
+
+def test_quantile_sketch_rank_error():
+    rng = np.random.default_rng(2)
+    data = rng.lognormal(0, 1, size=(200000, 2))
+    sketch = QuantileSketch(2, capacity=2048)
+    for chunk in np.array_split(data, 50):
+        part = QuantileSketch(2, capacity=2048)
+        part.update(chunk)
+        sketch.merge(part)
+    assert sketch.count == len(data)
+    assert sketch.size < 2048 * 10
+    qs = (0.05, 0.5, 0.95)
+    estimates = sketch.quantiles(qs)
+    for column in range(2):
+        ordered = np.sort(data[:, column])
+        for q, estimate in zip(qs, estimates[:, column]):
+            rank = np.searchsorted(ordered, estimate) / len(ordered)
+            assert abs(rank - q) < 0.01
+
+
+def test_histogram_merge():
+    values = np.linspace(-1, 11, 1000)
+    whole = FixedHistogram.from_range(0, 10, 20)
+    whole.update(values)
+    left, right = FixedHistogram.from_range(0, 10, 20), FixedHistogram.from_range(0, 10, 20)
+    left.update(values[:400])
+    right.update(values[400:])
+    left.merge(right)
+    assert left.to_dict() == whole.to_dict()
+    assert whole.counts.sum() + whole.underflow + whole.overflow == len(values)
@@ -0,0 +1,513 @@
+"""
+时间网格计算引擎（按年 / 按月）
+Time-resolution engine on a yearly or monthly grid
+
+与 perform_analysis 把 18 年折叠为 6 个固定阶段不同，本引擎在可配置的时间网格上逐期计算：
+- 网格 = 结婚准备期（1年）+ 孩子出生后的 horizonYears 年，每年 1 期（yearly）或 12 期（monthly）
+- 通胀按每期期初的实际年数计算，不再整段共用一个系数
+- 育儿成本在各自的年龄区间内均摊（产检/分娩/月子在出生当期一次性计入，
+  本科在 18-22 岁，只有 horizonYears >= 22 时才进入网格）
+- 投资收益：家庭组合账户每期按 investmentReturn 复利，期末存入当期净现金流（为负时取出），
+  余额递推用累乘 / 累加形式对家庭和期数同时向量化（见 portfolio_ledger）
+- 房产按期末/期初市值之差计算增值，各期之和与 perform_analysis 相同
+- 多个孩子：children 中每个孩子有各自的成本和出生时间 birthOffset（相对网格起点的年数），
+  家庭每期的育儿成本是各孩子成本曲线平移后之和
+- 房贷：设置了 mortgage 时按还款计划（见 mortgage.py）逐月汇总到各期，代替 monthlyMortgage；
+  还本部分计入资产增值（房产净值增加）
+
+阶段只是对网格的汇总（网格 × 汇总矩阵），与 perform_analysis 的 chartData 格式相同；
+horizonYears 超过 18 年时追加"18-N岁"阶段。总资产变化的口径与 perform_analysis 一致。
+
+批量计算按家庭分块，每块为 (家庭数, 期数) 的 NumPy 数组。
+
+孩子数量 childCount 与 children 列表的关系：第 j 个孩子使用 children[j]，列表不够长时沿用最后一项
+（因此只有一项时与 perform_analysis 的"成本 × 孩子数量"完全相同）；childCount 为小数时最后一个孩子按比例计入。
+"""
+
+import numpy as np
+
+from calculator_engine import STAGES, CHART_SERIES, CHILD_COST_LABELS, FIELD_PATHS
+from batch_engine import MARRIAGE_COST_PATHS, form_data_to_columns, broadcast_columns
+from mortgage import MORTGAGE_PATHS, mortgage_columns, batch_schedules, period_schedules, loan_schedule, mortgage_summary
+
+TIME_RESOLUTIONS = {'yearly': 1, 'monthly': 12}
+DEFAULT_HORIZON_YEARS = 18
+DEFAULT_CHUNK_SIZE = 1024
+
+# 结婚准备期年数（孩子出生前）
+PREPARATION_YEARS = STAGES[0]['years']
+
+# 育儿成本项的时间安排：(起始年龄, 结束年龄, 总额倍数)，起止相同表示一次性计入
+CHILD_COST_SCHEDULE = {
+    'prenatalCare': (0, 0, 1),
+    'delivery': (0, 0, 1),
+    'postpartumCare': (0, 0, 1),
+    'monthlyBabyCost': (0, 3, 12 * 3),
+    'kindergarten': (3, 6, 1),
+    'primarySchool': (6, 12, 1),
+    'juniorHigh': (12, 15, 1),
+    'seniorHigh': (15, 18, 1),
+    'extracurricular': (15, 18, 1),
+    'university': (18, 22, 1),
+}
+
+# 孩子出生时间（相对网格起点，即第一个孩子出生时的年数）
+BIRTH_OFFSET_KEY = 'birthOffset'
+
+
+def child_path(j, key):
+    """第 j 个孩子的字段路径，如 child_path(1, 'delivery') -> 'children[1].delivery'"""
+    return f'children[{j}].{key}'
+
+
+def child_columns(form_datas):
+    """按孩子展开的列数组：每个孩子的成本项和 birthOffset（列表较短的家庭沿用最后一项）"""
+    form_datas = list(form_datas)
+    n_children = max([len(data['children']) for data in form_datas] + [1])
+    columns = {}
+    for j in range(n_children):
+        entries = [data['children'][min(j, len(data['children']) - 1)] for data in form_datas]
+        for key in tuple(CHILD_COST_LABELS) + (BIRTH_OFFSET_KEY,):
+            columns[child_path(j, key)] = np.array([entry.get(key, 0) for entry in entries], dtype=np.float64)
+    return columns
+
+
+def timeline_columns(form_datas):
+    """form_data_to_columns 加上按孩子展开的列，有家庭设置了 mortgage 时再加上贷款参数列"""
+    form_datas = list(form_datas)
+    columns = form_data_to_columns(form_datas)
+    columns.update(child_columns(form_datas))
+    if any(data.get('mortgage') for data in form_datas):
+        columns.update(mortgage_columns(form_datas))
+    return columns
+
+
+def time_grid(resolution='yearly', horizon_years=DEFAULT_HORIZON_YEARS):
+    """构造时间网格：各期的时间、孩子年龄、阶段归属、育儿成本分摊矩阵和阶段汇总矩阵"""
+    if resolution not in TIME_RESOLUTIONS:
+        raise ValueError(f"不支持的时间精度: {resolution}（可选 {', '.join(TIME_RESOLUTIONS)}）")
+    if horizon_years < 1 or int(horizon_years) != horizon_years:
+        raise ValueError(f"horizonYears 必须为正整数: {horizon_years}")
+    horizon_years = int(horizon_years)
+
+    per_year = TIME_RESOLUTIONS[resolution]
+    dt = 1.0 / per_year
+    prep_periods = PREPARATION_YEARS * per_year
+    n_periods = prep_periods + horizon_years * per_year
+
+    index = np.arange(n_periods)
+    start_years = index * dt
+    # 孩子年龄用整数期数表示，避免浮点误差影响区间归属
+    age_periods = index - prep_periods
+    active = age_periods >= 0
+
+    # 阶段边界（孩子年龄，年），超过 18 年的部分归入追加阶段
+    stage_names = [stage['name'] for stage in STAGES]
+    boundaries = []
+    age = 0
+    for stage in STAGES[1:]:
+        boundaries.append(age)
+        age += stage['years']
+    if horizon_years > age:
+        stage_names.append(f"{age}-{horizon_years}岁")
+        boundaries.append(age)
+    boundaries = np.array(boundaries) * per_year
+
+    stage_index = np.zeros(n_periods, dtype=int)
+    stage_index[active] = np.searchsorted(boundaries, age_periods[active], side='right')
+    aggregation = np.zeros((n_periods, len(stage_names)))
+    aggregation[index, stage_index] = 1.0
+    stage_starts = np.searchsorted(stage_index, np.arange(len(stage_names)))
+    stage_ends = np.append(stage_starts[1:], n_periods) - 1
+
+    # 育儿成本分摊：schedule[k, p] 为第 k 项在第 p 期计入的比例（已乘总额倍数）
+    child_items = tuple(CHILD_COST_SCHEDULE)
+    schedule = np.zeros((len(child_items), n_periods))
+    for k, key in enumerate(child_items):
+        start, end, multiplier = CHILD_COST_SCHEDULE[key]
+        if start == end:
+            schedule[k, prep_periods + start * per_year] = multiplier if start < horizon_years else 0
+        else:
+            mask = active & (age_periods >= start * per_year) & (age_periods < end * per_year)
+            schedule[k, mask] = multiplier * dt / (end - start)
+
+    return {
+        'resolution': resolution,
+        'horizonYears': horizon_years,
+        'periodsPerYear': per_year,
+        'dt': dt,
+        'nPeriods': n_periods,
+        'startYears': start_years,
+        'childAgeYears': age_periods * dt,
+        'active': active,
+        'stageNames': stage_names,
+        'stageIndex': stage_index,
+        'aggregation': aggregation,
+        'stageStarts': stage_starts,
+        'stageEnds': stage_ends,
+        'childItems': child_items,
+        'childSchedule': schedule,
+        'firstPeriod': (index == 0).astype(float),
+    }
+
+
+def _shift(schedule, shift):
+    """将成本曲线向后平移 shift 期（移出网格的部分丢弃）"""
+    if shift == 0:
+        return schedule
+    shifted = np.zeros_like(schedule)
+    if shift < schedule.shape[1]:
+        shifted[:, shift:] = schedule[:, :schedule.shape[1] - shift]
+    return shifted
+
+
+def _child_costs(c, grid):
+    """各孩子平移后的育儿成本曲线之和（未计通胀）(n, P)，以及育儿总成本 (n,)
+
+    出生时间相同的家庭共用一个平移后的分摊矩阵：把各孩子的成本项拼成 (n, 孩子数 × 项数) 的系数，
+    与纵向拼接的平移矩阵做一次矩阵乘法，孩子数量增加时计算量基本不变。
+    """
+    items = grid['childItems']
+    n_children = c['nChildren']
+    count = c['childCount']
+
+    weights = []
+    for j in range(n_children):
+        weight = count - j
+        weights.append(np.clip(weight, 0, 1) if j < n_children - 1 else np.maximum(weight, 0))
+
+    coefficients = np.column_stack([
+        c[child_path(j, key)] * weights[j] for j in range(n_children) for key in items
+    ])
+    multipliers = np.tile([CHILD_COST_SCHEDULE[key][2] for key in items], n_children)
+    total_child_cost = coefficients @ multipliers
+
+    shifts = np.rint(np.column_stack([
+        c[child_path(j, BIRTH_OFFSET_KEY)] for j in range(n_children)
+    ]) * grid['periodsPerYear']).astype(int)
+    if (shifts < 0).any():
+        raise ValueError("birthOffset 不能为负数")
+
+    schedule = grid['childSchedule']
+    if (shifts == shifts[0]).all():
+        stacked = np.vstack([_shift(schedule, s) for s in shifts[0]])
+        return coefficients @ stacked, total_child_cost
+
+    groups, inverse = np.unique(shifts, axis=0, return_inverse=True)
+    child = np.empty((len(count), grid['nPeriods']))
+    for g, group in enumerate(groups):
+        rows = np.flatnonzero(inverse.ravel() == g)
+        stacked = np.vstack([_shift(schedule, s) for s in group])
+        child[rows] = coefficients[rows] @ stacked
+    return child, total_child_cost
+
+
+def _loan_periods(loans, columns, grid, n):
+    """按网格各期汇总的还款计划（结婚准备期不还款），每种贷款一行，'index' 为各家庭对应的行号"""
+    per_year = grid['periodsPerYear']
+    prep_periods = PREPARATION_YEARS * per_year
+    active_periods = grid['nPeriods'] - prep_periods
+    if loans is not None:
+        schedules = period_schedules(loans[0], loans[1], 12 // per_year, active_periods)
+        schedules['index'] = np.zeros(n, dtype=int) if len(schedules['firstPayment']) == 1 else np.arange(n)
+    else:
+        schedules = batch_schedules(*(np.broadcast_to(np.asarray(columns[path], dtype=np.float64), (n,))
+                                      for path in MORTGAGE_PATHS), 12 // per_year, active_periods)
+    for key in ('payment', 'principal'):
+        schedules[key] = np.pad(schedules[key], ((0, 0), (prep_periods, 0)))
+    return schedules
+
+
+def _cumulative_growth(growth, n_periods):
+    """组合账户的累计增长倍数 G_p = g^p (p = 1..P)；所有家庭收益率相同时只算一行 (P,)，否则为 (n, P)"""
+    growth = np.asarray(growth, dtype=np.float64)
+    if (growth == growth[0]).all():
+        return np.cumprod(np.full(n_periods, growth[0]))
+    return np.cumprod(np.broadcast_to(growth[:, None], (len(growth), n_periods)), axis=1)
+
+
+def portfolio_ledger(net_cash_flow, growth):
+    """家庭组合账户的逐期余额和投资收益 (n, P)
+
+    余额递推 W_p = W_{p-1}·g + 净现金流_p（期初余额为 0），写成累乘形式
+    W_p = G_p·Σ_{q<=p} 净现金流_q / G_q，G_p = g^p，只需一次 cumprod 和一次 cumsum。
+    第 p 期的投资收益为 W_{p-1}·(g - 1)。growth 为每个家庭的单期增长倍数 g，形状 (n,)。
+    """
+    cumulative = _cumulative_growth(growth, net_cash_flow.shape[1])
+    balance = np.cumsum(net_cash_flow / cumulative, axis=1)
+    balance *= cumulative
+    gain = np.zeros_like(balance)
+    np.multiply(balance[:, :-1], np.asarray(growth)[:, None] - 1, out=gain[:, 1:])
+    return balance, gain
+
+
+def stage_portfolio(net_cash_flow, growth, grid):
+    """只需要阶段汇总时的组合账户：各阶段末余额 (n, S)
+
+    阶段末余额 W = G_end·Σ(净现金流 / G)，按期的累加换成"汇总矩阵乘法 + 阶段间累加"，
+    不生成逐期余额。收益率相同时把 1/G 并入汇总矩阵，只做一次 (n, P) × (P, S) 的乘法。
+    """
+    cumulative = _cumulative_growth(growth, net_cash_flow.shape[1])
+    if cumulative.ndim == 1:
+        discounted = net_cash_flow @ (grid['aggregation'] / cumulative[:, None])
+    else:
+        discounted = (net_cash_flow / cumulative) @ grid['aggregation']
+    return np.cumsum(discounted, axis=1) * cumulative[..., grid['stageEnds']]
+
+
+def _evaluate_chunk(c, grid, return_periods):
+    """计算一块家庭（c 为长度相同的列数组）
+
+    收入、父母支持、月供、结婚成本都是"家庭系数 × 逐期曲线"的形式，
+    用一次矩阵乘法得到 (n, P) 的数组；只有乘物价水平的生活与育儿成本需要逐元素计算。
+    房产增值按阶段首尾市值之差直接汇总，只在需要逐期数据时才展开到每期。
+    c['loans'] 为按期汇总的还款计划（见 _loan_periods）时，有贷款的家庭用还款计划代替 monthlyMortgage。
+    """
+    dt = grid['dt']
+    active = grid['active'].astype(float)
+    aggregation = grid['aggregation']
+    n = len(c['salaryA'])
+
+    loans = c.get('loans')
+    monthly_mortgage = c['monthlyMortgage']
+    if loans is not None:
+        has_loan = loans['firstPayment'] > 0
+        first_payment = np.where(has_loan, loans['firstPayment'], monthly_mortgage)
+        monthly_mortgage = np.where(has_loan, 0.0, monthly_mortgage)
+
+    total_marriage_cost = 0
+    for path in MARRIAGE_COST_PATHS:
+        total_marriage_cost = total_marriage_cost + c[path]
+
+    annual_income = ((c['salaryA'] + c['salaryB']) * 12 + c['annualBonus']) * (c['incomeStability'] / 100)
+
+    # 现金流中的可分离项：系数 (n, 3) × 曲线 (3, P)
+    coefficients = np.column_stack([
+        annual_income * dt + c['annualParentSupport'] * dt - monthly_mortgage * 12 * dt,
+        -total_marriage_cost,
+        c['annualParentSupport'] * dt,
+    ])
+    profiles = np.vstack([active, grid['firstPeriod'], active])
+    stage_profiles = profiles @ aggregation
+
+    # 物价水平（以孩子出生时为基准）(n, P)
+    price_level = np.exp(np.outer(np.log1p(c['livingInflation'] / 100), np.maximum(grid['childAgeYears'], 0)))
+
+    child, total_child_cost = _child_costs(c, grid)
+    child *= price_level
+    living = price_level
+    living *= (c['baseLivingCost'] * 12 * dt)[:, None]
+    living *= active
+
+    # 净现金流 = 可分离项 - 生活成本 - 育儿成本
+    net_cash_flow = coefficients[:, :2] @ profiles[:2]
+    net_cash_flow -= living
+    net_cash_flow -= child
+    if loans is not None:
+        equity_gain = loans['principal']
+        net_cash_flow -= loans['payment']
+
+    stage_net = net_cash_flow @ aggregation
+
+    # 组合账户：净现金流期末存入，余额按期复利；阶段投资收益 = 阶段余额变化 - 阶段净现金流
+    portfolio_growth = np.exp(np.log1p(c['investmentReturn'] / 100) * dt)
+    stage_balance = stage_portfolio(net_cash_flow, portfolio_growth, grid)
+    stage_invest = np.diff(stage_balance, axis=1, prepend=0.0) - stage_net
+    stage_child = child @ aggregation
+    stage_marriage = np.outer(total_marriage_cost, stage_profiles[1])
+    stage_support = np.outer(coefficients[:, 2], stage_profiles[2])
+
+    # 房产增值：各阶段首尾市值之差
+    growth = np.log1p(c['propertyAppreciation'] / 100)
+    stage_edges = np.append(grid['startYears'][grid['stageStarts']], grid['startYears'][-1] + dt)
+    stage_values = c['propertyValue'][:, None] * np.exp(np.outer(growth, stage_edges))
+    stage_property = np.diff(stage_values, axis=1)
+    if loans is not None:
+        stage_property += equity_gain @ aggregation
+
+    stage_economic = stage_net + stage_property + stage_invest
+    stage_series = {
+        '净现金流': stage_net,
+        '资产增值贬值': stage_property,
+        '结婚生育成本': stage_marriage + stage_child,
+        '投资与支持': stage_invest + stage_support,
+        '综合家庭损益': stage_economic,
+    }
+
+    # 最低现金流：与 perform_analysis 相同，取各育儿阶段（不含结婚准备期）的净现金流最小值
+    min_cash_flow_surplus = stage_net[:, 1:].min(axis=1)
+
+    monthly_income = c['salaryA'] + c['salaryB'] + c['annualParentSupport'] / 12
+    monthly_expenses = (first_payment if loans is not None else c['monthlyMortgage']) + c['baseLivingCost']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        risk_coefficient = np.where(monthly_expenses > 0, monthly_income / monthly_expenses, 0.0)
+
+    result = {
+        'totalNetAssetsChange': stage_economic.sum(axis=1) - total_marriage_cost,
+        'minCashFlowSurplus': min_cash_flow_surplus,
+        'minPeriodCashFlow': net_cash_flow[:, grid['active']].min(axis=1),
+        'totalMarriageCost': np.broadcast_to(total_marriage_cost, (n,)),
+        'childEducationCost': total_child_cost,
+        'totalCost': total_marriage_cost + total_child_cost,
+        'riskCoefficient': risk_coefficient,
+        'endingPortfolio': stage_balance[:, -1],
+        'series': stage_series,
+    }
+    if loans is not None:
+        result['mortgageBalance'] = loans['balance']
+
+    if return_periods:
+        portfolio, invest_gain = portfolio_ledger(net_cash_flow, portfolio_growth)
+        start_years = grid['startYears']
+        values = np.exp(np.outer(growth, np.append(start_years, start_years[-1] + dt)))
+        property_gain = c['propertyValue'][:, None] * np.diff(values, axis=1)
+        if loans is not None:
+            property_gain += equity_gain
+        result['periodSeries'] = {
+            '净现金流': net_cash_flow,
+            '资产增值贬值': property_gain,
+            '结婚生育成本': np.outer(total_marriage_cost, profiles[1]) + child,
+            '投资与支持': invest_gain + np.outer(coefficients[:, 2], profiles[2]),
+            '综合家庭损益': net_cash_flow + property_gain + invest_gain,
+        }
+        result['portfolioBalance'] = portfolio
+    return result
+
+
+def _child_slots(columns, c, n):
+    """把 children[j].* 列补齐并加入 c（缺少的列沿用前一个孩子，birthOffset 缺省为 0），返回这些列的路径"""
+    n_children = 1
+    while child_path(n_children, 'prenatalCare') in columns:
+        n_children += 1
+
+    paths = []
+    for j in range(n_children):
+        for key in tuple(CHILD_COST_LABELS) + (BIRTH_OFFSET_KEY,):
+            path = child_path(j, key)
+            if path in columns:
+                c[path] = np.broadcast_to(np.asarray(columns[path], dtype=np.float64), (n,))
+            elif key == BIRTH_OFFSET_KEY:
+                c[path] = np.zeros(n)
+            elif path not in c:
+                c[path] = c[child_path(j - 1, key)]
+            paths.append(path)
+    return tuple(paths)
+
+
+def evaluate_timeline(columns, resolution='yearly', horizon_years=DEFAULT_HORIZON_YEARS,
+                      chunk_size=DEFAULT_CHUNK_SIZE, return_periods=False, loans=None):
+    """在时间网格上批量计算
+
+    columns: {字段路径: 长度为 N 的数组或标量}，字段路径见 FIELD_PATHS；
+             多个孩子另有 children[j].xxx 和 children[j].birthOffset（见 timeline_columns），
+             贷款另有 mortgage.principal / annualRate / termYears / method（本金为 0 的家庭使用 monthlyMortgage）
+    loans: 可选，直接给出逐月 (还款额, 还本额) 数组 (N 或 1, 月数)，用于带提前还款、利率调整的还款计划
+    返回: 与 evaluate_batch 同名的结果字段（形状 (N,)），'series': {序列名: (N, 阶段数)}，
+          'minPeriodCashFlow': 单期最低净现金流，'stageNames'，
+          'endingPortfolio': 期末组合账户余额，
+          return_periods 为 True 时另有 'periodSeries': {序列名: (N, 期数)} 和 'portfolioBalance': (N, 期数)，
+          有贷款时另有 'mortgageBalance': 分析期末的剩余本金
+    """
+    grid = time_grid(resolution, horizon_years)
+    c = broadcast_columns(columns)
+    n = c['salaryA'].shape[0]
+    # 相同的贷款在整批中只计算一次，各块按行号取用
+    schedules = None
+    if loans is not None or 'mortgage.principal' in columns:
+        schedules = _loan_periods(loans, columns, grid, n)
+    child_paths = _child_slots(columns, c, n)
+    n_children = len(child_paths) // (len(CHILD_COST_LABELS) + 1)
+
+    results = []
+    for start in range(0, n, chunk_size):
+        chunk = {path: np.ascontiguousarray(c[path][start:start + chunk_size])
+                 for path in FIELD_PATHS + child_paths}
+        chunk['nChildren'] = n_children
+        if schedules is not None:
+            rows = schedules['index'][start:start + chunk_size]
+            chunk['loans'] = {key: schedules[key][rows] for key in ('payment', 'principal', 'balance', 'firstPayment')}
+        results.append(_evaluate_chunk(chunk, grid, return_periods))
+
+    merged = {}
+    for key, value in results[0].items():
+        if isinstance(value, dict):
+            merged[key] = {name: np.concatenate([r[key][name] for r in results]) for name in value}
+        else:
+            merged[key] = np.concatenate([r[key] for r in results])
+    merged['stageNames'] = grid['stageNames']
+    merged['grid'] = grid
+    return merged
+
+
+def timeline_settings(data):
+    """form_data 的时间精度、分析年数和还款计划（没有 mortgage 时为 None）
+
+    data['timeResolution']: 'yearly' 或 'monthly'（默认 yearly）
+    data['horizonYears']: 第一个孩子出生后的年数（默认 18 年，并延长到覆盖最后出生的孩子的 18 岁）
+    """
+    resolution = data.get('timeResolution') or 'yearly'
+    horizon_years = data.get('horizonYears')
+    if not horizon_years:
+        counted = max(1, min(len(data['children']), int(np.ceil(data['childCount']))))
+        last_birth = max(float(data['children'][j].get(BIRTH_OFFSET_KEY, 0)) for j in range(counted))
+        horizon_years = DEFAULT_HORIZON_YEARS + int(np.ceil(last_birth))
+    schedule = loan_schedule(data['mortgage']) if data.get('mortgage') else None
+    return resolution, horizon_years, schedule
+
+
+def evaluate_template(template, columns):
+    """同一个 form_data 模板配多组 FIELD_PATHS 取值，一次批量做时间网格分析
+
+    columns: {FIELD_PATHS 中的字段路径: 长度为 N 的数组}，覆盖模板中的值；
+             模板提供其余设置（时间精度、分析年数、其他孩子、还款计划），并决定计入的孩子数
+    每行与把该行的值写入模板后调用 analyze_timeline 相同（组合账户按阶段汇总计算，可能相差末位舍入）；
+    返回 evaluate_timeline 的结果
+    """
+    resolution, horizon_years, schedule = timeline_settings(template)
+    merged = timeline_columns([template])
+    merged.update(columns)
+    loans = (schedule['payment'], schedule['principal']) if schedule is not None else None
+    return evaluate_timeline(merged, resolution, horizon_years, loans=loans)
+
+
+def analyze_timeline(data):
+    """单个 form_data 的时间网格分析，返回与 perform_analysis 格式相同的结果，另附逐期数据（设置见 timeline_settings）"""
+    resolution, horizon_years, schedule = timeline_settings(data)
+    columns = timeline_columns([data])
+    loans = (schedule['payment'], schedule['principal']) if schedule is not None else None
+    batch = evaluate_timeline(columns, resolution, horizon_years, return_periods=True, loans=loans)
+    grid = batch['grid']
+
+    chart_data = []
+    for idx, name in enumerate(batch['stageNames']):
+        row = {'name': name}
+        for series in CHART_SERIES:
+            row[series] = float(batch['series'][series][0, idx])
+        row['isMarriageStage'] = idx == 0
+        chart_data.append(row)
+
+    result = {
+        'chartData': chart_data,
+        'totalNetAssetsChange': float(batch['totalNetAssetsChange'][0]),
+        'minCashFlowSurplus': float(batch['minCashFlowSurplus'][0]),
+        'totalMarriageCost': float(batch['totalMarriageCost'][0]),
+        'childEducationCost': float(batch['childEducationCost'][0]),
+        'totalCost': float(batch['totalCost'][0]),
+        'riskCoefficient': float(batch['riskCoefficient'][0]),
+        'endingPortfolio': float(batch['endingPortfolio'][0]),
+        'timeline': {
+            'resolution': grid['resolution'],
+            'horizonYears': grid['horizonYears'],
+            'periodsPerYear': grid['periodsPerYear'],
+            'startYears': grid['startYears'].tolist(),
+            'stageIndex': grid['stageIndex'].tolist(),
+            'minPeriodCashFlow': float(batch['minPeriodCashFlow'][0]),
+            'series': {name: values[0].tolist() for name, values in batch['periodSeries'].items()},
+            'portfolioBalance': batch['portfolioBalance'][0].tolist(),
+        },
+    }
+    if schedule is not None:
+        years = PREPARATION_YEARS + grid['horizonYears']
+        property_value_end = data['propertyValue'] * (1 + data['propertyAppreciation'] / 100) ** years
+        result['mortgage'] = mortgage_summary(schedule, grid['horizonYears'] * 12, property_value_end)
+    return result